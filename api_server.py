@@ -0,0 +1,281 @@
+"""JSON-over-HTTP API for the booking engine, built on asyncio streams.
+
+Endpoints:
+    POST /sessions                      start a session
+    GET  /sessions/<id>                 messages, booking fields and payment
+    POST /sessions/<id>/messages        {"text": "..."} -> {"reply": "...", ...}
+    GET  /sessions/<id>/payment         advance and return the payment window
+    DELETE /sessions/<id>/payment       cancel an open payment and release its tickets
+    GET  /sessions/<id>/payment/card    UPI payment card (PNG)
+    GET  /bookings/<booking id>/qr?token=...
+                                        its entry QR (PNG), for emails sent with EMAIL_QR_URL;
+                                        404 unless token is the booking's QR link token
+    GET  /health
+    GET  /metrics                       Prometheus text format
+
+Admin listener only (--admin-host/--admin-port, loopback by default):
+    GET  /bookings/<booking id>         a confirmed booking from the ledger
+    GET  /bookings?email=...            a customer's confirmed bookings
+    GET  /bookings?attraction=...&date=YYYY-MM-DD[&until=YYYY-MM-DD]
+
+The admin listener serves every route; the ledger lookups return
+customer details without authentication, so it must stay off the
+public network.
+
+Sessions are loaded from and saved to a session store for every
+request, so any number of these workers can share one store (see
+session_store.py). Engine and store calls block (Gemini, SMTP, SQLite)
+and run in the default thread pool; requests for one session are
+serialized within a worker.
+
+Usage: python api_server.py [--host HOST] [--port PORT] [--admin-host HOST] [--admin-port PORT]
+                             [--store memory|sqlite:PATH]
+"""
+import argparse
+import asyncio
+import functools
+import json
+import time
+import weakref
+from urllib.parse import parse_qs
+
+from booking_engine import BookingEngine
+from session_store import open_session_store
+from telemetry import get_logger, metrics
+from ticket_token import MissingSigningKey, check_qr_link_token, signing_key
+
+MAX_BODY_BYTES = 64 * 1024
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+log = get_logger('api')
+REQUEST_SECONDS = metrics.histogram('tixbee_http_request_seconds', 'API request latency', ('method', 'status'))
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class BookingAPI:
+    """Routes requests to a BookingEngine and a session store"""
+
+    def __init__(self, engine=None, store=None):
+        self.engine = engine or BookingEngine()
+        self.store = store or open_session_store(self.engine.config.get('SESSION_STORE', 'memory'))
+        # A session's lock lives only while a request for it is in flight
+        self._locks = weakref.WeakValueDictionary()
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _load(self, session_id):
+        session = await self._run(self.store.load, session_id, self.engine.new_chat)
+        if session is None:
+            raise HTTPError(404, f"unknown session {session_id}")
+        return session
+
+    def _turn(self, session, text):
+        reply = self.engine.handle_message(session, text)
+        self.engine.advance_state(session)
+        self.store.save(session)
+        return reply
+
+    def _cancel(self, session):
+        cancelled = self.engine.cancel_payment(session)
+        self.store.save(session)
+        return cancelled
+
+    def _poll(self, session):
+        payment = self.engine.poll_payment(session)
+        self.store.save(session)
+        return payment
+
+    def _find_bookings(self, booking_id, query):
+        ledger = self.engine.ledger()
+        if booking_id:
+            booking = ledger.get(booking_id)
+            if booking is None:
+                raise HTTPError(404, f"unknown booking {booking_id}")
+            return booking.to_dict()
+        if 'email' in query:
+            bookings = ledger.by_email(query['email'][0])
+        elif 'attraction' in query and 'date' in query:
+            bookings = ledger.by_visit(query['attraction'][0], query['date'][0], query.get('until', [None])[0])
+        else:
+            raise HTTPError(400, "give email, or attraction and date")
+        return {'bookings': [booking.to_dict() for booking in bookings]}
+
+    def _booking_qr(self, booking_id, token):
+        # Booking IDs can be guessed; the link token from the email cannot
+        if not check_qr_link_token(booking_id, token):
+            raise HTTPError(404, f"unknown booking {booking_id}")
+        booking = self.engine.ledger().get(booking_id)
+        if booking is None:
+            raise HTTPError(404, f"unknown booking {booking_id}")
+        return self.engine.ticket_qr(booking.to_dict())
+
+    async def dispatch(self, method, path, body, admin=False):
+        """Return (status, payload) where payload is a dict or PNG bytes; admin allows ledger lookups"""
+        path, _, query = path.partition('?')
+        parts = [part for part in path.split('/') if part]
+        if parts == ['health']:
+            return 200, {'ok': True}
+        if parts == ['metrics']:
+            return 200, metrics.render()
+        if parts and parts[0] == 'bookings' and len(parts) <= 3:
+            if method != 'GET':
+                raise HTTPError(405, "bookings are read-only")
+            if len(parts) == 3:
+                if parts[2] != 'qr':
+                    raise HTTPError(404, f"no route for {path}")
+                token = parse_qs(query).get('token', [None])[0]
+                return 200, await self._run(self._booking_qr, parts[1], token)
+            if not admin:
+                raise HTTPError(404, f"no route for {path}")
+            return 200, await self._run(self._find_bookings, parts[1] if len(parts) == 2 else None,
+                                        parse_qs(query))
+        if not parts or parts[0] != 'sessions':
+            raise HTTPError(404, f"no route for {path}")
+
+        if len(parts) == 1:
+            if method != 'POST':
+                raise HTTPError(405, "use POST to start a session")
+            session = self.engine.new_session()
+            await self._run(self.store.save, session)
+            return 201, session.to_dict(time.time())
+
+        route = tuple(parts[2:])
+        lock = self._locks.get(parts[1])
+        if lock is None:
+            lock = self._locks[parts[1]] = asyncio.Lock()
+        async with lock:
+            session = await self._load(parts[1])
+            if route == () and method == 'GET':
+                return 200, session.to_dict(time.time())
+            if route == ('messages',) and method == 'POST':
+                text = body.get('text') if isinstance(body, dict) else None
+                if not isinstance(text, str) or not text.strip():
+                    raise HTTPError(400, 'body must be {"text": "..."}')
+                reply = await self._run(self._turn, session, text)
+                state = session.to_dict(time.time())
+                return 200, {'reply': reply, 'state': state['state'],
+                             'booking': state['booking'], 'payment': state['payment']}
+            if route == ('payment',) and method == 'GET':
+                payment = await self._run(self._poll, session)
+                return 200, {'payment': payment.to_dict(time.time()) if payment else None}
+            if route == ('payment',) and method == 'DELETE':
+                cancelled = await self._run(self._cancel, session)
+                return 200, {'cancelled': cancelled}
+            if route == ('payment', 'card') and method == 'GET':
+                if session.payment is None:
+                    raise HTTPError(404, "no payment open for this session")
+                return 200, await self._run(self.engine.payment_card, session.payment.amount)
+        raise HTTPError(404, f"no route for {method} {path}")
+
+    async def handle_connection(self, reader, writer, admin=False):
+        """Serve keep-alive HTTP/1.1 requests on one connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+
+                started = time.perf_counter()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length > MAX_BODY_BYTES:
+                        raise HTTPError(413, 'request body too large')
+                    raw = await reader.readexactly(length) if length else b''
+                    try:
+                        body = json.loads(raw) if raw else None
+                    except ValueError:
+                        raise HTTPError(400, 'body is not valid JSON')
+                    status, payload = await self.dispatch(method.upper(), path, body, admin)
+                except HTTPError as error:
+                    status, payload = error.status, {'error': str(error)}
+                except Exception as error:
+                    log.error('api.request_failed', exc_info=True, method=method, path=path.split('?', 1)[0],
+                              error=str(error))
+                    status, payload = 500, {'error': 'internal error'}
+                REQUEST_SECONDS.observe(time.perf_counter() - started, method=method.upper(), status=status)
+
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        if isinstance(payload, bytes):
+            body, content_type = payload, 'image/png'
+        elif isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json'
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(host, port, api=None, admin_host='127.0.0.1', admin_port=None):
+    """Serve the public routes on host:port and, given admin_port, the admin listener too"""
+    api = api or BookingAPI()
+    servers = [await asyncio.start_server(api.handle_connection, host, port)]
+    if admin_port is not None:
+        servers.append(await asyncio.start_server(functools.partial(api.handle_connection, admin=True),
+                                                  admin_host, admin_port))
+    for listener, server in zip(('public', 'admin'), servers):
+        log.info('api.listening', listener=listener,
+                 address=', '.join(str(s.getsockname()) for s in server.sockets))
+    try:
+        await asyncio.gather(*(server.serve_forever() for server in servers))
+    finally:
+        for server in servers:
+            server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--admin-host', default='127.0.0.1', help='admin listener address (default: loopback)')
+    parser.add_argument('--admin-port', type=int, help='admin listener port for ledger lookups (default: off)')
+    parser.add_argument('--store', help='session store URL (default: SESSION_STORE or memory)')
+    args = parser.parse_args()
+    try:
+        # Refuse to take bookings whose tickets no other worker or gate could verify
+        signing_key()
+    except MissingSigningKey as e:
+        parser.exit(2, f"{parser.prog}: {e}\n")
+    api = BookingAPI(store=open_session_store(args.store) if args.store else None)
+    try:
+        asyncio.run(serve(args.host, args.port, api, args.admin_host, args.admin_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
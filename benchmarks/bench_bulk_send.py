@@ -0,0 +1,35 @@
+"""Benchmark bulk confirmation sending against a local SMTP sink.
+
+Usage: python benchmarks/bench_bulk_send.py [--bookings N] [--latency MS]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_email_dispatch import sample_booking
+from email_dispatch import send_bulk
+from email_service import EmailService
+from smtp_sink import SMTPSink
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bookings', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=5.0,
+                        help='simulated per-command SMTP latency in milliseconds')
+    args = parser.parse_args()
+
+    bookings = [(sample_booking(i), f'student{i}@school.test') for i in range(args.bookings)]
+    for sessions in (1, 2, 4):
+        sink = SMTPSink(latency=args.latency / 1000).start()
+        try:
+            result = send_bulk(EmailService(sink.config()), bookings, sessions=sessions)
+        finally:
+            sink.stop()
+        print(f"sessions={sessions}: {result.summary()}, {sink.connections} SMTP connections")
+
+
+if __name__ == '__main__':
+    main()
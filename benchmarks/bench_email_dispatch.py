@@ -0,0 +1,59 @@
+"""Benchmark email dispatch throughput against a local SMTP sink.
+
+Usage: python benchmarks/bench_email_dispatch.py [--messages N] [--latency MS]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_dispatch import EmailDispatcher
+from email_service import EmailService
+from smtp_sink import SMTPSink
+
+
+def sample_booking(i):
+    return {
+        'booking_id': f'TIXBENCH{i:08d}',
+        'customer_name': 'Bench User',
+        'city': 'Delhi',
+        'attraction': 'Red Fort',
+        'visit_date': '2026-11-02',
+        'ticket_count': '2 Adults',
+        'amount': 40,
+    }
+
+
+def run(workers, messages, latency):
+    sink = SMTPSink(latency=latency).start()
+    try:
+        dispatcher = EmailDispatcher(EmailService(sink.config()), workers=workers).start()
+        start = time.perf_counter()
+        jobs = [dispatcher.submit(sample_booking(i), f'user{i}@tixbee.test') for i in range(messages)]
+        for job in jobs:
+            job.wait()
+        elapsed = time.perf_counter() - start
+        dispatcher.shutdown()
+        failures = sum(1 for job in jobs if not job.success)
+        return messages / elapsed, sink.connections, failures
+    finally:
+        sink.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=5.0,
+                        help='simulated per-command SMTP latency in milliseconds')
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'msg/s':>9} {'connections':>12} {'failures':>9}")
+    for workers in (1, 4, 16):
+        rate, connections, failures = run(workers, args.messages, args.latency / 1000)
+        print(f"{workers:>7} {rate:>9.1f} {connections:>12} {failures:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark rendering confirmation emails.
+
+Times the compiled template (text and HTML bodies) on its own and the
+full message build (templates, headers and the pre-encoded MIME
+skeleton) with the QR attached and linked, against assembling the
+attached variant with email.mime objects. The QR PNG is a fixed image
+so the numbers cover rendering only; QR drawing is memoized per
+booking and benchmarked with the ticket QR engine.
+
+Usage: python benchmarks/bench_email_render.py [--emails N] [--qr PNG]
+"""
+import argparse
+import os
+import sys
+import time
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Linked QRs carry a link token signed with the ticket key
+os.environ.setdefault('TICKET_SIGNING_KEY', 'tixbee-bench-signing-key')
+
+from email_service import EmailService
+from email_template import INLINE_QR_CID, confirmation_subject, confirmation_template
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG = {'EMAIL_USERNAME': 'bench@tixbee.test', 'EMAIL_HOST': 'localhost', 'EMAIL_PORT': 25}
+
+
+class FixedQREmailService(EmailService):
+    def __init__(self, png, config=CONFIG):
+        super().__init__(config)
+        self.png = png
+
+    def generate_booking_qr(self, booking_details):
+        return self.png
+
+
+def booking(i):
+    return {
+        'booking_id': f'TIXBENCH{i:08d}',
+        'customer_name': 'Bench User',
+        'city': 'Delhi',
+        'attraction': 'Red Fort',
+        'visit_date': f'2026-11-{i % 28 + 1:02d}',
+        'ticket_count': '2 Adults, 1 Child',
+        'amount': 50,
+    }
+
+
+def mime_message(service, booking_details, recipient_email):
+    """The attached-QR message built from email.mime objects"""
+    text_content, html_content = confirmation_template.render(booking_details)
+    related = MIMEMultipart('related')
+    related.attach(MIMEText(html_content, 'html'))
+    image = MIMEImage(service.generate_booking_qr(booking_details))
+    image.add_header('Content-ID', f'<{INLINE_QR_CID}>')
+    related.attach(image)
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = confirmation_subject(booking_details)
+    msg['From'] = service.sender_email
+    msg['To'] = recipient_email
+    msg.attach(MIMEText(text_content, 'plain'))
+    msg.attach(related)
+    return msg.as_bytes()
+
+
+def timed(label, emails, build):
+    started = time.perf_counter()
+    size = 0
+    for i in range(emails):
+        size += len(build(i))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<26} {elapsed / emails * 1e6:8.1f} us/email  {size / emails / 1024:6.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--emails', type=int, default=20000)
+    # A rendered ticket QR is a 1-bit PNG of about a kilobyte
+    parser.add_argument('--qr', default=os.path.join(ROOT, 'assets', 'phonepe.png'),
+                        help='PNG to attach in place of the ticket QR')
+    args = parser.parse_args()
+
+    with open(args.qr, 'rb') as file:
+        png = file.read()
+    attached = FixedQREmailService(png)
+    linked = FixedQREmailService(png, dict(CONFIG, EMAIL_QR_URL='https://tixbee.test/bookings/{booking_id}/qr?token={token}'))
+    bookings = [booking(i) for i in range(args.emails)]
+
+    timed('templates (text + html)', args.emails,
+          lambda i: b''.join(part.encode('utf-8') for part in confirmation_template.render(bookings[i])))
+    timed('message, QR attached', args.emails,
+          lambda i: attached.build_message(bookings[i], f'user{i}@tixbee.test').as_bytes())
+    timed('message, QR linked', args.emails,
+          lambda i: linked.build_message(bookings[i], f'user{i}@tixbee.test').as_bytes())
+    timed('email.mime, QR attached', args.emails,
+          lambda i: mime_message(attached, bookings[i], f'user{i}@tixbee.test'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark offline gate verification throughput.
+
+Usage: python benchmarks/bench_gate_verify.py [--tickets N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gate_verify import GateVerifier
+from ticket_token import encode_ticket
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickets', type=int, default=50000)
+    args = parser.parse_args()
+
+    key = b'bench-signing-key'
+    start = time.perf_counter()
+    tokens = [
+        encode_ticket({
+            'booking_id': f'TIX{i:014d}',
+            'visit_date': '2026-11-02',
+            'ticket_count': '2 Adults, 1 Child',
+        }, key=key)
+        for i in range(args.tickets)
+    ]
+    encode_rate = args.tickets / (time.perf_counter() - start)
+
+    verifier = GateVerifier(key=key)
+    start = time.perf_counter()
+    accepted = sum(1 for token in tokens if verifier.scan(token).ok)
+    first_rate = args.tickets / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    rejected = sum(1 for token in tokens if not verifier.scan(token).ok)
+    repeat_rate = args.tickets / (time.perf_counter() - start)
+
+    print(f"token length: {len(tokens[0])} chars")
+    print(f"encode:       {encode_rate:,.0f} tokens/s")
+    print(f"first scan:   {first_rate:,.0f} scans/s ({accepted} accepted)")
+    print(f"repeat scan:  {repeat_rate:,.0f} scans/s ({rejected} rejected as redeemed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark ticket holds under contention and check that nothing oversells.
+
+Threads in several processes share one inventory database and race
+to hold tickets on a few slots; each successful hold is then confirmed,
+released or left to expire. Afterwards every slot must satisfy
+held + sold <= capacity, and sold must match the confirmed holds.
+
+Usage: python benchmarks/bench_inventory.py [--processes N] [--threads N] [--attempts N] [--capacity N]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_ids import BookingIdGenerator
+from inventory import Inventory, SoldOut
+
+SLOTS = [('Red Fort', '2026-11-02'), ('Qutub Minar', '2026-11-02'), ('Victoria Memorial', '2026-11-03')]
+
+
+def run_process(path, node, threads, attempts, queue):
+    inventory = Inventory(path, sweep_interval=0.2)
+    ids = BookingIdGenerator(node_id=node)
+    counts = {'held': 0, 'sold_out': 0}
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local_latencies = []
+        held = sold_out = 0
+        for _ in range(attempts):
+            attraction, visit_date = rng.choice(SLOTS)
+            booking_id = ids.next_id()
+            started = time.perf_counter()
+            try:
+                inventory.hold(booking_id, attraction, visit_date,
+                               {'adult': rng.randint(1, 3), 'child': rng.randint(0, 2)}, seconds=0.5)
+            except SoldOut:
+                sold_out += 1
+                local_latencies.append(time.perf_counter() - started)
+                continue
+            local_latencies.append(time.perf_counter() - started)
+            held += 1
+            outcome = rng.random()
+            if outcome < 0.6:
+                inventory.confirm(booking_id)
+            elif outcome < 0.9:
+                inventory.release(booking_id)
+            # else: abandoned, the hold expires
+        with lock:
+            counts['held'] += held
+            counts['sold_out'] += sold_out
+            latencies.extend(local_latencies)
+
+    workers = [threading.Thread(target=worker, args=(node * 1000 + n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    inventory.close()
+    queue.put((counts, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--attempts', type=int, default=1000, help='hold attempts per thread')
+    parser.add_argument('--capacity', type=int, default=2000, help='tickets per category per slot')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'inventory.db')
+        setup = Inventory(path, sweep_interval=0)
+        for attraction, visit_date in SLOTS:
+            for category in ('adult', 'child'):
+                setup.set_capacity(attraction, visit_date, category, args.capacity)
+        setup.close()
+
+        queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=run_process,
+                                             args=(path, node, args.threads, args.attempts, queue))
+                     for node in range(args.processes)]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        held = sum(counts['held'] for counts, _ in results)
+        sold_out = sum(counts['sold_out'] for counts, _ in results)
+        latencies = sorted(latency for _, process_latencies in results for latency in process_latencies)
+        attempts = held + sold_out
+        print(f"{attempts} hold attempts from {args.processes} processes x {args.threads} threads "
+              f"in {elapsed:.2f}s ({attempts / elapsed:.0f}/s)")
+        print(f"{held} held, {sold_out} sold out")
+        print(f"hold latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+
+        # Let every abandoned hold expire, then check the books
+        time.sleep(0.6)
+        final = Inventory(path, sweep_interval=0)
+        final.expire()
+        final.close()
+        db = sqlite3.connect(path)
+        failures = []
+        for attraction, visit_date, category, capacity, held_now, sold in db.execute('SELECT * FROM slots'):
+            confirmed = 0
+            for quantities, in db.execute("SELECT quantities FROM holds WHERE attraction = ? AND visit_date = ? "
+                                          "AND status = 'confirmed'", (attraction, visit_date)):
+                confirmed += json.loads(quantities).get(category, 0)
+            print(f"    {attraction:<18} {visit_date} {category:<6} capacity {capacity}  sold {sold}  held {held_now}")
+            if held_now + sold > capacity or held_now != 0 or sold != confirmed:
+                failures.append(f"{attraction} {visit_date} {category}: sold {sold}, held {held_now}, "
+                                f"confirmed holds {confirmed}, capacity {capacity}")
+        db.close()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            sys.exit(1)
+        print("OK: no slot oversold and every sold ticket has a confirmed hold")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark the booking ledger at a million rows.
+
+Loads synthetic bookings with batched inserts, then times point
+lookups by booking ID and by email, and range queries for one
+attraction on one visit date and over a week of visit dates.
+Query plans are printed so a missing index shows up as a SCAN.
+
+Usage: python benchmarks/bench_ledger.py [--rows N] [--queries N] [--batch N] [--db PATH]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_ids import BookingIdGenerator
+from catalog import ATTRACTIONS
+from ledger import Ledger
+
+FIRST_DAY = date(2026, 11, 1)
+DAYS = 90
+CUSTOMERS = 200_000
+
+
+def synthetic_bookings(count, sample_size, seed=1):
+    """Generator of count (booking_details, email) pairs, a random sample of them
+    and the time spent generating them"""
+    rng = random.Random(seed)
+    ids = BookingIdGenerator(node_id=1)
+    places = [(city, attraction.name) for city, attractions in ATTRACTIONS.items() for attraction in attractions]
+    sampled = set(rng.sample(range(count), min(sample_size, count)))
+    sample = []
+    generating = [0.0]
+
+    def bookings():
+        for n in range(count):
+            started = time.perf_counter()
+            booking = make_booking(rng, ids, places)
+            if n in sampled:
+                sample.append(booking)
+            generating[0] += time.perf_counter() - started
+            yield booking
+    return bookings(), sample, generating
+
+
+def make_booking(rng, ids, places):
+    adults, children = rng.randint(1, 4), rng.randint(0, 3)
+    city, attraction = rng.choice(places)
+    return {
+        'booking_id': ids.next_id(),
+        'customer_name': 'Guest',
+        'city': city,
+        'attraction': attraction,
+        'visit_date': (FIRST_DAY + timedelta(days=rng.randrange(DAYS))).isoformat(),
+        'ticket_count': f"{adults} Adults, {children} Children",
+        'amount': str(adults * 20 + children * 10),
+    }, f"guest{rng.randrange(CUSTOMERS)}@example.com"
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def timed(label, queries, run):
+    latencies = []
+    rows = 0
+    for args in queries:
+        started = time.perf_counter()
+        rows += len(run(*args))
+        latencies.append(time.perf_counter() - started)
+    print(f"{label:<28} p50 {percentile(latencies, 0.5) * 1e6:8.0f} us  "
+          f"p99 {percentile(latencies, 0.99) * 1e6:8.0f} us  "
+          f"{rows / len(queries):8.1f} rows/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=5000, help='rows per insert transaction')
+    parser.add_argument('--db', help='keep the ledger at this path instead of a temporary file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = Ledger(args.db or os.path.join(directory, 'ledger.db'))
+        bookings, sample, generating = synthetic_bookings(args.rows, args.queries)
+        started = time.perf_counter()
+        added = ledger.add_many(bookings, batch_size=args.batch)
+        elapsed = time.perf_counter() - started - generating[0]
+        print(f"inserted {added} bookings in {elapsed:.1f}s ({added / elapsed:,.0f} rows/s, "
+              f"batches of {args.batch}); ledger holds {ledger.count()}")
+
+        random.Random(2).shuffle(sample)
+        connection = ledger._connect()
+        for label, sql, params in (
+            ('id', 'SELECT * FROM bookings WHERE booking_id = ?', ('x',)),
+            ('email', 'SELECT * FROM bookings WHERE email = ?', ('x',)),
+            ('visit', 'SELECT * FROM bookings WHERE attraction = ? AND visit_date BETWEEN ? AND ?',
+             ('x', 'a', 'b')),
+        ):
+            plan = ' / '.join(row[-1] for row in connection.execute('EXPLAIN QUERY PLAN ' + sql, params))
+            print(f"plan {label:<6} {plan}")
+
+        timed('point: booking ID', [(details['booking_id'],) for details, _ in sample],
+              lambda booking_id: [ledger.get(booking_id)])
+        timed('point: email', [(email,) for _, email in sample], ledger.by_email)
+        timed('range: attraction + date', [(details['attraction'], details['visit_date']) for details, _ in sample],
+              ledger.by_visit)
+        week = [(details['attraction'], details['visit_date'],
+                 (date.fromisoformat(details['visit_date']) + timedelta(days=6)).isoformat())
+                for details, _ in sample]
+        timed('range: attraction + week', week, ledger.by_visit)
+
+        # Resending confirmations must not add rows
+        again = ledger.add_many(sample)
+        print(f"re-adding {len(sample)} sampled bookings added {again}")
+        ledger.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Run many concurrent chat sessions against the stub LLM backend.
+
+Every session shares one model from llm_client and streams its replies,
+so this measures per-session overhead without network access.
+
+Usage: python benchmarks/bench_llm_sessions.py [--sessions N] [--threads N] [--latency S]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_manager import build_system_instruction, prepare_prompt, prune_history
+from llm_client import get_model
+from llm_stream import StreamTiming, stream_segments
+
+SCRIPTS = [
+    ["Ananya", "Delhi", "a", "tomorrow", "2 adults, 1 child", "ananya@example.com"],
+    ["I'm Ravi", "bangalore", "lalbagh", "this sunday", "one adult and two kids", "ravi@example.com"],
+    ["Meera", "Kolkata", "d - Alipore", "next monday", "3 students", "meera@example.com"],
+    ["Sam", "Mumbai", "caves", "next friday", "1 adult", "sam@example.com"],
+]
+
+
+def run_session(model, script, timings):
+    chat = model.start_chat(history=[])
+    booking = {}
+    for user_text in script:
+        prune_history(chat)
+        timing = StreamTiming()
+        response = chat.send_message(prepare_prompt(user_text, booking), stream=True)
+        for _ in stream_segments(response, timing):
+            pass
+        timings.append(timing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sessions', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.05, help='simulated seconds per reply')
+    args = parser.parse_args()
+
+    os.environ['TIXBEE_STUB_LATENCY'] = str(args.latency)
+    instruction = build_system_instruction(datetime.now())
+    timings = []
+    pending = list(range(args.sessions))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                i = pending.pop()
+            run_session(get_model(instruction, backend='stub'), SCRIPTS[i % len(SCRIPTS)], timings)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    totals = sorted(timing.total for timing in timings)
+    print(f"{args.sessions} sessions, {len(timings)} turns in {elapsed:.2f}s "
+          f"({len(timings) / elapsed:.0f} turns/s)")
+    print(f"turn latency p50 {totals[len(totals) // 2] * 1000:.1f} ms, "
+          f"p99 {totals[int(len(totals) * 0.99)] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark locally answered booking steps.
+
+Usage: python benchmarks/bench_local_flow.py [--sessions N]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_flow import local_reply, new_flow_state
+
+WELCOME = "Would you like to start by telling me your name? 😊"
+SCRIPTS = [
+    ["Ananya", "Delhi", "a", "tomorrow", "2 adults, 1 child", "ananya@example.com"],
+    ["I'm Ravi", "bangalore", "lalbagh", "this sunday", "one adult and two kids", "ravi@example.com"],
+    ["Meera", "Kolkata", "d - Alipore", "2026-11-02", "3 students", "meera@example.com"],
+    ["Sam", "Mumbai", "caves", "next friday", "1 adult", "sam@example.com"],
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sessions', type=int, default=2000)
+    args = parser.parse_args()
+
+    today = date(2026, 10, 18)
+    local = fallback = 0
+    start = time.perf_counter()
+    for i in range(args.sessions):
+        state = new_flow_state()
+        last = WELCOME
+        for user_text in SCRIPTS[i % len(SCRIPTS)]:
+            reply = local_reply(user_text, last, state, today)
+            if reply is None:
+                fallback += 1
+                break
+            local += 1
+            last = reply
+    elapsed = time.perf_counter() - start
+    print(f"{local} turns answered locally, {fallback} fell back to the LLM")
+    print(f"{elapsed / max(local, 1) * 1e6:.1f} us per local turn")
+
+
+if __name__ == '__main__':
+    main()
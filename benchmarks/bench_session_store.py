@@ -0,0 +1,104 @@
+"""Benchmark session store reads and writes.
+
+Each simulated turn loads a session, appends a user and an assistant
+message and saves it, the same work the API server does per request.
+Load cost should not depend on how long the conversation is, since
+only the last messages are read back.
+
+Usage: python benchmarks/bench_session_store.py [--sessions N] [--turns N] [--threads N] [--history N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_engine import BookingSession
+from session_store import open_session_store
+
+REPLY = "Here are our ticket prices:\n" + "━" * 54 + "\n    Children:  ₹10 per ticket\n" * 3
+
+
+def seed(store, sessions, history):
+    ids = []
+    for _ in range(sessions):
+        session = BookingSession()
+        for i in range(history):
+            session.messages.append({"role": "user", "content": f"message {i}"})
+            session.messages.append({"role": "assistant", "content": REPLY})
+        session.booking_state.parsed_messages = len(session.messages)
+        store.save(session)
+        ids.append(session.session_id)
+    return ids
+
+
+def run_turns(store, ids, turns, threads):
+    loads, saves = [], []
+    lock = threading.Lock()
+
+    def worker(offset):
+        local_loads, local_saves = [], []
+        for i in range(offset, turns, threads):
+            started = time.perf_counter()
+            session = store.load(ids[i % len(ids)])
+            loaded = time.perf_counter()
+            session.messages.append({"role": "user", "content": f"turn {i}"})
+            session.messages.append({"role": "assistant", "content": REPLY})
+            session.flow['city'] = 'Delhi'
+            store.save(session)
+            local_loads.append(loaded - started)
+            local_saves.append(time.perf_counter() - loaded)
+        with lock:
+            loads.extend(local_loads)
+            saves.extend(local_saves)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return loads, saves, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sessions', type=int, default=500)
+    parser.add_argument('--turns', type=int, default=10000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--history', type=int, default=20, help='exchanges already stored per session')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for url in ('memory', f"sqlite:{os.path.join(directory, 'sessions.db')}"):
+            store = open_session_store(url)
+            ids = seed(store, args.sessions, args.history)
+            loads, saves, elapsed = run_turns(store, ids, args.turns, args.threads)
+            turns_per_session = args.turns / args.sessions
+            print(f"{url.split(':')[0]:<7} {args.turns / elapsed:8.0f} turns/s "
+                  f"({args.turns / elapsed / args.sessions:.1f} per session, "
+                  f"{turns_per_session:.0f} turns each)")
+            print(f"        load p50 {percentile(loads, 0.5) * 1e6:7.0f} us  p99 {percentile(loads, 0.99) * 1e6:7.0f} us")
+            print(f"        save p50 {percentile(saves, 0.5) * 1e6:7.0f} us  p99 {percentile(saves, 0.99) * 1e6:7.0f} us")
+
+            # Lazy history: a load costs the same for a short and a long conversation
+            for history in (1, 500):
+                session_id = seed(store, 1, history)[0]
+                started = time.perf_counter()
+                for _ in range(200):
+                    store.load(session_id)
+                print(f"        load with {history:>3} exchanges stored: "
+                      f"{(time.perf_counter() - started) / 200 * 1e6:7.0f} us")
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
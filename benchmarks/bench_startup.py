@@ -0,0 +1,141 @@
+"""Measure cold-start cost of the TixBee app.
+
+The module lists come from the source: everything tixbee.py imports at
+module level, followed through the project modules it loads, is the
+startup set; what those files import inside functions is the deferred
+set (first LLM turn, payment, confirmation email). Each module is
+imported alone in a fresh interpreter and timed with `python -X
+importtime`, counting only the imports made after the interpreter
+started, so shared dependencies are charged to every module that needs
+them and the per-module figures do not add up to the set totals. Then
+the time for a fresh process to run the script once (first render) with
+Streamlit's AppTest and the stub LLM backend.
+
+Usage: python benchmarks/bench_startup.py [--runs N]
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = 'tixbee.py'
+# Written to stderr just before the measured imports
+MARK = '--bench-startup--'
+
+FIRST_RENDER = """
+import time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file('tixbee.py', default_timeout=60).run()
+print(time.perf_counter() - started)
+"""
+
+
+def _imports(path):
+    """(module-level, in-function) third-party and project modules imported by a file"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    in_functions = {id(inner) for node in ast.walk(tree)
+                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                    for inner in ast.walk(node)}
+    top = _names(node for node in ast.walk(tree) if id(node) not in in_functions)
+    nested = _names(node for node in ast.walk(tree) if id(node) in in_functions)
+    return top, nested - top
+
+
+def _names(nodes):
+    names = set()
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+    return {name for name in names if name.split('.')[0] not in sys.stdlib_module_names}
+
+
+def _project_file(module):
+    path = os.path.join(ROOT, module.replace('.', os.sep) + '.py')
+    return path if os.path.exists(path) else None
+
+
+def app_modules(app=APP):
+    """(startup, deferred) modules: everything the app script loads at import time, and the rest"""
+    startup, deferred = _imports(os.path.join(ROOT, app))
+    # Follow project modules through their module-level imports
+    pending, seen = sorted(startup), set()
+    while pending:
+        module = pending.pop()
+        path = _project_file(module)
+        if module in seen or path is None:
+            continue
+        seen.add(module)
+        top, nested = _imports(path)
+        startup |= top
+        pending.extend(top)
+        deferred |= nested
+    return sorted(startup), sorted(deferred - startup)
+
+
+def import_time(modules):
+    """Cumulative import time in seconds of modules in a fresh interpreter.
+
+    Only imports made after the interpreter's own startup are counted,
+    so nothing needs subtracting.
+    """
+    code = f"import sys\nsys.stderr.write({MARK!r} + '\\n')\n" + ''.join(f"import {module}\n" for module in modules)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    lines = result.stderr.splitlines()
+    total = 0
+    for line in lines[lines.index(MARK) + 1:]:
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|')
+        if not name[1:].startswith(' '):
+            # Only top-level entries; nested ones are already in their parent's total
+            total += int(cumulative)
+    return total / 1e6
+
+
+def first_render_time():
+    env = dict(os.environ, TIXBEE_LLM_BACKEND='stub')
+    result = subprocess.run([sys.executable, '-c', FIRST_RENDER], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def best_of(runs, measure, *args):
+    return min(measure(*args) for _ in range(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per measurement (best is kept)')
+    args = parser.parse_args()
+
+    startup, deferred = app_modules()
+    for label, modules in (('startup imports', startup), ('deferred imports', deferred)):
+        try:
+            print(f"{label}: {best_of(args.runs, import_time, modules) * 1000:.0f} ms")
+        except RuntimeError as error:
+            print(f"{label}: failed ({error})")
+        for module in modules:
+            try:
+                print(f"    {module:<22} {best_of(args.runs, import_time, [module]) * 1000:7.1f} ms")
+            except RuntimeError as error:
+                print(f"    {module:<22} failed ({error})")
+
+    try:
+        print(f"first render: {best_of(args.runs, first_render_time) * 1000:.0f} ms")
+    except RuntimeError as error:
+        print(f"first render: failed ({error})")
+
+
+if __name__ == '__main__':
+    main()
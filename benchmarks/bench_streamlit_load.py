@@ -0,0 +1,461 @@
+"""Load-test one `streamlit run tixbee.py` worker with many concurrent users.
+
+The app is started with `streamlit run` (headless, on a free local
+port) and every simulated user is a client of that one server that
+speaks Streamlit's websocket protocol (BackMsg/ForwardMsg protobufs at
+/_stcore/stream) as the browser frontend does: it opens the page, types
+each booking step into the chat input after a think time, and while the
+payment window is open reruns the payment fragment at the interval the
+server asks for, until the page shows the outcome of the confirmation
+email. All sessions therefore share the worker's Streamlit runtime, its
+st.cache_resource engine, session store, reply and payment-card caches
+and email dispatcher. The clients are asyncio tasks of this process.
+
+Gemini is the stub backend (TIXBEE_LLM_BACKEND=stub) and email goes to
+the local SMTP sink; inventory, ledger, transcripts and sessions live
+in a temporary directory. PAYMENT_WINDOW_SECONDS shortens the payment
+window so a session finishes in seconds.
+
+The run steps through increasing numbers of concurrent users and
+reports, per step, sessions/s, the worker's CPU use and the latency of
+page reruns: chat turns (submit to script finished) and payment ticks
+(fragment reruns, including the full rerun the fragment triggers when
+the payment closes) separately. The saturation point is the last step
+that still added at least --min-gain percent of throughput and kept the
+rerun p99 within --p99-budget. Memory per session is measured on a
+fresh worker as the growth of its resident set over --memory-sessions
+sessions kept open at the payment step.
+
+Needs streamlit (and the app's other requirements) installed; the
+worker's memory and CPU are read from /proc, so Linux only.
+
+Usage: python benchmarks/bench_streamlit_load.py [--users 1,2,4,8,16,32] [--sessions-per-user N]
+           [--think MS] [--payment-window S] [--llm-latency S] [--smtp-latency MS]
+           [--store memory|sqlite] [--p99-budget MS] [--min-gain PCT] [--memory-sessions N]
+           [--out PATH] [--baseline PATH]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, datetime, timedelta
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+os.environ.setdefault('TICKET_SIGNING_KEY', 'tixbee-bench-signing-key')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import websockets
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from bench_suite import RESULTS_DIR, compare, environment, git_revision, load, summarize
+from smtp_sink import SMTPSink
+
+APP = os.path.join(ROOT, 'tixbee.py')
+RUN_TIMEOUT = 60  # seconds one page run may take
+START_TIMEOUT = 60  # seconds for the server to answer its health check
+
+USERS = [
+    ("Ananya", "Delhi", "a", "2 adults, 1 child"),
+    ("Ravi", "bangalore", "lalbagh", "one adult and two kids"),
+    ("Meera", "Kolkata", "d - Alipore", "3 students"),
+    ("Sam", "Mumbai", "caves", "1 adult"),
+]
+
+
+def booking_script(n, today):
+    """Chat messages of the n-th simulated user; visit dates are spread so no slot sells out"""
+    name, city, attraction, tickets = USERS[n % len(USERS)]
+    visit_date = (today + timedelta(days=1 + n % 60)).isoformat()
+    return [name, city, attraction, visit_date, tickets, f"{name.lower()}{n}@example.com"]
+
+
+def configure_app(directory, sink, args):
+    """Point the app at the stubs through the environment the server inherits"""
+    settings = {key: str(value) for key, value in sink.config().items()}
+    settings.update({
+        'TIXBEE_LLM_BACKEND': 'stub',
+        'TIXBEE_STUB_LATENCY': str(args.llm_latency),
+        'PAYMENT_WINDOW_SECONDS': str(args.payment_window),
+        'SESSION_STORE': 'memory' if args.store == 'memory' else f"sqlite:{os.path.join(directory, 'sessions.db')}",
+        'INVENTORY_DB': os.path.join(directory, 'inventory.db'),
+        'LEDGER_DB': os.path.join(directory, 'ledger.db'),
+        'TRANSCRIPT_DIR': os.path.join(directory, 'transcripts'),
+    })
+    os.environ.update(settings)
+
+
+class AppServer:
+    """`streamlit run tixbee.py` in a subprocess on a free local port"""
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.process = None
+        self.port = None
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def start(self):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        command = [sys.executable, '-m', 'streamlit', 'run', APP, '--server.headless', 'true',
+                   '--server.address', '127.0.0.1', '--server.port', str(self.port),
+                   '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false']
+        with open(self.log_path, 'ab') as log_file:
+            self.process = subprocess.Popen(command, cwd=ROOT, stdout=log_file, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"streamlit exited with {self.process.returncode}; see {self.log_path}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1) as response:
+                    if response.status == 200:
+                        return self
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"streamlit did not start within {START_TIMEOUT} s; see {self.log_path}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def memory_kib(self, field='VmRSS'):
+        """Resident set (or VmHWM, its peak) of the server in KiB"""
+        with open(f"/proc/{self.process.pid}/status") as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+        return 0
+
+    def cpu_seconds(self):
+        with open(f"/proc/{self.process.pid}/stat") as stat:
+            # Fields after the parenthesized command name; utime and stime are 14th and 15th
+            fields = stat.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+class AppClient:
+    """One browser tab: a websocket session that reruns the page as the frontend does"""
+
+    def __init__(self, url):
+        self.url = url
+        self.websocket = None
+        self.query_string = ''
+        self.page_script_hash = ''
+        self.chat_input_id = None
+        self.auto_rerun = None  # (interval, fragment ID) of the payment countdown while it runs
+        self.alerts = []  # (format, body) of the last full run
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None)
+        return self
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+
+    async def open(self):
+        seconds = await self._rerun()
+        for alert_format, body in self.alerts:
+            if alert_format == Alert.ERROR:
+                raise RuntimeError(body)
+        return seconds
+
+    async def send(self, text):
+        """Submit text in the chat input; returns the seconds until the run finished"""
+        return await self._rerun(chat=text)
+
+    async def tick(self):
+        """Rerun the payment fragment, as its run_every timer does"""
+        return await self._rerun(fragment_id=self.auto_rerun[1])
+
+    def outcome(self):
+        for alert_format, body in self.alerts:
+            if alert_format == Alert.SUCCESS:
+                return 'email_sent'
+            if body.startswith('Failed to send email'):
+                return 'email_failed'
+            if alert_format == Alert.ERROR:
+                return 'sold_out'
+        return 'no_payment'
+
+    async def _rerun(self, chat=None, fragment_id=None):
+        message = BackMsg()
+        state = message.rerun_script
+        state.query_string = self.query_string
+        state.page_script_hash = self.page_script_hash
+        if fragment_id:
+            state.fragment_id = fragment_id
+            state.is_auto_rerun = True
+        if chat is not None:
+            widget = state.widget_states.widgets.add()
+            widget.id = self.chat_input_id
+            widget.chat_input_value.data = chat
+        started = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        while True:
+            received = ForwardMsg()
+            received.ParseFromString(await asyncio.wait_for(self.websocket.recv(), RUN_TIMEOUT))
+            if self._handle(received):
+                return time.perf_counter() - started
+
+    def _handle(self, message):
+        """Track what the frontend would; True once the requested run (and any rerun it asked for) ended"""
+        kind = message.WhichOneof('type')
+        if kind == 'new_session':
+            self.page_script_hash = message.new_session.page_script_hash
+            if not message.new_session.fragment_ids_this_run:
+                # A full run redraws the page and its fragments register their timers again
+                self.auto_rerun = None
+                self.alerts = []
+        elif kind == 'page_info_changed':
+            self.query_string = message.page_info_changed.query_string
+        elif kind == 'auto_rerun':
+            self.auto_rerun = (message.auto_rerun.interval, message.auto_rerun.fragment_id)
+        elif kind == 'stop_auto_rerun':
+            self.auto_rerun = None
+        elif kind == 'delta' and message.delta.WhichOneof('type') == 'new_element':
+            element = message.delta.new_element
+            element_type = element.WhichOneof('type')
+            if element_type == 'chat_input':
+                self.chat_input_id = element.chat_input.id
+            elif element_type == 'alert':
+                self.alerts.append((element.alert.format, element.alert.body))
+            elif element_type == 'exception':
+                raise RuntimeError(f"{element.exception.type}: {element.exception.message}")
+        elif kind == 'script_finished':
+            return message.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN
+        return False
+
+
+class UserStats:
+    """Rerun latencies and session outcomes of one step"""
+
+    def __init__(self):
+        self.turns = []
+        self.ticks = []
+        self.sessions = []
+        self.outcomes = {}
+        self.errors = []
+
+    def add(self, seconds, outcome):
+        self.sessions.append(seconds)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def error(self, error):
+        self.errors.append(f"{type(error).__name__}: {error}")
+
+
+async def chat(client, script, think, turns):
+    """Open the page and send the booking messages, up to the booking summary"""
+    await client.connect()
+    await client.open()
+    for text in script:
+        await asyncio.sleep(think)
+        turns.append(await client.send(text))
+
+
+async def run_user(url, script, args, stats):
+    started = time.perf_counter()
+    client = AppClient(url)
+    try:
+        await chat(client, script, args.think / 1000, stats.turns)
+        deadline = time.monotonic() + args.payment_window + RUN_TIMEOUT
+        while client.auto_rerun and time.monotonic() < deadline:
+            await asyncio.sleep(client.auto_rerun[0])
+            stats.ticks.append(await client.tick())
+        outcome = 'timed_out' if client.auto_rerun else client.outcome()
+    finally:
+        await client.close()
+    stats.add(time.perf_counter() - started, outcome)
+
+
+async def run_step(server, users, args, first_user):
+    """users concurrent clients, each running args.sessions_per_user sessions one after another"""
+    stats = UserStats()
+    today = date.today()
+
+    async def user(index):
+        for k in range(args.sessions_per_user):
+            n = first_user + index * args.sessions_per_user + k
+            try:
+                await run_user(server.url, booking_script(n, today), args, stats)
+            except Exception as e:
+                stats.error(e)
+
+    cpu = server.cpu_seconds()
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+    cpu = server.cpu_seconds() - cpu
+
+    reruns = len(stats.turns) + len(stats.ticks)
+    step = {
+        'users': users,
+        'seconds': round(elapsed, 3),
+        'sessions': len(stats.sessions),
+        'sessions_per_second': round(len(stats.sessions) / elapsed, 3),
+        'reruns_per_second': round(reruns / elapsed, 1),
+        'server_cpu_percent': round(cpu / elapsed * 100, 1),
+        'outcomes': stats.outcomes,
+        'errors': len(stats.errors),
+    }
+    if stats.turns:
+        step['turn'] = summarize(stats.turns, 1e3)
+    if stats.ticks:
+        step['tick'] = summarize(stats.ticks, 1e3)
+    if stats.turns or stats.ticks:
+        step['rerun'] = summarize(stats.turns + stats.ticks, 1e3)
+    if stats.errors:
+        step['first_error'] = stats.errors[0]
+    return step
+
+
+def saturation(steps, p99_budget, min_gain):
+    """Users at the last step that added throughput within the latency budget, and why it stopped"""
+    best = None
+    for step in steps:
+        p99 = step.get('rerun', {}).get('p99_ms')
+        if step['errors']:
+            return best, f"errors at {step['users']} users"
+        if p99 is None or p99 > p99_budget:
+            return best, f"rerun p99 {p99} ms over the {p99_budget:g} ms budget at {step['users']} users"
+        if best is not None:
+            gain = (step['sessions_per_second'] / best['sessions_per_second'] - 1) * 100
+            if gain < min_gain:
+                return best, f"throughput grew {gain:.0f}% from {best['users']} to {step['users']} users"
+        best = step
+    return best, "not reached; try more users"
+
+
+async def measure_memory(server, count):
+    """Resident memory per session: count sessions are opened and left at the payment step"""
+    today = date.today()
+    clients = [AppClient(server.url)]
+    try:
+        # Imports, caches and the engine are not per session
+        await chat(clients[0], booking_script(10 ** 6, today), 0, [])
+        before = server.memory_kib()
+        for n in range(count):
+            clients.append(AppClient(server.url))
+            await chat(clients[-1], booking_script(10 ** 6 + 1 + n, today), 0, [])
+        after = server.memory_kib()
+    finally:
+        for client in clients:
+            await client.close()
+    return {
+        'sessions': count,
+        'per_session_kib': round((after - before) / count, 1),
+        'server_rss_mib': round(after / 1024, 1),
+    }
+
+
+async def run(args, levels, directory, results):
+    server = AppServer(os.path.join(directory, 'streamlit.log')).start()
+    try:
+        steps = []
+        first_user = 0
+        for users in levels:
+            step = await run_step(server, users, args, first_user)
+            first_user += users * args.sessions_per_user
+            steps.append(step)
+            rerun = step.get('rerun', {})
+            print(f"{users:>4} users: {step['sessions_per_second']:7.2f} sessions/s "
+                  f"{step['reruns_per_second']:7.1f} reruns/s  rerun p50 {rerun.get('p50_ms', 0):8.1f} ms "
+                  f"p99 {rerun.get('p99_ms', 0):8.1f} ms  cpu {step['server_cpu_percent']:5.1f}%  {step['outcomes']}"
+                  + (f"  {step['errors']} errors, first: {step['first_error']}" if step['errors'] else ''))
+        results['peak_server_rss_mib'] = round(server.memory_kib('VmHWM') / 1024, 1)
+    finally:
+        server.stop()
+    # Keyed by users so that runs can be compared step by step
+    results['steps'] = {f"users_{step['users']}": step for step in steps}
+    best, reason = saturation(steps, args.p99_budget, args.min_gain)
+    results['saturation'] = {
+        'users': best['users'] if best else None,
+        'sessions_per_second': best['sessions_per_second'] if best else None,
+        'reason': reason,
+    }
+    print(f"saturation: {results['saturation']['users']} concurrent users ({reason})")
+
+    if args.memory_sessions:
+        server = AppServer(os.path.join(directory, 'streamlit-memory.log')).start()
+        try:
+            memory = results['memory'] = await measure_memory(server, args.memory_sessions)
+        finally:
+            server.stop()
+        print(f"memory: {memory['per_session_kib']:.1f} KiB per session, "
+              f"{memory['server_rss_mib']:.1f} MiB resident with {memory['sessions']} sessions open")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', default='1,2,4,8,16,32', help='comma separated concurrent users per step')
+    parser.add_argument('--sessions-per-user', type=int, default=3)
+    parser.add_argument('--think', type=float, default=500.0, help='ms a user waits before each message')
+    parser.add_argument('--payment-window', type=float, default=2.0, help='payment window in seconds')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='simulated seconds per stub LLM reply')
+    parser.add_argument('--smtp-latency', type=float, default=20.0, help='simulated ms per SMTP command')
+    parser.add_argument('--store', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--p99-budget', type=float, default=1000.0, help='highest acceptable rerun p99 in ms')
+    parser.add_argument('--min-gain', type=float, default=10.0,
+                        help='percent more sessions/s a step must add to count as unsaturated')
+    parser.add_argument('--memory-sessions', type=int, default=50, help='sessions for the memory measurement; 0 skips it')
+    parser.add_argument('--out', help=f'results file (default: {os.path.relpath(RESULTS_DIR, ROOT)}/'
+                                      'streamlit-<time>-<revision>.json)')
+    parser.add_argument('--baseline', help='earlier results file to compare this run with')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change reported as a regression')
+    args = parser.parse_args()
+    levels = [int(users) for users in args.users.split(',') if users.strip()]
+
+    results = {}
+    sink = SMTPSink(latency=args.smtp_latency / 1000).start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            configure_app(directory, sink, args)
+            asyncio.run(run(args, levels, directory, results))
+    finally:
+        sink.stop()
+
+    revision = git_revision()
+    report = {
+        'version': 1,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': revision,
+        'config': {key: value for key, value in vars(args).items() if key not in ('out', 'baseline', 'threshold')},
+        'environment': environment(),
+        'results': results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"streamlit-{datetime.now():%Y%m%d-%H%M%S}-{revision or 'unknown'}.json")
+    directory = os.path.dirname(out)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(out, 'w') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+        file.write('\n')
+    print(f"results written to {out}")
+
+    if args.baseline:
+        return 1 if compare(load(args.baseline), report, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
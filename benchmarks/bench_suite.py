@@ -0,0 +1,482 @@
+"""End-to-end benchmark suite with local stand-ins for Gemini and SMTP.
+
+Stage benchmarks time one step of the booking flow per call on fresh
+inputs, so caches in front of a stage do not hide its cost:
+
+    qr        entry QR for a new booking (matrix and PNG)
+    card      UPI payment card for a new amount
+    extract   booking fields parsed from a summary message
+    template  text and HTML confirmation bodies
+    message   full confirmation email (linked QR), ready for SMTP
+    send      one message over an open SMTP connection to the sink
+
+The session benchmark runs whole bookings through BookingEngine from
+several threads, the way api_server does: every turn loads the
+session from the store, replies, and saves it; then the payment is
+polled until its confirmation email has gone to the sink. The model is
+fake_gemini's scripted chat, the reply cache is off unless asked for,
+and inventory, ledger, transcripts and sessions live in a temporary
+directory. Per-stage time inside the sessions comes from the
+tixbee_stage_seconds histogram.
+
+Stages whose dependencies are missing (qrcode, Pillow) are recorded as
+skipped. Results are written as JSON; --baseline compares the run
+with an earlier file and --diff compares two files without running.
+
+Usage: python benchmarks/bench_suite.py [--quick] [--only STAGE,...] [--sessions N] [--threads N]
+                                        [--llm-latency S] [--smtp-latency MS] [--out PATH] [--baseline PATH]
+       python benchmarks/bench_suite.py --diff OLD.json NEW.json [--threshold PCT]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+# A fixed key keeps ticket tokens, and so QR sizes, the same from run to run
+os.environ.setdefault('TICKET_SIGNING_KEY', 'tixbee-bench-signing-key')
+
+from booking_engine import BookingEngine
+from booking_ids import BookingIdGenerator
+from booking_state import parse_booking_message
+from catalog import ATTRACTIONS
+from email_service import EmailService
+from email_template import confirmation_template
+from fake_gemini import ScriptedModel, booking_summary, conversations, scripted_replies
+from inventory import Inventory
+from ledger import Ledger
+from response_cache import ResponseCache
+from session_store import open_session_store
+from smtp_sink import SMTPSink
+from telemetry import STAGE_SECONDS, configure_logging, metrics
+from transcript_store import TranscriptStore
+
+RESULTS_VERSION = 1
+RESULTS_DIR = os.path.join(BENCHMARKS, 'results')
+STAGES = ('qr', 'card', 'extract', 'template', 'message', 'send')
+QR_URL = 'https://tixbee.test/bookings/{booking_id}/qr?token={token}'
+# Enough tickets that no benchmark booking sells out
+CAPACITY = {'adult': 10 ** 9, 'student': 10 ** 9, 'child': 10 ** 9}
+
+
+class NoCache:
+    """Reply cache that never hits, so every model turn reaches the model"""
+
+    def get(self, key):
+        return None
+
+    def put(self, key, reply_text, booking=None):
+        pass
+
+
+class ScriptedEngine(BookingEngine):
+    """BookingEngine whose sessions talk to a scripted model"""
+
+    def __init__(self, model, **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+
+    def new_chat(self):
+        return self.model.start_chat(history=[])
+
+
+def sample_bookings(count, seed=1):
+    rng = random.Random(seed)
+    ids = BookingIdGenerator(node_id=1)
+    places = [(city, attraction.name) for city, attractions in ATTRACTIONS.items() for attraction in attractions]
+    bookings = []
+    for n in range(count):
+        city, attraction = rng.choice(places)
+        adults, children = rng.randint(1, 4), rng.randint(0, 3)
+        bookings.append({
+            'booking_id': ids.next_id(),
+            'customer_name': f'Guest {n}',
+            'city': city,
+            'attraction': attraction,
+            'visit_date': f'2026-11-{rng.randint(1, 30):02d}',
+            'ticket_count': f"{adults} Adults, {children} Children",
+            'amount': adults * 20 + children * 10,
+        })
+    return bookings
+
+
+def summarize(latencies, scale=1e6):
+    """Count and latency percentiles; scale 1e6 gives microseconds, 1e3 milliseconds"""
+    ordered = sorted(latencies)
+    unit = 'us' if scale == 1e6 else 'ms'
+
+    def at(fraction):
+        return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * scale, 2)
+    return {
+        'ops': len(ordered),
+        f'mean_{unit}': round(sum(ordered) / len(ordered) * scale, 2),
+        f'p50_{unit}': at(0.5),
+        f'p99_{unit}': at(0.99),
+    }
+
+
+def measure(run, inputs, repeat, warmup=20):
+    """Time run(item) per item; of several passes keep the one with the lowest median"""
+    for item in inputs[:warmup]:
+        run(item)
+    best = None
+    for _ in range(repeat):
+        latencies = []
+        for item in inputs:
+            started = time.perf_counter()
+            run(item)
+            latencies.append(time.perf_counter() - started)
+        result = summarize(latencies)
+        result['per_second'] = round(len(latencies) / sum(latencies), 1)
+        if best is None or result['p50_us'] < best['p50_us']:
+            best = result
+    return best
+
+
+def bench_qr(bookings, args, sink):
+    from ticket_qr import TicketQREngine
+
+    # Nothing is kept, so every booking is drawn from scratch
+    engine = TicketQREngine(maxsize=0)
+    return measure(lambda details: engine.render(details, 'png'), bookings, args.repeat)
+
+
+def bench_card(bookings, args, sink):
+    from payment_card import PaymentCardRenderer
+
+    renderer = PaymentCardRenderer()
+    # Amounts are unique so the per-amount cache is not involved; the static layer is
+    return measure(renderer.render, list(range(100, 100 + len(bookings))), args.repeat)
+
+
+def bench_extract(bookings, args, sink):
+    today = date.today()
+    summaries = [booking_summary(details['city'], details['attraction'], today.isoformat(),
+                                 f"{n % 4 + 1} adults, {n % 3} kids", f'guest{n}@example.com')
+                 for n, details in enumerate(bookings)]
+    return measure(parse_booking_message, summaries, args.repeat)
+
+
+def bench_template(bookings, args, sink):
+    return measure(confirmation_template.render, bookings, args.repeat)
+
+
+def bench_message(bookings, args, sink):
+    service = EmailService(dict(sink.config(), EMAIL_QR_URL=QR_URL))
+    return measure(lambda details: service.build_message(details, 'guest@example.com'), bookings, args.repeat)
+
+
+def bench_send(bookings, args, sink):
+    service = EmailService(dict(sink.config(), EMAIL_QR_URL=QR_URL))
+    messages = [service.build_message(details, 'guest@example.com') for details in bookings]
+    server = service.connect()
+    try:
+        return measure(lambda message: message.send(server), messages, args.repeat)
+    finally:
+        server.quit()
+
+
+def run_stages(names, args, sink):
+    bookings = sample_bookings(args.ops)
+    results = {}
+    for name in names:
+        try:
+            results[name] = globals()[f'bench_{name}'](bookings, args, sink)
+        except ImportError as e:
+            results[name] = {'skipped': str(e)}
+        print(f"  {name:<10} {format_result(results[name])}")
+    return results
+
+
+def available(module):
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def stage_totals():
+    return {labels[0]: totals for labels, totals in STAGE_SECONDS.totals().items()}
+
+
+def turn_sources():
+    counter = metrics.get('tixbee_turns_total')
+    return {labels[0]: count for labels, count in counter.totals().items()} if counter else {}
+
+
+def run_session(engine, store, script, cards, turn_latencies):
+    session = engine.new_session()
+    store.save(session)
+    session_id = session.session_id
+    for user_text, _ in script:
+        started = time.perf_counter()
+        session = store.load(session_id, engine.new_chat)
+        for kind, _ in engine.reply(session, user_text):
+            if kind == 'marker' and cards and session.payment is not None:
+                engine.payment_card(session.payment.amount)
+        engine.advance_state(session)
+        store.save(session)
+        turn_latencies.append(time.perf_counter() - started)
+    while True:
+        session = store.load(session_id, engine.new_chat)
+        payment = engine.poll_payment(session)
+        store.save(session)
+        if payment is None or payment.done:
+            return payment
+        time.sleep(0.001)
+
+
+def run_sessions(args, sink):
+    scripts = conversations(date.today())
+    # The payment card and the attached entry QR both need qrcode and Pillow
+    drawing = available('qrcode') and available('PIL')
+    config = dict(sink.config())
+    if not drawing:
+        # Without qrcode the entry QR cannot be drawn, so the email links it
+        config['EMAIL_QR_URL'] = QR_URL
+
+    with tempfile.TemporaryDirectory() as directory:
+        transcripts = TranscriptStore(os.path.join(directory, 'transcripts'))
+        inventory = Inventory(os.path.join(directory, 'inventory.db'), default_capacity=CAPACITY)
+        ledger = Ledger(os.path.join(directory, 'ledger.db'))
+        store = open_session_store('memory' if args.store == 'memory'
+                                   else f"sqlite:{os.path.join(directory, 'sessions.db')}")
+        model = ScriptedModel(scripted_replies(scripts), latency=args.llm_latency)
+        engine = ScriptedEngine(model, config=config, cache=ResponseCache() if args.reply_cache else NoCache(),
+                                transcripts=transcripts, payment_window=0, inventory=inventory, ledger=ledger)
+
+        turn_latencies = []
+        session_latencies = []
+        outcomes = {}
+        pending = list(range(args.sessions))
+        lock = threading.Lock()
+        stages_before = stage_totals()
+        turns_before = turn_sources()
+        messages_before = sink.messages
+
+        def worker():
+            turns = []
+            while True:
+                with lock:
+                    if not pending:
+                        break
+                    n = pending.pop()
+                started = time.perf_counter()
+                payment = run_session(engine, store, scripts[n % len(scripts)], drawing, turns)
+                elapsed = time.perf_counter() - started
+                if payment is None:
+                    outcome = 'no_payment'
+                elif payment.email_status is None:
+                    outcome = 'unavailable' if payment.unavailable else 'unknown'
+                else:
+                    outcome = 'email_sent' if payment.email_status[0] else 'email_failed'
+                with lock:
+                    session_latencies.append(elapsed)
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            with lock:
+                turn_latencies.extend(turns)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        engine.dispatcher().shutdown()
+        transcripts.close()
+        inventory.close()
+        ledger.close()
+
+    turns_after = turn_sources()
+    stages = {}
+    for stage, (count, seconds) in sorted(stage_totals().items()):
+        count_before, seconds_before = stages_before.get(stage, (0, 0.0))
+        if count > count_before:
+            stages[stage] = {'count': count - count_before,
+                             'mean_ms': round((seconds - seconds_before) / (count - count_before) * 1e3, 3)}
+    return {
+        'sessions': args.sessions,
+        'threads': args.threads,
+        'seconds': round(elapsed, 3),
+        'sessions_per_second': round(args.sessions / elapsed, 1),
+        'turns_per_second': round(len(turn_latencies) / elapsed, 1),
+        'session': summarize(session_latencies, 1e3),
+        'turn': summarize(turn_latencies, 1e3),
+        'turn_sources': {source: value - turns_before.get(source, 0) for source, value in turns_after.items()},
+        'model_calls': model.calls,
+        'outcomes': outcomes,
+        'emails_received': sink.messages - messages_before,
+        'qr': 'attached' if drawing else 'linked',
+        'payment_cards': drawing,
+        'stages': stages,
+    }
+
+
+def format_result(result):
+    if 'skipped' in result:
+        return f"skipped ({result['skipped']})"
+    return (f"{result['per_second']:>10,.0f} ops/s  mean {result['mean_us']:9.1f} us  "
+            f"p50 {result['p50_us']:9.1f} us  p99 {result['p99_us']:9.1f} us")
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'qrcode': available('qrcode'),
+        'pillow': available('PIL'),
+    }
+
+
+# Metrics compared between runs and which direction is better
+def _direction(key):
+    if key.endswith('per_second'):
+        return 1
+    if key.endswith(('_us', '_ms', '_kib', '_mib')):
+        return -1
+    return 0
+
+
+def flatten(results, prefix=''):
+    values = {}
+    for key, value in results.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            values.update(flatten(value, path + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and _direction(key):
+            values[path] = value
+    return values
+
+
+def compare(old, new, threshold):
+    """Print metric changes between two result files; returns the regressed metrics"""
+    print(f"comparing {old.get('revision')} ({old.get('created')}) -> {new.get('revision')} ({new.get('created')})")
+    for section in ('config', 'environment'):
+        if old.get(section) != new.get(section):
+            print(f"  note: {section} differs: {old.get(section)} vs {new.get(section)}")
+    before, after = flatten(old.get('results', {})), flatten(new.get('results', {}))
+    regressions = []
+    for path in sorted(set(before) & set(after)):
+        if not before[path]:
+            continue
+        change = (after[path] - before[path]) / before[path] * 100
+        worse = -change * _direction(path.rsplit('.', 1)[-1]) > threshold
+        better = change * _direction(path.rsplit('.', 1)[-1]) > threshold
+        mark = 'REGRESSION' if worse else 'improved' if better else ''
+        if worse:
+            regressions.append(path)
+        print(f"  {path:<40} {before[path]:>12,.2f} {after[path]:>12,.2f} {change:+8.1f}%  {mark}")
+    for path in sorted(set(before) ^ set(after)):
+        print(f"  {path:<40} only in {'old' if path in before else 'new'} run")
+    print(f"{len(regressions)} regression(s) beyond {threshold:g}%")
+    return regressions
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', default=','.join(STAGES + ('sessions',)),
+                        help='comma separated stages to run; "sessions" is the session benchmark')
+    parser.add_argument('--ops', type=int, default=2000, help='inputs per stage benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='passes per stage; the fastest median is kept')
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--store', choices=('memory', 'sqlite'), default='sqlite')
+    parser.add_argument('--reply-cache', action='store_true', help='let repeated model turns hit the reply cache')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='simulated seconds per model reply')
+    parser.add_argument('--smtp-latency', type=float, default=0.0, help='simulated ms per SMTP command')
+    parser.add_argument('--quick', action='store_true', help='small counts, for a smoke test')
+    parser.add_argument('--out', help=f'results file (default: {os.path.relpath(RESULTS_DIR, ROOT)}/<time>-<revision>.json)')
+    parser.add_argument('--baseline', help='earlier results file to compare this run with')
+    parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'), help='compare two results files and exit')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change reported as a regression')
+    args = parser.parse_args()
+
+    if args.diff:
+        return 1 if compare(load(args.diff[0]), load(args.diff[1]), args.threshold) else 0
+
+    if args.quick:
+        args.ops, args.repeat, args.sessions = min(args.ops, 200), 1, min(args.sessions, 20)
+    only = [name.strip() for name in args.only.split(',') if name.strip()]
+    unknown = set(only) - set(STAGES) - {'sessions'}
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    args.only = only
+    stages = [name for name in only if name != 'sessions']
+    # Keep the per-booking info lines out of the timings and the output
+    configure_logging('WARNING')
+
+    results = {}
+    sink = SMTPSink(latency=args.smtp_latency / 1000).start()
+    try:
+        if stages:
+            print(f"stages ({args.ops} inputs, best of {args.repeat}):")
+            results['stages'] = run_stages(stages, args, sink)
+        if 'sessions' in only:
+            print(f"sessions ({args.sessions} over {args.threads} threads, {args.store} store):")
+            sessions = results['sessions'] = run_sessions(args, sink)
+            print(f"  {sessions['sessions_per_second']:,.1f} sessions/s, {sessions['turns_per_second']:,.1f} turns/s; "
+                  f"session p50 {sessions['session']['p50_ms']:.1f} ms p99 {sessions['session']['p99_ms']:.1f} ms; "
+                  f"turn p50 {sessions['turn']['p50_ms']:.2f} ms p99 {sessions['turn']['p99_ms']:.2f} ms")
+            print(f"  turns by source {sessions['turn_sources']}, outcomes {sessions['outcomes']}, "
+                  f"QR {sessions['qr']}")
+            for stage, stats in sessions['stages'].items():
+                print(f"    {stage:<16} {stats['count']:>7} x {stats['mean_ms']:9.3f} ms")
+    finally:
+        sink.stop()
+
+    revision = git_revision()
+    report = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': revision,
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('out', 'baseline', 'diff', 'threshold')},
+        'environment': environment(),
+        'results': results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{revision or 'unknown'}.json")
+    directory = os.path.dirname(out)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(out, 'w') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+        file.write('\n')
+    print(f"results written to {out}")
+
+    if args.baseline:
+        return 1 if compare(load(args.baseline), report, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
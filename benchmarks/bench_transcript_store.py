@@ -0,0 +1,62 @@
+"""Benchmark per-turn transcript write cost as conversations grow.
+
+Compares the old approach (rewrite the whole history as indented JSON
+every turn) with the append-only TranscriptStore.
+
+Usage: python benchmarks/bench_transcript_store.py [--turns N] [--legacy-turns N]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript_store import TranscriptStore, iter_turns
+
+BOT_RESPONSE = "Here are our ticket prices:\n" + "━" * 50 + "\n    Children:  ₹10 per ticket\n" * 4
+
+
+def report(label, timings, window):
+    first = sum(timings[:window]) / window * 1e6
+    last = sum(timings[-window:]) / window * 1e6
+    print(f"{label:<8} first {window}: {first:>9.1f} us/turn   last {window}: {last:>9.1f} us/turn")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--turns', type=int, default=20000)
+    parser.add_argument('--legacy-turns', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Legacy: json.dump of the whole history on every turn
+        history = []
+        legacy_path = os.path.join(directory, 'conversation_history.json')
+        timings = []
+        for i in range(args.legacy_turns):
+            start = time.perf_counter()
+            history.append({'user_message': f'turn {i}', 'bot_response': BOT_RESPONSE, 'timestamp': 'now'})
+            with open(legacy_path, 'w') as file:
+                json.dump(history, file, indent=4)
+            timings.append(time.perf_counter() - start)
+        report('legacy', timings, min(500, args.legacy_turns // 2))
+
+        store = TranscriptStore(os.path.join(directory, 'transcripts'))
+        timings = []
+        for i in range(args.turns):
+            start = time.perf_counter()
+            store.append(f'session-{i % 50}', f'turn {i}', BOT_RESPONSE)
+            timings.append(time.perf_counter() - start)
+        store.close()
+        report('append', timings, min(1000, args.turns // 2))
+
+        start = time.perf_counter()
+        count = sum(1 for _ in iter_turns(os.path.join(directory, 'transcripts')))
+        print(f"streamed {count} turns back in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
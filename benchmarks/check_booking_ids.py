@@ -0,0 +1,71 @@
+"""Concurrency check for the booking ID generator.
+
+Creates IDs from many threads sharing one generator, then checks that
+none repeat, that each thread saw them strictly increasing, and that
+they round-trip through encode_id/decode_id. Exits non-zero on failure.
+
+Usage: python benchmarks/check_booking_ids.py [--ids N] [--threads N]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_ids import BookingIdGenerator, decode_id, encode_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ids', type=int, default=2_000_000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    generator = BookingIdGenerator(node_id=7)
+    per_thread = args.ids // args.threads
+    results = [None] * args.threads
+    barrier = threading.Barrier(args.threads + 1)
+
+    def worker(n):
+        next_value = generator.next_value
+        barrier.wait()
+        results[n] = [next_value() for _ in range(per_thread)]
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = per_thread * args.threads
+    failures = []
+    unique = set()
+    for values in results:
+        unique.update(values)
+        if any(a >= b for a, b in zip(values, values[1:])):
+            failures.append("IDs were not strictly increasing within a thread")
+    if len(unique) != total:
+        failures.append(f"{total - len(unique)} duplicate IDs")
+    for value in results[0][:1000]:
+        booking_id = encode_id(value)
+        _, node, _ = decode_id(booking_id)
+        if node != 7 or len(booking_id) != 16:
+            failures.append(f"bad round trip for {booking_id}")
+            break
+
+    print(f"{total} IDs from {args.threads} threads in {elapsed:.2f}s ({total / elapsed:,.0f} IDs/s)")
+    print(f"first {encode_id(min(unique))}  last {encode_id(max(unique))}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: all IDs unique and ordered")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Scripted stand-in for Gemini chats.
+
+ScriptedModel answers each user message with the reply a conversation
+script gives for it, streamed in chunks like the SDK response (it
+reuses the stub backend's response and usage objects). Messages the
+script has no reply for get the stub's fallback reply. Unlike the stub
+backend, which answers with the local booking flow, this lets a
+benchmark replay turns the local flow cannot handle: small talk, an
+off-menu city description, or a booking summary written by the model.
+
+conversations(today) gives scripts of (user text, model reply) turns;
+a reply of None marks a turn the local flow answers, so it never
+reaches the model.
+"""
+import os
+import sys
+import threading
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import format_attraction_list, match_attraction, parse_quantities, price_breakdown
+from llm_client import STUB_FALLBACK, StubResponse
+from llm_stream import QR_MARKER
+from local_flow import RULE
+
+
+class ScriptedChat:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, stream=False):
+        # prepare_prompt puts its notes first and the user's text after a blank line
+        user_text = content.rsplit('\n\n', 1)[-1]
+        reply = self.model.replies.get(user_text, STUB_FALLBACK)
+        self.model.count()
+        self.history.append({'role': 'user', 'parts': [content]})
+        self.history.append({'role': 'model', 'parts': [reply]})
+        prompt_chars = sum(len(c['parts'][0]) for c in self.history[:-1] if isinstance(c, dict))
+        return StubResponse(reply, prompt_chars, latency=self.model.latency, chunk_size=self.model.chunk_size)
+
+
+class ScriptedModel:
+    """Shared model of scripted replies; latency is spread over the streamed chunks"""
+
+    def __init__(self, replies, latency=0.0, chunk_size=24):
+        self.replies = dict(replies)
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.calls += 1
+
+    def start_chat(self, history=None):
+        return ScriptedChat(self, history)
+
+
+def booking_summary(city, attraction, visit_date, tickets, email):
+    """A booking summary as the model writes it, in the layout the system prompt asks for"""
+    items, total = price_breakdown(parse_quantities(tickets))
+    booked = '\n'.join(f"        • {count} {label} tickets" for label, count, _, _ in items)
+    return (f"Thank you for providing your email! Here's your booking summary: 📋\n\n"
+            f"Booking Details:\n{RULE}\n\n"
+            f"    🌆 City: {city}\n"
+            f"    🏰 Attraction: {match_attraction(city, attraction).name}\n"
+            f"    📅 Visit Date: {visit_date}\n\n"
+            f"    🎟️ Tickets Booked:\n{booked}\n\n"
+            f"    💰 Total Amount: ₹{total}\n"
+            f"    📧 Contact Email: {email}\n"
+            f"    🔢 Booking Reference: PENDING\n\n"
+            f"    📱 Scan QR code to pay:\n"
+            f"    {QR_MARKER}\n\n"
+            f"{RULE}\n")
+
+
+def conversations(today):
+    """Booking conversations that end in a summary, with the model's share of the turns"""
+    visit_date = (today + timedelta(days=30)).isoformat()
+    return [
+        # Every step answered locally
+        [("Ananya", None), ("Delhi", None), ("a", None), ("tomorrow", None),
+         ("2 adults, 1 child", None), ("ananya@example.com", None)],
+        # Small talk and a city described rather than named go to the model
+        [("hi! can you help me book some tickets?", "Of course! 😊 Could you tell me your name first?"),
+         ("I'm Ravi", None),
+         ("somewhere with big gardens and a palace please",
+          "Sounds like Bengaluru! 🌳 Here are the top attractions in Bengaluru:\n\n"
+          f"{format_attraction_list('Bengaluru')}\n\n"
+          "Which one would you like to visit? You can reply with the letter or the name."),
+         ("lalbagh", None), ("this sunday", None), ("one adult and two kids", None),
+         ("ravi@example.com", None)],
+        # The model writes the summary when the email is spelled out
+        [("Meera", None), ("Kolkata", None), ("d - Alipore", None), (visit_date, None),
+         ("3 students", None),
+         ("you can mail me at meera at example dot com",
+          booking_summary('Kolkata', 'd - Alipore', visit_date, '3 students', 'meera@example.com'))],
+        # A question in the middle of the attraction step
+        [("Sam", None), ("Mumbai", None),
+         ("what time do they open?",
+          "Most of them open at 9 AM and close by 6 PM. 🕘 Here they are again:\n\n"
+          f"{format_attraction_list('Mumbai')}\n\n"
+          "Which one would you like to visit? You can reply with the letter or the name."),
+         ("caves", None), ("next friday", None), ("1 adult", None), ("sam@example.com", None)],
+    ]
+
+
+def scripted_replies(scripts):
+    """{user text: model reply} over every model turn of the scripts"""
+    return {text: reply for script in scripts for text, reply in script if reply is not None}
@@ -0,0 +1,95 @@
+"""Minimal local SMTP server that accepts and counts messages.
+
+Stands in for the real SMTP host in benchmarks; it speaks just enough
+SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) and
+can add a fixed delay per command to imitate network round trips.
+"""
+import socketserver
+import threading
+import time
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self.server.record_connection()
+        self.reply('220 tixbee-sink ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.wfile.write(b'250-tixbee-sink\r\n')
+                self.reply('250 SIZE 10485760')
+            elif command.startswith('HELO') or command.startswith('MAIL') \
+                    or command.startswith('RCPT') or command.startswith('RSET') \
+                    or command.startswith('NOOP'):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line == b'.\r\n':
+                        break
+                    size += len(data_line)
+                self.server.record_message(size)
+                self.reply('250 OK queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # The default backlog of 5 drops connects from many dispatcher workers at once
+    request_queue_size = 128
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        super().__init__((host, port), _SinkHandler)
+        self.latency = latency
+        self.messages = 0
+        self.connections = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def config(self):
+        """Email settings in the shape EmailService expects"""
+        return {
+            'EMAIL_USERNAME': 'bench@tixbee.test',
+            'EMAIL_PASSWORD': '',
+            'EMAIL_HOST': self.server_address[0],
+            'EMAIL_PORT': self.port,
+            'EMAIL_USE_TLS': False,
+        }
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def record_message(self, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes_received += size
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
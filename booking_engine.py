@@ -0,0 +1,522 @@
+"""Booking flow without Streamlit.
+
+BookingSession is one user's conversation and booking; BookingEngine
+holds what is shared by every session in a process (config, response
+cache, email dispatcher, transcript log) and moves sessions forward.
+tixbee.py and api_server.py are views that keep one session per user
+and render what the engine returns.
+"""
+import functools
+import math
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from booking_ids import default_generator
+from booking_state import AMOUNT_PATTERN, BookingState, parse_booking_message
+from config import default_config
+from context_manager import TokenLog, build_system_instruction, prepare_prompt, prune_history
+from llm_client import LazyChat
+from llm_stream import QR_MARKER, StreamTiming, stream_segments
+from local_flow import STEP_EMAIL, detect_step, local_reply, new_flow_state, observe_reply, record_local_turn
+from local_flow import stats as local_flow_stats
+from response_cache import cache_key, response_cache
+from telemetry import get_logger, metrics, span, start_text_exporter
+
+NAME_QUESTION = "Would you like to start by telling me your name? 😊"
+WELCOME_MESSAGE = f"""Hey there! 👋 I'm TixBee, your friendly ticket booking assistant!
+
+{NAME_QUESTION}"""
+
+# Length of the payment window shown under the UPI QR code
+PAYMENT_WINDOW_SECONDS = 10
+# Tickets stay held this long after the window closes, to cover slow polling
+HOLD_GRACE_SECONDS = 60
+# Outcomes of sent emails kept for sessions that have not polled yet; abandoned ones age out
+MAX_EMAIL_OUTCOMES = 1024
+CONFIRMATION_SENT = "Confirmation email sent"
+CONFIRMATION_PENDING = ("Your booking is confirmed. The confirmation email is on its way "
+                        "and may take a few minutes to arrive.")
+UPI_ID = "arupiop@axl"
+UPI_NAME = "TixBee"
+
+BOOKING_REFERENCE = re.compile(r'(Booking Reference:\s*)(\S+)')
+
+log = get_logger('engine')
+TURNS = metrics.counter('tixbee_turns_total', 'Chat turns by where the reply came from', ('source',))
+LLM_TOKENS = metrics.counter('tixbee_llm_tokens_total', 'Gemini tokens used', ('kind',))
+LLM_FIRST_TOKEN = metrics.histogram('tixbee_llm_first_token_seconds', 'Time to the first streamed Gemini token')
+PAYMENTS = metrics.counter('tixbee_payments_total', 'Payment windows by outcome', ('outcome',))
+
+# Conversation states
+START = 'START'
+COLLECT_DETAILS = 'COLLECT_DETAILS'
+PAYMENT = 'PAYMENT'
+
+
+def extract_amount(text):
+    match = AMOUNT_PATTERN.search(text)
+    if match:
+        return match.group(1)
+    return "0"
+
+
+def booking_details_from_fields(fields, user_name):
+    """Payment details from the fields of a booking summary, or None if incomplete"""
+    try:
+        return {
+            'user_email': fields.get('user_email'),
+            'booking_details': {
+                'name': user_name or 'User',
+                'city': fields.get('city'),
+                'attraction': fields['attraction'],
+                'visit_date': fields['visit_date'],
+                'ticket_count': fields['ticket_count'],
+            },
+            'amount': fields['total_amount']
+        }
+    except KeyError as e:
+        log.warning('booking.incomplete_summary', missing=str(e))
+        return None
+
+
+def split_reply(text, marker=QR_MARKER):
+    """('text', str) and ('marker', marker) events for a reply that is already complete"""
+    parts = text.split(marker)
+    for i, part in enumerate(parts):
+        if i:
+            yield 'marker', marker
+        if part:
+            yield 'text', part
+
+
+class Payment:
+    """Payment window and confirmation email of one booking"""
+
+    def __init__(self, amount, deadline, user_email=None, booking_details=None):
+        self.amount = amount
+        self.deadline = deadline
+        self.user_email = user_email
+        self.booking_details = booking_details
+        self.submitted = False
+        self.email_status = None
+        self.done = False
+        # Why the tickets could not be held, if they couldn't
+        self.unavailable = None
+
+    def remaining(self, now):
+        return max(0, math.ceil(self.deadline - now))
+
+    def to_dict(self, now):
+        return {
+            'amount': self.amount,
+            'remaining_seconds': self.remaining(now),
+            'booking_id': self.booking_details['booking_id'] if self.booking_details else None,
+            'confirming': self.submitted and not self.done,
+            'done': self.done,
+            'unavailable': self.unavailable,
+            'email_sent': self.email_status[0] if self.email_status else None,
+            'email_message': self.email_status[1] if self.email_status else None,
+        }
+
+
+class BookingSession:
+    """One user's conversation, booking fields and payment"""
+
+    def __init__(self, session_id=None, chat=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.messages = [{"role": "assistant", "content": WELCOME_MESSAGE}]
+        self.conversation_history = []
+        self.current_state = START
+        self.user_name = None
+        self.user_email = None
+        self.booking_state = BookingState()
+        self.flow = new_flow_state()
+        self.token_log = TokenLog()
+        self.chat = chat
+        self.payment = None
+        # Messages already written to a session store
+        self.saved_messages = 0
+
+    def current_booking(self):
+        """Booking fields agreed so far, for the note sent with each LLM turn"""
+        tickets = None
+        if self.flow['quantities']:
+            tickets = ', '.join(f"{count} {category}" for category, count in self.flow['quantities'].items() if count)
+        return {
+            'name': self.user_name or self.flow['name'],
+            'city': self.flow['city'] or self.booking_state.city,
+            'attraction': self.flow['attraction'] or self.booking_state.attraction,
+            'visit_date': self.flow['visit_date'] or self.booking_state.visit_date,
+            'tickets': tickets,
+            'total': self.flow['total'],
+            'reference': self.flow.get('booking_id'),
+        }
+
+    def add_user_message(self, text):
+        self.messages.append({"role": "user", "content": text})
+        # If bot's last message was asking for name
+        if self.messages[-2]["content"].strip().endswith(NAME_QUESTION):
+            self.user_name = text
+            log.debug('session.name_captured', user_name=text)
+
+    def add_assistant_message(self, text):
+        """Store an assistant reply and parse its booking fields once, on arrival"""
+        assistant_message = {"role": "assistant", "content": text}
+        self.messages.append(assistant_message)
+        observe_reply(text, self.flow)
+        # Only the tail since the last ingest; a restored log stays unloaded
+        self.booking_state.catch_up(self.messages, len(self.messages) - 1)
+        return self.booking_state.ingest(assistant_message)
+
+    def to_dict(self, now):
+        return {
+            'session_id': self.session_id,
+            'state': self.current_state,
+            'messages': list(self.messages),
+            'booking': self.current_booking(),
+            'payment': self.payment.to_dict(now) if self.payment else None,
+        }
+
+
+class BookingEngine:
+    """Moves booking sessions forward; safe to share across threads"""
+
+    def __init__(self, config=None, cache=response_cache, dispatcher=None, transcripts=None,
+                 payment_window=None, clock=time.time, booking_ids=None, inventory=None,
+                 ledger=None):
+        self.config = config if config is not None else default_config()
+        self.cache = cache
+        self.booking_ids = booking_ids or default_generator()
+        # PAYMENT_WINDOW_SECONDS overrides the window, e.g. to shorten it in load tests
+        if payment_window is None:
+            payment_window = float(self.config.get('PAYMENT_WINDOW_SECONDS', PAYMENT_WINDOW_SECONDS))
+        self.payment_window = payment_window
+        self.clock = clock
+        self.upi_id = self.config.get('UPI_ID', UPI_ID)
+        self.upi_name = self.config.get('UPI_NAME', UPI_NAME)
+        self._dispatcher = dispatcher
+        self._transcripts = transcripts
+        self._inventory = inventory
+        self._ledger = ledger
+        # Email jobs of this process by booking ID while they are sending, then their
+        # (success, message) until the session polls; sessions only record that one was submitted
+        self._jobs = {}
+        self._email_outcomes = OrderedDict()
+        # Reentrant so a resource created on first use can ask for another one it depends on
+        self._lock = threading.RLock()
+        # METRICS_FILE turns on a local Prometheus text snapshot of this process
+        start_text_exporter(self.config.get('METRICS_FILE'), self.config.get('METRICS_INTERVAL', 10))
+
+    def dispatcher(self):
+        """Email queue whose workers keep SMTP sessions open, created on first use"""
+        with self._lock:
+            if self._dispatcher is None:
+                # smtplib, MIME and the QR stack load with the first confirmation
+                from email_dispatch import EmailDispatcher
+                from email_service import EmailService
+
+                self._dispatcher = EmailDispatcher(EmailService(self.config, ledger=self.ledger()), workers=4).start()
+            return self._dispatcher
+
+    def transcripts(self):
+        """Append-only transcript log shared by all sessions"""
+        with self._lock:
+            if self._transcripts is None:
+                from transcript_store import TranscriptStore
+
+                self._transcripts = TranscriptStore(self.config.get('TRANSCRIPT_DIR', 'transcripts'))
+            return self._transcripts
+
+    def inventory(self):
+        """Ticket capacity store, created on first use"""
+        with self._lock:
+            if self._inventory is None:
+                from inventory import Inventory
+
+                self._inventory = Inventory(self.config.get('INVENTORY_DB', 'inventory.db'))
+            return self._inventory
+
+    def ledger(self):
+        """Confirmed bookings, written by the email workers once a confirmation is sent"""
+        with self._lock:
+            if self._ledger is None:
+                from ledger import Ledger
+
+                self._ledger = Ledger(self.config.get('LEDGER_DB', 'ledger.db'))
+            return self._ledger
+
+    def system_instruction(self, now=None):
+        # Static booking instructions go in the system instruction, not the chat history
+        return build_system_instruction(now or datetime.now())
+
+    def new_chat(self):
+        # The model is shared by every session in the process and is only
+        # loaded once a turn actually needs Gemini
+        return LazyChat(self.system_instruction(), api_key=self.config.get('GEMINI_API_KEY'))
+
+    def new_session(self, session_id=None):
+        return BookingSession(session_id, self.new_chat())
+
+    def reply(self, session, text):
+        """Yield ('text', str) and ('marker', QR_MARKER) events for the reply to text.
+
+        Deterministic booking steps are answered locally, repeated turns
+        from the shared cache and the rest is streamed from Gemini. The
+        payment opens before the marker event is yielded. Exhaust the
+        generator: the turn is recorded once the reply is complete.
+        """
+        session.add_user_message(text)
+        last_assistant_text = session.messages[-2]["content"]
+        now = datetime.now()
+        started = time.perf_counter()
+        if detect_step(last_assistant_text) == STEP_EMAIL:
+            # The summary this turn shows carries the booking ID; fix it before it is written
+            self.assign_booking_id(session)
+
+        response_text = local_reply(text, last_assistant_text, session.flow, now.date())
+        if response_text is not None:
+            local_flow_stats.record_local(time.perf_counter() - started)
+            TURNS.inc(source='local')
+        else:
+            # Other sessions may already have had the same reply at this step
+            booking = session.current_booking()
+            reply_key = cache_key(self.system_instruction(now), now.date(), last_assistant_text, text, booking)
+            response_text = self.cache.get(reply_key)
+            if response_text is not None:
+                TURNS.inc(source='cache')
+
+        if response_text is not None:
+            record_local_turn(session.chat, text, response_text)
+            fields = session.add_assistant_message(response_text)
+            for kind, segment in split_reply(response_text):
+                if kind == 'marker':
+                    self.begin_payment(session, response_text, fields)
+                yield kind, segment
+        else:
+            received = []
+            for kind, segment in self._stream_llm(session, text):
+                received.append(segment)
+                if kind == 'marker':
+                    # The booking summary precedes the placeholder, so it is complete here
+                    self.begin_payment(session, "".join(received))
+                yield kind, segment
+            response_text = "".join(received)
+            local_flow_stats.record_llm(time.perf_counter() - started)
+            TURNS.inc(source='llm')
+            self.cache.put(reply_key, response_text, booking)
+            if session.payment is not None and session.payment.booking_details:
+                # Keep the stored summary in line with the ID the email will carry
+                booking_id = session.payment.booking_details['booking_id']
+                response_text = BOOKING_REFERENCE.sub(lambda match: match.group(1) + booking_id, response_text)
+            session.add_assistant_message(response_text)
+
+        self._record_turn(session, text, response_text)
+
+    def handle_message(self, session, text):
+        """Answer one user message and return the full reply text"""
+        return "".join(segment for _, segment in self.reply(session, text))
+
+    def _stream_llm(self, session, text):
+        # Keep the request small: recent turns only, plus a note of what is already agreed
+        prune_history(session.chat)
+        message = prepare_prompt(text, session.current_booking())
+
+        timing = StreamTiming()
+        with span('llm'):
+            response = session.chat.send_message(message, stream=True)
+            yield from stream_segments(response, timing)
+        if timing.time_to_first_token is not None:
+            LLM_FIRST_TOKEN.observe(timing.time_to_first_token)
+
+        tokens = session.token_log.record(response, len(message))
+        LLM_TOKENS.inc(tokens['prompt_tokens'], kind='prompt')
+        LLM_TOKENS.inc(tokens['response_tokens'], kind='response')
+        log.debug('llm.reply', session_id=session.session_id, timing=timing.summary(),
+                  prompt_tokens=tokens['prompt_tokens'], response_tokens=tokens['response_tokens'])
+
+    def _record_turn(self, session, user_message, bot_response):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        session.conversation_history.append({
+            "user_message": user_message,
+            "bot_response": bot_response,
+            "timestamp": timestamp
+        })
+        self.transcripts().append(session.session_id, user_message, bot_response, timestamp=timestamp)
+
+    def assign_booking_id(self, session):
+        """Booking ID of the session's booking, generated the first time it is needed"""
+        if not session.flow.get('booking_id'):
+            session.flow['booking_id'] = self.booking_ids.next_id()
+        return session.flow['booking_id']
+
+    def begin_payment(self, session, summary_text, fields=None):
+        """Open the payment window for a booking summary, once per session.
+
+        Pass the fields already parsed by BookingState.ingest to avoid
+        scanning the summary a second time.
+        """
+        if session.payment is not None:
+            return session.payment
+        if fields is None:
+            fields = parse_booking_message(summary_text)
+        details = booking_details_from_fields(fields, session.user_name)
+        if details is None:
+            return None
+        return self.open_payment(session, details['amount'], details['user_email'], details['booking_details'])
+
+    def open_payment(self, session, amount, user_email=None, booking_details=None):
+        email_booking_details = None
+        if user_email and booking_details:
+            # Prepare complete booking details with user's name from chat
+            email_booking_details = {
+                'booking_id': self.assign_booking_id(session),
+                'customer_name': booking_details['name'],  # This comes from chat input
+                'city': booking_details['city'],
+                'attraction': booking_details['attraction'],
+                'visit_date': booking_details['visit_date'],
+                'ticket_count': booking_details['ticket_count'],
+                'amount': amount
+            }
+            log.info('payment.opened', session_id=session.session_id,
+                     booking_id=email_booking_details['booking_id'], amount=amount, email=user_email)
+        # The payment window is a deadline, not a blocking loop
+        payment = Payment(amount, self.clock() + self.payment_window, user_email, email_booking_details)
+        if email_booking_details:
+            self._hold_tickets(session, payment)
+        session.payment = payment
+        return payment
+
+    def _ticket_quantities(self, session):
+        if session.flow['quantities']:
+            return session.flow['quantities']
+        booking_state = session.booking_state
+        return {'adult': booking_state.adult_tickets, 'student': booking_state.student_tickets,
+                'child': booking_state.child_tickets}
+
+    def _hold_tickets(self, session, payment):
+        """Hold the booking's tickets for the payment window; sold-out payments end right away"""
+        from inventory import SoldOut
+
+        details = payment.booking_details
+        try:
+            self.inventory().hold(details['booking_id'], details['attraction'], details['visit_date'],
+                                  self._ticket_quantities(session),
+                                  seconds=self.payment_window + HOLD_GRACE_SECONDS)
+        except SoldOut as e:
+            log.info('payment.sold_out', booking_id=details['booking_id'], reason=str(e))
+            PAYMENTS.inc(outcome='sold_out')
+            payment.unavailable = f"Sorry, {e}. Please choose another date or fewer tickets."
+            payment.done = True
+
+    def cancel_payment(self, session):
+        """Close an open payment and give its held tickets back"""
+        payment = session.payment
+        if payment is None or payment.done or payment.submitted:
+            return False
+        if payment.booking_details:
+            self.inventory().release(payment.booking_details['booking_id'])
+        payment.done = True
+        PAYMENTS.inc(outcome='cancelled')
+        return True
+
+    def poll_payment(self, session):
+        """Advance the payment of a session and return it.
+
+        Once the window closes the email is handed to the dispatcher;
+        the payment is done when the email has been sent or failed.
+        """
+        payment = session.payment
+        if payment is None or payment.done or self.clock() < payment.deadline:
+            return payment
+        if payment.booking_details and not payment.submitted:
+            booking_id = payment.booking_details['booking_id']
+            if not self.inventory().confirm(booking_id):
+                payment.email_status = (False, "Your ticket hold expired before the payment completed. "
+                                               "Please book again.")
+                payment.done = True
+                PAYMENTS.inc(outcome='hold_expired')
+                log.info('payment.hold_expired', booking_id=booking_id)
+                return payment
+            job = self.dispatcher().submit(payment.booking_details, payment.user_email)
+            with self._lock:
+                self._jobs[booking_id] = job
+            job.add_done_callback(functools.partial(self._email_finished, booking_id))
+            payment.submitted = True
+            PAYMENTS.inc(outcome='confirmed')
+        if payment.submitted:
+            booking_id = payment.booking_details['booking_id']
+            with self._lock:
+                if booking_id in self._jobs:
+                    return payment
+                outcome = self._email_outcomes.pop(booking_id, None)
+            payment.email_status = outcome or self._email_outcome_from_ledger(booking_id)
+        payment.done = True
+        return payment
+
+    def _email_finished(self, booking_id, job):
+        with self._lock:
+            self._jobs.pop(booking_id, None)
+            self._email_outcomes[booking_id] = job.result()
+            while len(self._email_outcomes) > MAX_EMAIL_OUTCOMES:
+                self._email_outcomes.popitem(last=False)
+
+    def _email_outcome_from_ledger(self, booking_id):
+        """Outcome of an email this process holds no job for.
+
+        It was queued by another worker or before a restart. Sent emails
+        are in the ledger; otherwise it is still on its way, or failed
+        and was logged by the worker that sent it.
+        """
+        if self.ledger().get(booking_id) is not None:
+            return (True, CONFIRMATION_SENT)
+        return (None, CONFIRMATION_PENDING)
+
+    def payment_card(self, amount):
+        """UPI payment card PNG for an amount"""
+        # Cached per (upi_id, name, amount) so history replays don't re-render;
+        # PIL and qrcode are only imported once a booking reaches payment
+        from payment_card import get_payment_card
+
+        return get_payment_card(amount, upi_id=self.upi_id, name=self.upi_name)
+
+    def ticket_qr(self, booking_details):
+        """Entry QR PNG; the same memoized render as the one attached to the email"""
+        from ticket_qr import render_ticket_qr
+
+        return render_ticket_qr(booking_details)
+
+    def advance_state(self, session):
+        """Bring the booking record and conversation state up to date"""
+        # Only new messages get parsed
+        booking_state = session.booking_state
+        booking_state.catch_up(session.messages)
+
+        if session.current_state == START:
+            if session.user_name:
+                session.current_state = COLLECT_DETAILS
+            elif session.messages[-1]['role'] == 'user':
+                session.user_name = session.messages[-1]['content']
+                log.debug('session.name_stored', session_id=session.session_id, user_name=session.user_name)
+                session.current_state = COLLECT_DETAILS
+
+        elif session.current_state == PAYMENT:
+            if not session.user_email or not session.user_name:
+                session.current_state = COLLECT_DETAILS
+            elif session.payment is None:
+                self.open_payment(
+                    session,
+                    booking_state.total_amount,
+                    session.user_email,
+                    {
+                        'name': session.user_name,
+                        'city': booking_state.city,
+                        'attraction': booking_state.attraction,
+                        'visit_date': booking_state.visit_date,
+                        'ticket_count': f"{booking_state.adult_tickets} Adults, {booking_state.child_tickets} Children",
+                    }
+                )
+        return session.current_state
@@ -0,0 +1,109 @@
+"""Collision-free, time-ordered booking IDs.
+
+IDs are 64-bit Snowflake-style values: milliseconds since EPOCH_MS
+(41 bits), a node ID (10 bits) and a per-millisecond sequence (12 bits),
+written as 'TIX' plus 13 Crockford base32 characters. They sort by
+creation time and are unique as long as every process that creates
+bookings at the same time has its own node ID (set BOOKING_NODE_ID,
+0-1023, on each replica).
+"""
+import hashlib
+import os
+import socket
+import threading
+import time
+
+PREFIX = 'TIX'
+EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+ID_LENGTH = 13
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'  # Crockford base32, no I, L, O, U
+_DECODE = {char: value for value, char in enumerate(ALPHABET)}
+
+
+def default_node_id():
+    """BOOKING_NODE_ID if set, else a value derived from host name and process ID"""
+    configured = os.getenv('BOOKING_NODE_ID')
+    if configured:
+        node = int(configured)
+        if not 0 <= node <= MAX_NODE:
+            raise ValueError(f"BOOKING_NODE_ID must be between 0 and {MAX_NODE}")
+        return node
+    digest = hashlib.sha1(f"{socket.gethostname()}:{os.getpid()}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:2], 'big') & MAX_NODE
+
+
+def encode_id(value):
+    chars = []
+    for _ in range(ID_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return PREFIX + ''.join(reversed(chars))
+
+
+def decode_id(booking_id):
+    """Return (created_at_ms, node, sequence) for a booking ID"""
+    if not booking_id.startswith(PREFIX) or len(booking_id) != len(PREFIX) + ID_LENGTH:
+        raise ValueError(f"not a booking ID: {booking_id!r}")
+    value = 0
+    for char in booking_id[len(PREFIX):]:
+        value = value * 32 + _DECODE[char]
+    return ((value >> (NODE_BITS + SEQUENCE_BITS)) + EPOCH_MS,
+            (value >> SEQUENCE_BITS) & MAX_NODE,
+            value & MAX_SEQUENCE)
+
+
+class BookingIdGenerator:
+    """Thread-safe generator of strictly increasing booking IDs.
+
+    The lock only guards a few integer operations and never sleeps:
+    when a millisecond's sequence runs out, or the wall clock steps
+    back, the generator moves its own clock one millisecond forward.
+    """
+
+    def __init__(self, node_id=None, clock=time.time):
+        self.node_id = default_node_id() if node_id is None else node_id
+        if not 0 <= self.node_id <= MAX_NODE:
+            raise ValueError(f"node_id must be between 0 and {MAX_NODE}")
+        self._node_bits = self.node_id << SEQUENCE_BITS
+        self._clock = clock
+        self._last_ms = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_value(self):
+        now = int(self._clock() * 1000) - EPOCH_MS
+        with self._lock:
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_ms += 1
+                self._sequence = 0
+            return (self._last_ms << (NODE_BITS + SEQUENCE_BITS)) | self._node_bits | self._sequence
+
+    def next_id(self):
+        return encode_id(self.next_value())
+
+
+_default_generator = None
+_default_lock = threading.Lock()
+
+
+def default_generator():
+    """The process-wide generator; a second one with the same node ID could repeat its IDs"""
+    global _default_generator
+    if _default_generator is None:
+        with _default_lock:
+            if _default_generator is None:
+                _default_generator = BookingIdGenerator()
+    return _default_generator
+
+
+def new_booking_id():
+    return default_generator().next_id()
@@ -0,0 +1,96 @@
+import re
+
+# Patterns for the booking summary format defined in the TixBee prompt
+AMOUNT_PATTERN = re.compile(r'Total Amount: ₹(\d+)')
+CITY_PATTERN = re.compile(r'🌆 City: (.+?)\n')
+ATTRACTION_PATTERN = re.compile(r'🏰 Attraction: (.+?)\n')
+VISIT_DATE_PATTERN = re.compile(r'📅 Visit Date: (.+?)\n')
+TICKETS_PATTERN = re.compile(r'🎟️ Tickets Booked:(.*?)💰', re.DOTALL)
+EMAIL_PATTERN = re.compile(r'📧 Contact Email: (.+?)\n')
+ADULT_PATTERN = re.compile(r'(\d+) Adult tickets')
+STUDENT_PATTERN = re.compile(r'(\d+) Student tickets')
+CHILD_PATTERN = re.compile(r'(\d+) Children tickets')
+
+
+def _group(pattern, text):
+    match = pattern.search(text)
+    return match.group(1).strip() if match else None
+
+
+def parse_booking_message(text):
+    """Parse the booking fields present in one assistant message.
+
+    Only fields found in the text are returned. The cheap substring
+    checks skip the regexes for the many messages that carry no summary.
+    """
+    fields = {}
+    if 'Total Amount: ₹' in text:
+        fields['total_amount'] = _group(AMOUNT_PATTERN, text)
+    if '🌆 City:' in text:
+        fields['city'] = _group(CITY_PATTERN, text)
+    if '🏰 Attraction:' in text:
+        fields['attraction'] = _group(ATTRACTION_PATTERN, text)
+    if '📅 Visit Date:' in text:
+        fields['visit_date'] = _group(VISIT_DATE_PATTERN, text)
+    if '📧 Contact Email:' in text:
+        fields['user_email'] = _group(EMAIL_PATTERN, text)
+    if '🎟️ Tickets Booked:' in text:
+        fields['ticket_count'] = _group(TICKETS_PATTERN, text)
+        for key, pattern in (('adult_tickets', ADULT_PATTERN),
+                             ('student_tickets', STUDENT_PATTERN),
+                             ('child_tickets', CHILD_PATTERN)):
+            count = _group(pattern, text)
+            if count is not None:
+                fields[key] = int(count)
+    return {key: value for key, value in fields.items() if value is not None}
+
+
+class BookingState:
+    """Booking record accumulated from assistant messages as they arrive.
+
+    Each message is parsed exactly once, so the per-rerun cost stays
+    constant however long the conversation gets.
+    """
+
+    FIELDS = ('total_amount', 'city', 'attraction', 'visit_date', 'user_email',
+              'ticket_count', 'adult_tickets', 'student_tickets', 'child_tickets')
+
+    def __init__(self):
+        self.total_amount = 0
+        self.city = None
+        self.attraction = ""
+        self.visit_date = ""
+        self.user_email = None
+        self.ticket_count = None
+        self.adult_tickets = 0
+        self.student_tickets = 0
+        self.child_tickets = 0
+        self.parsed_messages = 0
+
+    def ingest(self, message):
+        """Fold one chat message into the record and return the fields it carried"""
+        self.parsed_messages += 1
+        if message['role'] != 'assistant':
+            return {}
+        fields = parse_booking_message(message['content'])
+        for key, value in fields.items():
+            setattr(self, key, value)
+        return fields
+
+    def catch_up(self, messages, stop=None):
+        """Ingest any messages appended since the last call, up to stop"""
+        for message in messages[self.parsed_messages:stop]:
+            self.ingest(message)
+
+    def booking_details(self, name):
+        """Booking details in the shape get_upi_qr expects"""
+        return {
+            'name': name,
+            'city': self.city,
+            'attraction': self.attraction,
+            'visit_date': self.visit_date,
+            'ticket_count': self.ticket_count,
+        }
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
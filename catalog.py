@@ -0,0 +1,258 @@
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+Attraction = namedtuple('Attraction', ['letter', 'name', 'description', 'aliases'])
+
+# Ticket categories in the order they are listed on the price table
+TICKET_PRICES = {'child': 10, 'student': 15, 'adult': 20}
+
+ATTRACTIONS = {
+    'Bengaluru': [
+        Attraction('a', 'Bangalore Palace',
+                   "A magnificent palace with Tudor-style architecture,\n"
+                   "featuring beautiful gardens and royal interiors.",
+                   ['palace', 'bangalore palace']),
+        Attraction('b', 'Lalbagh Botanical Garden',
+                   "A beautiful garden spanning 240 acres with rare plants,\n"
+                   "a glasshouse, and a serene lake.",
+                   ['lalbagh', 'botanical', 'garden']),
+        Attraction('c', 'Visvesvaraya Technological Museum',
+                   "An interactive science and technology museum with\n"
+                   "engaging exhibits and hands-on demonstrations.",
+                   ['visvesvaraya', 'museum', 'technological']),
+        Attraction('d', 'Bannerghatta National Park',
+                   "A wildlife sanctuary offering exciting safari experiences\n"
+                   "and a chance to see animals in their natural habitat.",
+                   ['bannerghatta', 'national park', 'safari']),
+    ],
+    'Delhi': [
+        Attraction('a', 'Red Fort',
+                   "A historic fortress complex showcasing Mughal architecture,\n"
+                   "featuring stunning palaces and gardens.",
+                   ['red fort', 'fort', 'lal qila']),
+        Attraction('b', 'Qutub Minar',
+                   "A UNESCO World Heritage site featuring the world's\n"
+                   "tallest brick minaret and ancient Indian architecture.",
+                   ['qutub', 'minar', 'qutab']),
+        Attraction('c', 'National Science Centre',
+                   "An interactive science museum with engaging exhibits\n"
+                   "and hands-on learning experiences.",
+                   ['science', 'national science']),
+        Attraction('d', 'National Zoological Park',
+                   "A 176-acre zoo housing diverse wildlife species\n"
+                   "in naturalistic habitats.",
+                   ['zoo', 'zoological', 'national zoo']),
+    ],
+    'Mumbai': [
+        Attraction('a', 'Gateway of India',
+                   "An iconic arch monument built in the Indo-Saracenic style,\n"
+                   "overlooking the Arabian Sea.",
+                   ['gateway', 'gateway of india']),
+        Attraction('b', 'Elephanta Caves',
+                   "Ancient cave temples on Elephanta Island featuring\n"
+                   "stunning rock-cut sculptures.",
+                   ['elephanta', 'caves']),
+        Attraction('c', 'Nehru Science Centre',
+                   "India's largest interactive science center with\n"
+                   "over 500 hands-on exhibits.",
+                   ['nehru', 'science centre']),
+        Attraction('d', 'Sanjay Gandhi National Park',
+                   "A protected area in Mumbai featuring rich biodiversity,\n"
+                   "ancient caves, and a mini-train safari.",
+                   ['sanjay gandhi', 'national park']),
+    ],
+    'Kolkata': [
+        Attraction('a', 'Victoria Memorial',
+                   "A magnificent marble building dedicated to Queen Victoria,\n"
+                   "housing a museum and surrounded by gardens.",
+                   ['victoria', 'memorial']),
+        Attraction('b', 'Indian Museum',
+                   "The oldest and largest museum in India featuring rare\n"
+                   "artifacts, antiques, and Egyptian mummies.",
+                   ['indian museum', 'museum']),
+        Attraction('c', 'Science City',
+                   "India's largest science center with Space Theatre,\n"
+                   "Evolution Park, and Maritime Centre.",
+                   ['science city', 'science']),
+        Attraction('d', 'Alipore Zoological Gardens',
+                   "India's oldest formally stated zoological park,\n"
+                   "home to rare species and beautiful gardens.",
+                   ['alipore', 'zoo', 'zoological']),
+    ],
+}
+
+CITY_ALIASES = {
+    'bengaluru': 'Bengaluru', 'bangalore': 'Bengaluru', 'blr': 'Bengaluru',
+    'delhi': 'Delhi', 'new delhi': 'Delhi',
+    'mumbai': 'Mumbai', 'bombay': 'Mumbai',
+    'kolkata': 'Kolkata', 'calcutta': 'Kolkata',
+}
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MONTHS = {}
+for _number, _name in enumerate(['january', 'february', 'march', 'april', 'may', 'june', 'july',
+                                 'august', 'september', 'october', 'november', 'december'], start=1):
+    MONTHS[_name] = MONTHS[_name[:3]] = _number
+MONTHS['sept'] = 9
+NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+                'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+
+_WORD = re.compile(r"[a-z0-9']+")
+_LETTER_CHOICE = re.compile(r'^\(?([a-d])(\)?\s*[.:\-]|\))?(?:\s+(.*)|$)')
+_QUANTITY = re.compile(
+    r"\b(\d+|a|an|one|two|three|four|five|six|seven|eight|nine|ten)\s+"
+    r"(adult|student|child|children|kid|kids)s?\b"
+)
+_ISO_DATE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+_DMY_DATE = re.compile(r'\b(\d{1,2})[/-](\d{1,2})[/-](\d{4})\b')
+_DAY_MONTH = re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?([a-z]{3,9})\b(?:,?\s+(\d{4}))?')
+_MONTH_DAY = re.compile(r'\b([a-z]{3,9})\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s+(\d{4}))?')
+EMAIL_ADDRESS = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+
+
+def _words(text):
+    return _WORD.findall(text.lower())
+
+
+def _build_alias_index():
+    """Per-city dictionary from alias word sequences to attractions"""
+    index = {}
+    for city, attractions in ATTRACTIONS.items():
+        aliases = {}
+        for attraction in attractions:
+            for alias in [attraction.name] + attraction.aliases:
+                aliases[tuple(_words(alias))] = attraction
+        index[city] = (aliases, max(len(key) for key in aliases))
+    return index
+
+
+_ALIAS_INDEX = _build_alias_index()
+_CITY_INDEX = {tuple(_words(alias)): city for alias, city in CITY_ALIASES.items()}
+
+
+def match_city(text):
+    """Return the city named in text, or None"""
+    words = _words(text)
+    found = {_CITY_INDEX[tuple(words[i:i + n])]
+             for n in (1, 2) for i in range(len(words) - n + 1)
+             if tuple(words[i:i + n]) in _CITY_INDEX}
+    return found.pop() if len(found) == 1 else None
+
+
+def match_attraction(city, text):
+    """Return the attraction in city that text refers to, or None if unclear.
+
+    Accepts a bare letter, "a - Red Fort" style choices, the full name
+    or any of the aliases; the longest alias found in the text wins.
+    """
+    if city not in _ALIAS_INDEX:
+        return None
+    lowered = text.strip().lower()
+    choice = _LETTER_CHOICE.match(lowered)
+    if choice:
+        letter, separator, rest = choice.groups()
+        by_letter = ATTRACTIONS[city]['abcd'.index(letter)]
+        if separator or not rest:
+            return by_letter
+        # "a museum" is an article, not option a, unless the rest is unrecognized
+        return _match_alias(city, rest) or by_letter
+    return _match_alias(city, lowered)
+
+
+def _match_alias(city, text):
+    aliases, longest = _ALIAS_INDEX[city]
+    words = _words(text)
+    for n in range(min(longest, len(words)), 0, -1):
+        found = {}
+        for i in range(len(words) - n + 1):
+            attraction = aliases.get(tuple(words[i:i + n]))
+            if attraction is not None:
+                found[attraction.letter] = attraction
+        if len(found) == 1:
+            return found.popitem()[1]
+        if found:
+            return None
+    return None
+
+
+def parse_visit_date(text, today=None):
+    """Parse a visit date from free text relative to today, or return None"""
+    today = today or date.today()
+    lowered = text.strip().lower()
+    words = _words(lowered)
+
+    if 'day after tomorrow' in lowered:
+        return today + timedelta(days=2)
+    if 'tomorrow' in words:
+        return today + timedelta(days=1)
+    if 'today' in words or 'tonight' in words:
+        return today
+    for i, name in enumerate(WEEKDAYS):
+        if name in words or name[:3] in words:
+            days_ahead = (i - today.weekday()) % 7
+            if days_ahead == 0 and 'next' in words:
+                days_ahead = 7
+            return today + timedelta(days=days_ahead)
+
+    match = _ISO_DATE.search(lowered)
+    if match:
+        year, month, day = (int(part) for part in match.groups())
+        return _safe_date(year, month, day)
+    match = _DMY_DATE.search(lowered)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+        return _safe_date(year, month, day)
+    for pattern, day_first in ((_DAY_MONTH, True), (_MONTH_DAY, False)):
+        match = pattern.search(lowered)
+        if not match:
+            continue
+        first, second, year = match.groups()
+        day, month_name = (first, second) if day_first else (second, first)
+        month = MONTHS.get(month_name)
+        if month is None:
+            continue
+        parsed = _safe_date(int(year) if year else today.year, month, int(day))
+        if parsed and not year and parsed < today:
+            # "2 Jan" in December means next year's 2nd of January
+            parsed = _safe_date(today.year + 1, month, int(day))
+        return parsed
+    return None
+
+
+def _safe_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_quantities(text):
+    """Return {'adult': n, 'student': n, 'child': n} from text, or None"""
+    quantities = {}
+    for count, category in _QUANTITY.findall(text.lower()):
+        n = int(count) if count.isdigit() else NUMBER_WORDS[count]
+        key = 'child' if category.startswith(('child', 'kid')) else category
+        quantities[key] = quantities.get(key, 0) + n
+    if not quantities or sum(quantities.values()) == 0:
+        return None
+    return {category: quantities.get(category, 0) for category in ('adult', 'student', 'child')}
+
+
+def price_breakdown(quantities):
+    """Return (line items, total) for the requested ticket quantities"""
+    items = []
+    for category, label in (('adult', 'Adult'), ('student', 'Student'), ('child', 'Children')):
+        count = quantities.get(category, 0)
+        if count:
+            items.append((label, count, TICKET_PRICES[category], count * TICKET_PRICES[category]))
+    return items, sum(item[3] for item in items)
+
+
+def format_attraction_list(city):
+    """Attraction menu for a city in the layout used by the chat prompt"""
+    blocks = []
+    for attraction in ATTRACTIONS[city]:
+        description = '\n'.join(f"   {line}" for line in attraction.description.split('\n'))
+        blocks.append(f"{attraction.letter}) {attraction.name}\n   {'━' * 51}\n{description}")
+    return '\n\n'.join(blocks)
@@ -0,0 +1,63 @@
+"""Configuration sources for the app, the booking engine and workers.
+
+Any mapping with ``get`` and ``[]`` works as a config (a plain dict in
+tests). default_config() reads Streamlit secrets when running under
+Streamlit and falls back to environment variables, so headless workers
+only need the environment.
+"""
+import os
+import sys
+
+
+class EnvConfig:
+    """Configuration from environment variables"""
+
+    def get(self, key, default=None):
+        return os.environ.get(key, default)
+
+    def __getitem__(self, key):
+        return os.environ[key]
+
+
+class SecretsConfig:
+    """Configuration from st.secrets, empty outside a Streamlit process"""
+
+    def get(self, key, default=None):
+        streamlit = sys.modules.get('streamlit')
+        if streamlit is None:
+            return default
+        try:
+            return streamlit.secrets.get(key, default)
+        except Exception:
+            # No secrets.toml; st.secrets raises on first access
+            return default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+class ChainConfig:
+    """First source that has a key wins"""
+
+    def __init__(self, *sources):
+        self.sources = sources
+
+    def get(self, key, default=None):
+        for source in self.sources:
+            value = source.get(key)
+            if value is not None:
+                return value
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+def default_config():
+    return ChainConfig(SecretsConfig(), EnvConfig())
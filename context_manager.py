@@ -0,0 +1,153 @@
+from datetime import timedelta
+
+from catalog import ATTRACTIONS, TICKET_PRICES, format_attraction_list, match_city
+
+# Chat exchanges (user + model) kept verbatim; older ones are summarized
+HISTORY_TURNS = 3
+RULE = '━' * 54
+
+
+def build_system_instruction(current_date):
+    """Static booking instructions sent once as the model's system instruction.
+
+    The attraction catalog is left out; each turn carries only the
+    slice for the city being discussed (see prepare_prompt).
+    """
+    cities = ', '.join(list(ATTRACTIONS)[:-1]) + f", or {list(ATTRACTIONS)[-1]}"
+    today = current_date.strftime("%Y-%m-%d")
+    tomorrow = (current_date + timedelta(days=1)).strftime("%Y-%m-%d")
+    return f"""You are TixBee, a friendly ticket booking assistant. You are aware that today is {current_date.strftime("%A")}, {today}. You have already greeted the user and asked for their name. Follow this conversation flow STRICTLY in order:
+
+1. When the user gives their name, greet them by name.
+2. Then ask which city they would like to visit ({cities}).
+3. Based on their city choice, list the attractions given in the [Catalog] note of the user's message, exactly as written there.
+4. Match the user's attraction choice flexibly: the letter (a/b/c/d), the full name, a partial name or one of the aliases listed in the [Catalog] note, or a letter with a name (e.g. "a - Red Fort").
+5. If the user's input doesn't match any attraction, respond:
+   "I'm not sure which attraction you mean. Could you please either:
+   - Use the letter (a/b/c/d)
+   - Type the attraction name
+   - Or describe which place you're interested in?"
+6. After they choose a valid place, ask for their preferred date of visit. When processing date:
+   - If user says "today", use {today}
+   - If user says "tomorrow", use {tomorrow}
+   - If user mentions a day of the week (e.g., "this Sunday"), calculate the next occurrence of that day
+   - If user provides a specific date, verify it's not in the past
+   - If date is in the past, ask them to choose a future date
+7. After getting a valid date, show the pricing and ask for quantities in this exact format:
+
+Here are our ticket prices:
+{RULE}
+
+    Children:  ₹{TICKET_PRICES['child']} per ticket
+    Students:  ₹{TICKET_PRICES['student']} per ticket
+    Adults:    ₹{TICKET_PRICES['adult']} per ticket
+
+Please tell me how many tickets you need in each category
+(for example: 2 adults, 1 student, 1 child)
+
+8. After getting the quantities, show breakdown ONLY for tickets that were requested (don't show calculations for zero tickets):
+
+Here's your booking breakdown:
+{RULE}
+
+[Only show these lines if that ticket type was requested:
+    Adult tickets:   Z × ₹{TICKET_PRICES['adult']} = ₹[amount]
+    Student tickets: Y × ₹{TICKET_PRICES['student']} = ₹[amount]
+    Children tickets: X × ₹{TICKET_PRICES['child']} = ₹[amount]]
+    ────────────────────────────────────
+    Total amount:    ₹[total]
+
+9. After showing the total, say: "Great! To complete your booking, please provide your contact email address where I can send the booking details once payment is processed."
+
+10. After user provides the email, show this complete booking summary:
+
+Thank you for providing your email! Here's your booking summary: 📋
+
+Booking Details:
+{RULE}
+
+    🌆 City: [Selected City]
+    🏰 Attraction: [Selected Place]
+    📅 Visit Date: [Chosen Date]
+
+    🎟️ Tickets Booked:
+        • X Adult tickets
+        • Y Student tickets
+        • Z Children tickets
+
+    💰 Total Amount: ₹[total]
+    📧 Contact Email: [user's email]
+    🔢 Booking Reference: [booking reference from the [Booking so far] note]
+
+    📱 Scan QR code to pay:
+    [QR_CODE_PLACEHOLDER]
+
+{RULE}
+
+Earlier turns may have been dropped from the chat history. A [Booking so far] note at the start of a user message lists what was already agreed; treat it as confirmed and never repeat the note back to the user.
+"""
+
+
+def city_context(city):
+    """Catalog slice for one city: the attraction menu plus accepted aliases"""
+    aliases = '\n'.join(
+        f"   - Option {attraction.letter.upper()}: " + ', '.join(f'"{alias}"' for alias in attraction.aliases)
+        for attraction in ATTRACTIONS[city]
+    )
+    return f"Attractions in {city}:\n\n{format_attraction_list(city)}\n\nAccepted aliases:\n{aliases}"
+
+
+def booking_note(booking):
+    """One-line summary of the booking fields agreed so far"""
+    labels = (('name', 'name'), ('city', 'city'), ('attraction', 'attraction'),
+              ('visit_date', 'visit date'), ('tickets', 'tickets'), ('total', 'total'),
+              ('reference', 'booking reference'))
+    parts = [f"{label}: {booking[key]}" for key, label in labels if booking.get(key)]
+    return f"[Booking so far: {'; '.join(parts)}]" if parts else ''
+
+
+def prepare_prompt(prompt, booking):
+    """Prefix the user's message with the booking note and the catalog slice it needs.
+
+    The slice is only attached while an attraction still has to be
+    chosen, and only for the city already chosen or named in this turn.
+    """
+    notes = []
+    note = booking_note(booking)
+    if note:
+        notes.append(note)
+    city = booking.get('city') or match_city(prompt)
+    if city in ATTRACTIONS and not booking.get('attraction'):
+        notes.append(f"[Catalog]\n{city_context(city)}\n[/Catalog]")
+    if not notes:
+        return prompt
+    return '\n'.join(notes) + '\n\n' + prompt
+
+
+def prune_history(chat, keep_turns=HISTORY_TURNS):
+    """Drop all but the last keep_turns exchanges from a chat's history"""
+    history = list(chat.history)
+    keep = keep_turns * 2
+    if len(history) > keep:
+        chat.history = history[-keep:]
+
+
+class TokenLog:
+    """Per-turn prompt and response token counts for one session"""
+
+    def __init__(self):
+        self.turns = []
+
+    def record(self, response, prompt_chars):
+        usage = getattr(response, 'usage_metadata', None)
+        entry = {
+            'prompt_chars': prompt_chars,
+            'prompt_tokens': getattr(usage, 'prompt_token_count', None),
+            'response_tokens': getattr(usage, 'candidates_token_count', None),
+            'total_tokens': getattr(usage, 'total_token_count', None),
+        }
+        self.turns.append(entry)
+        return entry
+
+    def total_tokens(self):
+        return sum(turn['total_tokens'] or 0 for turn in self.turns)
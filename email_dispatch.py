@@ -0,0 +1,304 @@
+import queue
+import smtplib
+import threading
+import time
+
+from telemetry import get_logger, metrics, span
+
+# Retry policy for transient SMTP failures
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 8.0
+
+log = get_logger('email')
+EMAILS = metrics.counter('tixbee_emails_total', 'Confirmation emails by outcome', ('outcome',))
+
+
+def is_transient_error(error):
+    """Return True for SMTP failures that are worth retrying"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 4xx replies are temporary by definition, 5xx are permanent
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+class EmailJob:
+    """Handle for a queued confirmation email"""
+
+    def __init__(self, booking_details, recipient_email):
+        self.booking_details = booking_details
+        self.recipient_email = recipient_email
+        self.attempts = 0
+        self.success = None
+        self.message = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._done.is_set()
+
+    def add_done_callback(self, callback):
+        """Call callback(job) once the job finishes, right away if it already has"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns False if the timeout expired"""
+        return self._done.wait(timeout)
+
+    def result(self):
+        """Return (success, message) like EmailService.send_confirmation_email"""
+        return self.success, self.message
+
+    def _finish(self, success, message):
+        self.success = success
+        self.message = message
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+class SMTPSession:
+    """A single authenticated SMTP connection reused across messages"""
+
+    def __init__(self, email_service):
+        self.email_service = email_service
+        self.server = None
+
+    def send(self, msg):
+        if self.server is None:
+            self.server = self.email_service.connect()
+        try:
+            msg.send(self.server)
+        except smtplib.SMTPServerDisconnected:
+            # Idle connections get dropped by the server; reconnect once
+            self.close()
+            self.server = self.email_service.connect()
+            msg.send(self.server)
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                try:
+                    self.server.close()
+                except Exception:
+                    pass
+            self.server = None
+
+
+class EmailDispatcher:
+    """Send confirmation emails from a pool of worker threads.
+
+    Jobs go through a thread-safe queue. Every worker keeps its own
+    authenticated SMTP session open between messages and retries
+    transient failures with exponential backoff.
+    """
+
+    def __init__(self, email_service, workers=4, max_retries=MAX_RETRIES,
+                 backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS):
+        self.email_service = email_service
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return self
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"tixbee-email-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, booking_details, recipient_email):
+        """Queue a confirmation email and return its EmailJob handle"""
+        if not self._threads:
+            self.start()
+        job = EmailJob(booking_details, recipient_email)
+        self._queue.put(job)
+        return job
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def shutdown(self, wait=True):
+        """Stop the workers after the queued jobs have been sent"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _worker(self):
+        session = SMTPSession(self.email_service)
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    break
+                try:
+                    msg = self.email_service.build_message(job.booking_details, job.recipient_email)
+                    success, message, job.attempts = deliver_with_retries(
+                        session, msg, self.max_retries, self.backoff, self.max_backoff
+                    )
+                    error = message
+                except Exception as e:
+                    success, message, error = False, f"Error sending email: {str(e)}", e
+                if success:
+                    self.email_service.record_sent(job.booking_details, job.recipient_email)
+                else:
+                    self.email_service.record_failed(job.booking_details, job.recipient_email, error)
+                job._finish(success, message)
+        finally:
+            session.close()
+
+
+def deliver_with_retries(session, msg, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS,
+                         max_backoff=MAX_BACKOFF_SECONDS):
+    """Send a message over a session, retrying transient failures.
+
+    Returns (success, message, attempts).
+    """
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            session.send(msg)
+            return True, "Email sent successfully!", attempts
+        except Exception as e:
+            session.close()
+            if not is_transient_error(e) or attempts > max_retries:
+                return False, f"Error sending email: {str(e)}", attempts
+            log.warning('email.retry', attempt=attempts, error=str(e))
+            time.sleep(min(backoff * (2 ** (attempts - 1)), max_backoff))
+
+
+class BulkResult:
+    """Per-recipient outcome and throughput of a bulk send"""
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def sent(self):
+        return sum(1 for result in self.results if result['success'])
+
+    @property
+    def failed(self):
+        return len(self.results) - self.sent
+
+    @property
+    def throughput(self):
+        """Messages handled per second"""
+        return len(self.results) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.sent} sent, {self.failed} failed in {self.elapsed:.2f}s "
+                f"({self.throughput:.1f} msg/s)")
+
+
+def send_bulk(email_service, bookings, sessions=2, prefetch=32, max_retries=MAX_RETRIES,
+              backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS):
+    """Send confirmations for many bookings over a few reused SMTP sessions.
+
+    ``bookings`` is an iterable of ``(booking_details, recipient_email)``
+    pairs and is consumed lazily. A builder thread renders the QR codes and
+    MIME messages while ``sessions`` sender threads deliver them, so QR
+    generation overlaps with network I/O. The bounded ``prefetch`` queue
+    keeps memory flat for large groups. Results come back in input order.
+    Delivered bookings are added to the service's ledger in one batch.
+    """
+    built = queue.Queue(maxsize=prefetch)
+    results = []
+    sent = []
+    results_lock = threading.Lock()
+
+    def record(index, booking_details, recipient_email, success, message, attempts):
+        booking_id = booking_details.get('booking_id') if isinstance(booking_details, dict) else None
+        with results_lock:
+            results.append((index, {
+                'recipient_email': recipient_email,
+                'booking_id': booking_id,
+                'success': success,
+                'message': message,
+                'attempts': attempts,
+            }))
+            if success:
+                sent.append((booking_details, recipient_email))
+        EMAILS.inc(outcome='sent' if success else 'failed')
+
+    def builder():
+        try:
+            for index, (booking_details, recipient_email) in enumerate(bookings):
+                try:
+                    msg = email_service.build_message(booking_details, recipient_email)
+                except Exception as e:
+                    record(index, booking_details, recipient_email, False,
+                           f"Error building email: {str(e)}", 0)
+                    continue
+                built.put((index, booking_details, recipient_email, msg))
+        finally:
+            for _ in range(sessions):
+                built.put(None)
+
+    def sender():
+        session = SMTPSession(email_service)
+        try:
+            while True:
+                item = built.get()
+                if item is None:
+                    break
+                index, booking_details, recipient_email, msg = item
+                success, message, attempts = deliver_with_retries(
+                    session, msg, max_retries, backoff, max_backoff
+                )
+                record(index, booking_details, recipient_email, success, message, attempts)
+        finally:
+            session.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=builder, name="tixbee-bulk-build", daemon=True)]
+    threads += [
+        threading.Thread(target=sender, name=f"tixbee-bulk-send-{i}", daemon=True)
+        for i in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # The whole group goes into the ledger in a few large transactions
+    if sent and email_service.ledger is not None:
+        try:
+            with span('ledger_write'):
+                email_service.ledger.add_many(sent)
+        except Exception as e:
+            log.error('ledger.write_failed', bookings=len(sent), error=str(e))
+
+    results.sort(key=lambda item: item[0])
+    return BulkResult([result for _, result in results], elapsed)
@@ -1,211 +1,211 @@
-import streamlit as st
+import binascii
+import secrets
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
-import qrcode
+from email.header import Header
 from io import BytesIO
-from datetime import datetime
+from config import default_config
+from email_template import INLINE_QR_CID, confirmation_subject, confirmation_template
+from telemetry import get_logger, metrics, span
+from ticket_token import qr_link_token
+
+SMTP_TIMEOUT = 30
+
+log = get_logger('email')
+EMAILS = metrics.counter('tixbee_emails_total', 'Confirmation emails by outcome', ('outcome',))
+
+# The MIME structure around the rendered parts never changes, so it is
+# encoded once. Every part is base64, which cannot contain a boundary.
+#
+#   multipart/alternative
+#     text/plain
+#     text/html                  (QR linked), or
+#     multipart/related          (QR attached)
+#       text/html
+#       image/png
+_TOKEN = secrets.token_hex(12)
+_ALTERNATIVE = f"=_tixbee_alt_{_TOKEN}"
+_RELATED = f"=_tixbee_rel_{_TOKEN}"
+_MESSAGE_HEAD = (
+    f'Content-Type: multipart/alternative; boundary="{_ALTERNATIVE}"\r\n'
+    'MIME-Version: 1.0\r\n'
+).encode('ascii')
+_TEXT_PART = (
+    f'\r\n--{_ALTERNATIVE}\r\n'
+    'Content-Type: text/plain; charset="utf-8"\r\n'
+    'Content-Transfer-Encoding: base64\r\n\r\n'
+).encode('ascii')
+_HTML_HEADERS = (
+    'Content-Type: text/html; charset="utf-8"\r\n'
+    'Content-Transfer-Encoding: base64\r\n\r\n'
+)
+_HTML_PART = f'\r\n--{_ALTERNATIVE}\r\n{_HTML_HEADERS}'.encode('ascii')
+_RELATED_HTML_PART = (
+    f'\r\n--{_ALTERNATIVE}\r\n'
+    f'Content-Type: multipart/related; boundary="{_RELATED}"; type="text/html"\r\n'
+    f'\r\n--{_RELATED}\r\n{_HTML_HEADERS}'
+).encode('ascii')
+_QR_PART = (
+    f'\r\n--{_RELATED}\r\n'
+    'Content-Type: image/png\r\n'
+    'Content-Transfer-Encoding: base64\r\n'
+    f'Content-ID: <{INLINE_QR_CID}>\r\n\r\n'
+).encode('ascii')
+_RELATED_CLOSE = f'\r\n--{_RELATED}--\r\n'.encode('ascii')
+_CLOSE = f'\r\n--{_ALTERNATIVE}--\r\n'.encode('ascii')
+
+
+def _header_value(value):
+    """A header value on one line, RFC 2047 encoded if it is not ASCII"""
+    value = ' '.join(str(value).split())
+    if value.isascii():
+        return value
+    return Header(value, 'utf-8').encode()
+
+
+def _base64_body(data):
+    """Base64 in 76-character CRLF lines; one C call, then slicing"""
+    encoded = binascii.b2a_base64(data, newline=False)
+    return b'\r\n'.join([encoded[i:i + 76] for i in range(0, len(encoded), 76)])
+
+
+class EncodedMessage:
+    """A confirmation email already serialized for SMTP"""
+
+    __slots__ = ('sender', 'recipient', 'data')
+
+    def __init__(self, sender, recipient, data):
+        self.sender = sender
+        self.recipient = recipient
+        self.data = data
+
+    def as_bytes(self):
+        return self.data
+
+    def send(self, server):
+        with span('smtp_send'):
+            server.sendmail(self.sender, [self.recipient], self.data)
+
 
 class EmailService:
-    def __init__(self):
-        # Email configuration
-        self.sender_email = st.secrets["EMAIL_USERNAME"]  # Gmail
-        self.sender_password = st.secrets["EMAIL_PASSWORD"]   #app password
-        self.smtp_server = st.secrets["EMAIL_HOST"]
-        self.smtp_port = int(st.secrets["EMAIL_PORT"])
+    def __init__(self, config=None, ledger=None):
+        # Email configuration; any mapping with these keys works, which
+        # lets tests point the service at a local SMTP stand-in
+        if config is None:
+            config = default_config()
+        self.sender_email = config["EMAIL_USERNAME"]  # Gmail
+        self.sender_password = config.get("EMAIL_PASSWORD")   #app password
+        self.smtp_server = config["EMAIL_HOST"]
+        self.smtp_port = int(config["EMAIL_PORT"])
+        self.use_tls = str(config.get("EMAIL_USE_TLS", True)).lower() not in ('false', '0', 'no')
+        # e.g. https://tixbee.example/bookings/{booking_id}/qr?token={token}; unset attaches the PNG
+        self.qr_url_template = config.get("EMAIL_QR_URL")
+        if self.qr_url_template and '{token}' not in self.qr_url_template:
+            # Booking IDs are guessable, so the link must carry the booking's QR link token
+            raise ValueError("EMAIL_QR_URL must contain {token}")
+        # Confirmed bookings are written to the ledger once their email is sent
+        self.ledger = ledger
 
     def generate_booking_qr(self, booking_details):
         """Generate QR code for booking details"""
-        # Create QR code data
-        qr_data = f"""
-        Visitor Name: {booking_details['customer_name']}
-        Booking ID: {booking_details['booking_id']}
-        City: {booking_details['city']}
-        Attraction: {booking_details['attraction']}
-        Visit Date: {booking_details['visit_date']}
-        Tickets: {booking_details['ticket_count']}
-        """
-        
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        # Create QR code image
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to bytes
-        img_byte_arr = BytesIO()
-        img.save(img_byte_arr, format='PNG')
-        img_byte_arr = img_byte_arr.getvalue()
-        
-        return img_byte_arr
+        # Shared, memoized engine so the on-screen ticket reuses this render
+        from ticket_qr import render_ticket_qr
+
+        return render_ticket_qr(booking_details, 'png')
+
+    def qr_url(self, booking_details):
+        """Link to the entry QR when EMAIL_QR_URL is set, else None and the QR is attached"""
+        if not self.qr_url_template:
+            return None
+        booking_id = booking_details['booking_id']
+        return self.qr_url_template.format(booking_id=booking_id, token=qr_link_token(booking_id))
 
     def create_email_template(self, booking_details):
-        # Convert date to DD-MM-YYYY format with day
+        """(text, html) bodies from the compiled confirmation template"""
+        return confirmation_template.render(booking_details, self.qr_url(booking_details))
+
+    def build_message(self, booking_details, recipient_email):
+        """Build the text and HTML confirmation, with the booking QR attached or linked"""
+        qr_url = self.qr_url(booking_details)
+        with span('template'):
+            text_content, html_content = confirmation_template.render(booking_details, qr_url)
+        headers = (
+            f"Subject: {_header_value(confirmation_subject(booking_details))}\r\n"
+            f"From: {_header_value(self.sender_email)}\r\n"
+            f"To: {_header_value(recipient_email)}\r\n"
+        ).encode('ascii')
+        parts = [_MESSAGE_HEAD, headers, _TEXT_PART, _base64_body(text_content.encode('utf-8'))]
+        if qr_url:
+            parts += [_HTML_PART, _base64_body(html_content.encode('utf-8'))]
+        else:
+            parts += [_RELATED_HTML_PART, _base64_body(html_content.encode('utf-8')),
+                      _QR_PART, _base64_body(self.generate_booking_qr(booking_details)), _RELATED_CLOSE]
+        parts.append(_CLOSE)
+        return EncodedMessage(self.sender_email, recipient_email, b''.join(parts))
+
+    def connect(self):
+        """Open an SMTP connection that is ready to send"""
+        log.debug('smtp.connect', host=self.smtp_server, port=self.smtp_port)
+        with span('smtp_connect'):
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=SMTP_TIMEOUT)
         try:
-            date_obj = datetime.strptime(booking_details['visit_date'], '%Y-%m-%d')
-            formatted_date = f"{date_obj.strftime('%d-%m-%Y')} ({date_obj.strftime('%A')})"
-        except:
-            formatted_date = booking_details['visit_date']
-
-        # Create QR code with booking details including name
-        qr_data = f"""
-        Visitor Name: {booking_details['customer_name']}
-        Booking ID: {booking_details['booking_id']}
-        City: {booking_details['city']}
-        Attraction: {booking_details['attraction']}
-        Visit Date: {formatted_date}
-        Tickets: {booking_details['ticket_count']}
-        Amount: ₹{booking_details['amount']}
-        """
-        
-        return f"""
-        <div style="font-family: Arial, sans-serif;">
-            <h2 style="text-align: center; background-color: #4CAF50; color: white; padding: 20px; margin: 0;">
-                Booking Confirmation 🎫
-            </h2>
-            <p style="text-align: center; background-color: #4CAF50; color: white; padding: 10px; margin: 0;">
-                Thank you for choosing TixBee! ✨
-            </p>
-            
-            <div style="padding: 20px;">
-                <p>Hey {booking_details['customer_name']}! 👋</p>
-                
-                <p>Your booking has been confirmed! Here are your booking details: 📋</p>
-                
-                <table style="width: 100%; border-collapse: collapse;">
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;">Booking ID</td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">{booking_details['booking_id']}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;">City</td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">{booking_details['city']} </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;">Attraction</td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">{booking_details['attraction']} </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;">Visit Date</td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">{formatted_date} </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;">Tickets</td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">{booking_details['ticket_count']} </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;">Total Amount</td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">₹{booking_details['amount']} </td>
-                    </tr>
-                </table>
-
-                <div style="text-align: center; margin: 20px 0;">
-                    <p>Your Entry QR Code:</p>
-                    <img src="cid:booking_qr" alt="Booking QR Code" style="width: 200px;">
-                    <p>Please show this QR code at the entrance</p>
-                </div>
-
-                <p><strong>Important Information:</strong> ℹ️</p>
-                <ul>
-                    <li>Please arrive 15 minutes before your scheduled time ⏰</li>
-                    <li>Keep this QR code handy for entry 📱</li>
-                    <li>This ticket is non-transferable 🚫</li>
-                </ul>
-
-                <p style="text-align: center; font-size: 12px; color: #666;">
-                    For any queries, please contact us at support@tixbee.com
-                </p>
-                
-                <p style="text-align: center; font-size: 12px; color: #666;">
-                    © 2024 TixBee. All rights reserved.
-                </p>
-            </div>
-        </div>
-        """
+            if self.use_tls:
+                with span('smtp_starttls'):
+                    server.starttls()
+            if self.sender_password:
+                with span('smtp_login'):
+                    server.login(self.sender_email, self.sender_password)
+        except Exception:
+            server.close()
+            raise
+        return server
 
     def send_confirmation_email(self, booking_details, recipient_email):
         """Send booking confirmation email"""
         try:
-            print(f"Attempting to send email to: {recipient_email}")
-            print(f"Booking details: {booking_details}")
-            
-            # Create message container
-            msg = MIMEMultipart('related')
-            msg['Subject'] = f"TixBee Booking Confirmation - {booking_details['booking_id']}"
-            msg['From'] = self.sender_email
-            msg['To'] = recipient_email
-
-            # Generate booking QR code
-            print("Generating booking QR code...")
-            booking_qr = self.generate_booking_qr(booking_details)
-
-            # Create HTML content
-            print("Creating email template...")
-            html_content = self.create_email_template(booking_details)
-            msg.attach(MIMEText(html_content, 'html'))
-
-            # Attach booking QR code
-            print("Attaching QR code...")
-            booking_qr_img = MIMEImage(booking_qr)
-            booking_qr_img.add_header('Content-ID', '<booking_qr>')
-            msg.attach(booking_qr_img)
-
-            print("Connecting to SMTP server...")
+            msg = self.build_message(booking_details, recipient_email)
+
             # Connect to SMTP server and send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                print("Logging in...")
-                server.login(self.sender_email, self.sender_password)
-                print("Sending email...")
-                server.send_message(msg)
-
-            print("Email sent successfully!")
+            with self.connect() as server:
+                msg.send(server)
+
+            self.record_sent(booking_details, recipient_email)
             return True, "Email sent successfully!"
 
         except Exception as e:
-            print(f"Error sending email: {str(e)}")
+            self.record_failed(booking_details, recipient_email, e)
             return False, f"Error sending email: {str(e)}"
 
+    def record_sent(self, booking_details, recipient_email):
+        """Count a confirmation that went out and add its booking to the ledger"""
+        EMAILS.inc(outcome='sent')
+        log.info('email.sent', booking_id=booking_details.get('booking_id'), email=recipient_email)
+        if self.ledger is None:
+            return
+        try:
+            with span('ledger_write'):
+                self.ledger.record(booking_details, recipient_email)
+        except Exception as e:
+            # The email is already out; a ledger failure must not turn it into an error
+            log.error('ledger.write_failed', booking_id=booking_details.get('booking_id'), error=str(e))
+
+    def record_failed(self, booking_details, recipient_email, error):
+        EMAILS.inc(outcome='failed')
+        booking_id = booking_details.get('booking_id') if isinstance(booking_details, dict) else None
+        log.error('email.failed', booking_id=booking_id, email=recipient_email, error=str(error))
+
+    def send_bulk_confirmations(self, bookings, sessions=2):
+        """Send confirmations for (booking_details, recipient_email) pairs in bulk"""
+        from email_dispatch import send_bulk
+        result = send_bulk(self, bookings, sessions=sessions)
+        log.info('email.bulk_finished', sent=result.sent, failed=result.failed,
+                 seconds=round(result.elapsed, 3), per_second=round(result.throughput, 1))
+        return result
+
     def create_booking_qr(self, booking_details):
         """Create QR code for booking confirmation"""
         try:
-            # Include customer name in QR data
-            qr_data = f"""
-            Visitor: {booking_details['customer_name']}
-            Booking ID: {booking_details['booking_id']}
-            Attraction: {booking_details['attraction']}
-            Visit Date: {booking_details['visit_date']}
-            Tickets: {booking_details['ticket_count']}
-            Amount: ₹{booking_details['amount']}
-            """
-            
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            
-            # Create QR code image
-            qr_image = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convert to bytes
-            img_byte_arr = BytesIO()
-            qr_image.save(img_byte_arr, format='PNG')
-            img_byte_arr.seek(0)
-            
-            return img_byte_arr
+            return BytesIO(self.generate_booking_qr(booking_details))
 
         except Exception as e:
-            print(f"Error creating QR code: {str(e)}")
+            log.error('qr.render_failed', booking_id=booking_details.get('booking_id'), error=str(e))
             return None
@@ -1,31 +1,157 @@
-def send_booking_confirmation(user_email, booking_details):
+"""Confirmation email templates, compiled once per process.
+
+CONFIRMATION holds the copy of the email once; it is laid out as HTML
+and as plain text and each layout is parsed a single time into a
+%-format string with one named slot per booking field. Rendering a
+message is then one C level string format per part over field values
+that are looked up once. Visit dates are formatted through a small
+cache since most bookings share a few days.
+"""
+import html
+from datetime import date
+from functools import lru_cache
+from string import Formatter
+
+# One source for both bodies: every block below is laid out once as
+# HTML and once as plain text when the module is imported
+CONFIRMATION = {
+    'title': "Booking Confirmation 🎫",
+    'tagline': "Thank you for choosing TixBee! ✨",
+    'greeting': "Hey {customer_name}! 👋",
+    'intro': "Your booking has been confirmed! Here are your booking details: 📋",
+    'details': (
+        ('Booking ID', "{booking_id}"),
+        ('City', "{city}"),
+        ('Attraction', "{attraction}"),
+        ('Visit Date', "{visit_date}"),
+        ('Tickets', "{ticket_count}"),
+        ('Total Amount', "₹{amount}"),
+    ),
+    'qr_heading': "Your Entry QR Code:",
+    'qr_caption': "Please show this QR code at the entrance",
+    'info_heading': "Important Information: ℹ️",
+    'info': (
+        "Please arrive 15 minutes before your scheduled time ⏰",
+        "Keep this QR code handy for entry 📱",
+        "This ticket is non-transferable 🚫",
+    ),
+    'contact': "For any queries, please contact us at support@tixbee.com",
+    'copyright': "© 2024 TixBee. All rights reserved.",
+}
+
+# Where the QR is when it is attached rather than linked
+INLINE_QR_CID = 'booking_qr'
+INLINE_QR_TEXT = "attached to the HTML version of this email"
+
+_BANNER = "text-align: center; background-color: #4CAF50; color: white; margin: 0;"
+_CELL = "padding: 8px; border: 1px solid #ddd;"
+_SMALL = "text-align: center; font-size: 12px; color: #666;"
+
+
+def _html_source(spec):
+    escape = html.escape  # the static copy; {fields} are escaped when rendered
+    rows = ''.join(f'<tr><td style="{_CELL}">{escape(label)}</td><td style="{_CELL}">{escape(value)}</td></tr>'
+                   for label, value in spec['details'])
+    items = ''.join(f'<li>{escape(item)}</li>' for item in spec['info'])
+    return f"""
+        <div style="font-family: Arial, sans-serif;">
+        <h2 style="{_BANNER} padding: 20px;">{escape(spec['title'])}</h2>
+        <p style="{_BANNER} padding: 10px;">{escape(spec['tagline'])}</p>
+        <div style="padding: 20px;">
+        <p>{escape(spec['greeting'])}</p>
+        <p>{escape(spec['intro'])}</p>
+        <table style="width: 100%; border-collapse: collapse;">{rows}</table>
+        <div style="text-align: center; margin: 20px 0;">
+        <p>{escape(spec['qr_heading'])}</p>
+        <img src="{{qr_src}}" alt="Booking QR Code" style="width: 200px;">
+        <p>{escape(spec['qr_caption'])}</p>
+        </div>
+        <p><strong>{escape(spec['info_heading'])}</strong></p>
+        <ul>{items}</ul>
+        <p style="{_SMALL}">{escape(spec['contact'])}</p>
+        <p style="{_SMALL}">{escape(spec['copyright'])}</p>
+        </div>
+        </div>
     """
-    Format and send booking confirmation email
+
+
+def _text_source(spec):
+    width = max(len(label) for label, _ in spec['details']) + 2
+    lines = [spec['title'], spec['tagline'], '', spec['greeting'], '', spec['intro'], '']
+    lines += [f"{label + ':':<{width}}{value}" for label, value in spec['details']]
+    lines += ['', f"{spec['qr_heading']} {{qr_link}}", spec['qr_caption'], '', spec['info_heading']]
+    lines += [f"- {item}" for item in spec['info']]
+    lines += ['', spec['contact'], spec['copyright'], '']
+    return '\r\n'.join(lines)
+
+
+CONFIRMATION_SUBJECT = "TixBee Booking Confirmation - {booking_id}"
+
+FIELDS = ('booking_id', 'customer_name', 'city', 'attraction', 'visit_date', 'ticket_count', 'amount')
+
+
+class CompiledTemplate:
+    """A {field} template turned into a %-format string once.
+
+    Indentation is stripped from every line at compile time, and field
+    values go through escape (html.escape by default) when rendered.
     """
+
+    def __init__(self, source, escape=html.escape, strip=True):
+        if strip:
+            source = '\n'.join(line.strip() for line in source.splitlines() if line.strip())
+        parts = []
+        fields = []
+        for literal, field, _, _ in Formatter().parse(source):
+            parts.append(literal.replace('%', '%%'))
+            if field is not None:
+                parts.append(f'%({field})s')
+                fields.append(field)
+        self.format = ''.join(parts)
+        self.fields = tuple(dict.fromkeys(fields))
+        self.escape = escape
+
+    def render(self, values):
+        escape = self.escape
+        if escape is None:
+            return self.format % values
+        return self.format % {field: escape(str(values[field])) for field in self.fields}
+
+
+@lru_cache(maxsize=1024)
+def format_visit_date(visit_date):
+    """'2026-11-02' -> '02-11-2026 (Monday)'; anything else is shown as given"""
     try:
-        subject = f"TixBee Booking Confirmation - {booking_details.get('booking_id', 'Unknown')}"
-        
-        # Create email body
-        body = f"""
-        Dear {booking_details.get('name', 'Customer')},
-
-        Thank you for booking with TixBee! Here are your booking details:
-
-        🎫 Booking ID: {booking_details.get('booking_id', 'Unknown')}
-        🌆 City: {booking_details.get('city', 'Unknown')}
-        🏰 Attraction: {booking_details.get('attraction', 'Unknown')}
-        📅 Visit Date: {booking_details.get('visit_date', 'Unknown')}
-        🎟️ Tickets: {booking_details.get('ticket_count', 'Unknown')}
-        💰 Amount Paid: ₹{booking_details.get('amount', '0')}
-
-        Please show this email at the entrance.
-
-        Have a great time!
-        Team TixBee
-        """
-        
-        return subject, body
-
-    except Exception as e:
-        print(f"Error in email template: {str(e)}")
-        return None, None 
\ No newline at end of file
+        day = date.fromisoformat(str(visit_date))
+    except ValueError:
+        return str(visit_date)
+    return f"{day.strftime('%d-%m-%Y')} ({day.strftime('%A')})"
+
+
+def confirmation_fields(booking_details):
+    """Template values for a booking, with the visit date formatted for display"""
+    values = {field: booking_details[field] for field in FIELDS}
+    values['visit_date'] = format_visit_date(booking_details['visit_date'])
+    return values
+
+
+class ConfirmationTemplate:
+    """Plain-text and HTML confirmation bodies compiled from one source"""
+
+    def __init__(self, spec=CONFIRMATION):
+        self.html = CompiledTemplate(_html_source(spec))
+        self.text = CompiledTemplate(_text_source(spec), escape=None, strip=False)
+
+    def render(self, booking_details, qr_url=None):
+        """(text, html) for a booking; with qr_url the QR is linked instead of attached"""
+        values = confirmation_fields(booking_details)
+        values['qr_src'] = qr_url or f'cid:{INLINE_QR_CID}'
+        values['qr_link'] = qr_url or INLINE_QR_TEXT
+        return self.text.render(values), self.html.render(values)
+
+
+confirmation_template = ConfirmationTemplate()
+
+
+def confirmation_subject(booking_details):
+    return CONFIRMATION_SUBJECT.format(booking_id=booking_details['booking_id'])
@@ -0,0 +1,120 @@
+"""Offline ticket verification for gate scanners.
+
+Tokens are checked against the shared signing key and an in-memory set
+of redeemed booking IDs, so a scanner keeps working without network
+access and each ticket is admitted only once.
+
+Usage: python gate_verify.py [--redeemed FILE] [--date YYYY-MM-DD] < scans.txt
+"""
+import argparse
+import os
+import sys
+import threading
+from datetime import date
+
+from ticket_token import InvalidTicket, MissingSigningKey, decode_ticket, signing_key
+
+ACCEPTED = 'ACCEPTED'
+ALREADY_REDEEMED = 'ALREADY_REDEEMED'
+WRONG_DATE = 'WRONG_DATE'
+INVALID = 'INVALID'
+
+
+class ScanResult:
+    """Outcome of checking one scanned token"""
+
+    __slots__ = ('status', 'claims', 'reason')
+
+    def __init__(self, status, claims=None, reason=None):
+        self.status = status
+        self.claims = claims
+        self.reason = reason
+
+    @property
+    def ok(self):
+        return self.status == ACCEPTED
+
+    def __repr__(self):
+        booking_id = self.claims.booking_id if self.claims else None
+        return f"ScanResult({self.status}, {booking_id!r}, {self.reason!r})"
+
+
+class GateVerifier:
+    """Verify ticket tokens and redeem each booking ID at most once"""
+
+    def __init__(self, key=None, visit_date=None, redeemed=None):
+        # Resolved up front: a scanner without the key must not start at all
+        self.key = key or signing_key()
+        self.visit_date = visit_date
+        self.redeemed = set(redeemed or ())
+        self._lock = threading.Lock()
+
+    def verify(self, token):
+        """Check a token without redeeming it"""
+        try:
+            claims = decode_ticket(token, self.key)
+        except InvalidTicket as e:
+            return ScanResult(INVALID, reason=str(e))
+        # Tickets whose date could not be parsed at booking time carry no date
+        if self.visit_date is not None and claims.visit_date not in (None, self.visit_date):
+            return ScanResult(WRONG_DATE, claims, f"Ticket is for {claims.visit_date.isoformat()}")
+        if claims.booking_id in self.redeemed:
+            return ScanResult(ALREADY_REDEEMED, claims, "Ticket has already been used")
+        return ScanResult(ACCEPTED, claims)
+
+    def scan(self, token):
+        """Verify a token and redeem it if it is valid"""
+        result = self.verify(token)
+        if not result.ok:
+            return result
+        with self._lock:
+            if result.claims.booking_id in self.redeemed:
+                return ScanResult(ALREADY_REDEEMED, result.claims, "Ticket has already been used")
+            self.redeemed.add(result.claims.booking_id)
+        return result
+
+    def load_redeemed(self, path):
+        """Merge booking IDs from a file with one ID per line"""
+        if os.path.exists(path):
+            with open(path) as file:
+                ids = {line.strip() for line in file if line.strip()}
+            with self._lock:
+                self.redeemed.update(ids)
+
+    def save_redeemed(self, path):
+        with self._lock:
+            ids = sorted(self.redeemed)
+        with open(path, 'w') as file:
+            file.writelines(f"{booking_id}\n" for booking_id in ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify scanned TixBee tickets offline")
+    parser.add_argument('--redeemed', help='file of redeemed booking IDs to load and update')
+    parser.add_argument('--date', help='only admit tickets for this visit date (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    try:
+        verifier = GateVerifier(visit_date=date.fromisoformat(args.date) if args.date else None)
+    except MissingSigningKey as e:
+        parser.exit(2, f"{parser.prog}: {e}\n")
+    if args.redeemed:
+        verifier.load_redeemed(args.redeemed)
+
+    try:
+        for line in sys.stdin:
+            token = line.strip()
+            if not token:
+                continue
+            result = verifier.scan(token)
+            if result.ok:
+                print(f"{ACCEPTED} {result.claims.booking_id} ({result.claims.tickets} tickets)")
+            else:
+                print(f"{result.status} {result.reason}")
+    finally:
+        if args.redeemed:
+            verifier.save_redeemed(args.redeemed)
+
+
+if __name__ == '__main__':
+    main()
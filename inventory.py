@@ -0,0 +1,251 @@
+"""Ticket capacity per attraction, visit date and ticket category.
+
+A booking first holds its tickets when the payment window opens, then
+confirms them when payment completes or releases them if it doesn't.
+Holds that are neither confirmed nor released expire on their own, so
+an abandoned payment gives its tickets back.
+
+SQLite is the source of truth. Every change is one conditional UPDATE
+inside a BEGIN IMMEDIATE transaction, which keeps holds atomic across
+threads and across processes sharing the database file. Each process
+also keeps an in-memory index of the slots it has touched, so
+availability checks are a dict lookup.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from telemetry import get_logger
+
+# Tickets per category per attraction per day, unless set_capacity says otherwise
+DEFAULT_CAPACITY = {'adult': 500, 'student': 200, 'child': 300}
+HOLD_SECONDS = 120
+SWEEP_INTERVAL = 1.0
+
+HELD = 'held'
+CONFIRMED = 'confirmed'
+RELEASED = 'released'
+EXPIRED = 'expired'
+
+log = get_logger('inventory')
+
+
+class SoldOut(Exception):
+    """Not enough tickets left in one category for a hold"""
+
+    def __init__(self, attraction, visit_date, category, requested, available):
+        super().__init__(f"only {available} {category} tickets left for {attraction} on {visit_date}, "
+                         f"{requested} requested")
+        self.attraction = attraction
+        self.visit_date = visit_date
+        self.category = category
+        self.requested = requested
+        self.available = available
+
+
+class Hold:
+    """Tickets set aside for one booking"""
+
+    __slots__ = ('booking_id', 'attraction', 'visit_date', 'quantities', 'expires', 'status')
+
+    def __init__(self, booking_id, attraction, visit_date, quantities, expires, status=HELD):
+        self.booking_id = booking_id
+        self.attraction = attraction
+        self.visit_date = visit_date
+        self.quantities = quantities
+        self.expires = expires
+        self.status = status
+
+    def __repr__(self):
+        return f"Hold({self.booking_id!r}, {self.attraction!r}, {self.visit_date!r}, {self.quantities}, {self.status})"
+
+
+class Inventory:
+    """Capacity store with atomic hold, confirm and release"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS slots (
+            attraction TEXT NOT NULL,
+            visit_date TEXT NOT NULL,
+            category TEXT NOT NULL,
+            capacity INTEGER NOT NULL,
+            held INTEGER NOT NULL DEFAULT 0,
+            sold INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (attraction, visit_date, category)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS holds (
+            booking_id TEXT PRIMARY KEY,
+            attraction TEXT NOT NULL,
+            visit_date TEXT NOT NULL,
+            quantities TEXT NOT NULL,
+            expires REAL NOT NULL,
+            status TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS holds_open ON holds (status, expires);
+    """
+
+    def __init__(self, path='inventory.db', default_capacity=None, hold_seconds=HOLD_SECONDS,
+                 sweep_interval=SWEEP_INTERVAL, clock=time.time):
+        self.path = path
+        self.default_capacity = dict(default_capacity or DEFAULT_CAPACITY)
+        self.hold_seconds = hold_seconds
+        self.clock = clock
+        self._index = {}  # (attraction, visit_date, category) -> [capacity, held, sold]
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(self.SCHEMA)
+        for attraction, visit_date, category, capacity, held, sold in self._db.execute('SELECT * FROM slots'):
+            self._index[(attraction, visit_date, category)] = [capacity, held, sold]
+
+        self._stop = threading.Event()
+        self._sweeper = None
+        if sweep_interval:
+            self._sweeper = threading.Thread(target=self._sweep, args=(sweep_interval,),
+                                             name="tixbee-inventory", daemon=True)
+            self._sweeper.start()
+
+    def _transaction(self, work):
+        """Run work(db) in one write transaction, serialized with other processes"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(self._db)
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            return result
+
+    def _ensure_slot(self, db, attraction, visit_date, category):
+        db.execute('INSERT OR IGNORE INTO slots (attraction, visit_date, category, capacity) VALUES (?, ?, ?, ?)',
+                   (attraction, visit_date, category, self.default_capacity.get(category, 0)))
+
+    def _refresh(self, db, attraction, visit_date, categories):
+        for category in categories:
+            row = db.execute('SELECT capacity, held, sold FROM slots WHERE attraction = ? AND visit_date = ? '
+                             'AND category = ?', (attraction, visit_date, category)).fetchone()
+            if row is not None:
+                self._index[(attraction, visit_date, category)] = list(row)
+
+    def set_capacity(self, attraction, visit_date, category, capacity):
+        def work(db):
+            self._ensure_slot(db, attraction, visit_date, category)
+            db.execute('UPDATE slots SET capacity = ? WHERE attraction = ? AND visit_date = ? AND category = ?',
+                       (capacity, attraction, visit_date, category))
+            self._refresh(db, attraction, visit_date, [category])
+        self._transaction(work)
+
+    def available(self, attraction, visit_date, category):
+        """Tickets left in a slot, as last seen by this process"""
+        slot = self._index.get((attraction, visit_date, category))
+        if slot is None:
+            return self.default_capacity.get(category, 0)
+        capacity, held, sold = slot
+        return capacity - held - sold
+
+    def hold(self, booking_id, attraction, visit_date, quantities, seconds=None):
+        """Set tickets aside for a booking, all categories or none.
+
+        Raises SoldOut if any category is short. Holding again for the
+        same booking returns its open hold unchanged.
+        """
+        wanted = {category: count for category, count in quantities.items() if count}
+        expires = self.clock() + (self.hold_seconds if seconds is None else seconds)
+
+        def work(db):
+            row = db.execute('SELECT quantities, expires, status FROM holds WHERE booking_id = ?',
+                             (booking_id,)).fetchone()
+            if row is not None and row[2] in (HELD, CONFIRMED):
+                return Hold(booking_id, attraction, visit_date, json.loads(row[0]), row[1], row[2])
+            for category, count in wanted.items():
+                self._ensure_slot(db, attraction, visit_date, category)
+                updated = db.execute(
+                    'UPDATE slots SET held = held + ? WHERE attraction = ? AND visit_date = ? AND category = ? '
+                    'AND capacity - held - sold >= ?',
+                    (count, attraction, visit_date, category, count)
+                ).rowcount
+                if not updated:
+                    capacity, held, sold = db.execute(
+                        'SELECT capacity, held, sold FROM slots WHERE attraction = ? AND visit_date = ? '
+                        'AND category = ?', (attraction, visit_date, category)).fetchone()
+                    raise SoldOut(attraction, visit_date, category, count, capacity - held - sold)
+            db.execute('INSERT OR REPLACE INTO holds (booking_id, attraction, visit_date, quantities, expires, status) '
+                       'VALUES (?, ?, ?, ?, ?, ?)',
+                       (booking_id, attraction, visit_date, json.dumps(wanted), expires, HELD))
+            self._refresh(db, attraction, visit_date, wanted)
+            return Hold(booking_id, attraction, visit_date, wanted, expires)
+
+        try:
+            return self._transaction(work)
+        except SoldOut:
+            # Unpaid holds past their expiry may be all that is in the way
+            if not self.expire():
+                raise
+            return self._transaction(work)
+
+    def _settle(self, booking_id, status, now=None):
+        """Move an open hold to status; returns False if there was no open hold"""
+        def work(db):
+            row = db.execute('SELECT attraction, visit_date, quantities, expires FROM holds '
+                             'WHERE booking_id = ? AND status = ?', (booking_id, HELD)).fetchone()
+            if row is None:
+                return False
+            attraction, visit_date, quantities, expires = row
+            if status == CONFIRMED and now is not None and expires < now:
+                return False
+            quantities = json.loads(quantities)
+            moves = 'held = held - ?, sold = sold + ?' if status == CONFIRMED else 'held = held - ?'
+            for category, count in quantities.items():
+                params = (count, count) if status == CONFIRMED else (count,)
+                db.execute(f'UPDATE slots SET {moves} WHERE attraction = ? AND visit_date = ? AND category = ?',
+                           params + (attraction, visit_date, category))
+            db.execute('UPDATE holds SET status = ? WHERE booking_id = ?', (status, booking_id))
+            self._refresh(db, attraction, visit_date, quantities)
+            return True
+        return self._transaction(work)
+
+    def confirm(self, booking_id):
+        """Turn a booking's hold into sold tickets; False if it expired or was released"""
+        return self._settle(booking_id, CONFIRMED, now=self.clock())
+
+    def release(self, booking_id):
+        """Give a booking's held tickets back; False if there was no open hold"""
+        return self._settle(booking_id, RELEASED)
+
+    def expire(self, now=None):
+        """Release every hold past its expiry and return how many there were"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            expired = [booking_id for booking_id, in self._db.execute(
+                'SELECT booking_id FROM holds WHERE status = ? AND expires < ?', (HELD, now))]
+        return sum(self._settle(booking_id, EXPIRED) for booking_id in expired)
+
+    def get_hold(self, booking_id):
+        with self._lock:
+            row = self._db.execute('SELECT attraction, visit_date, quantities, expires, status FROM holds '
+                                   'WHERE booking_id = ?', (booking_id,)).fetchone()
+        if row is None:
+            return None
+        attraction, visit_date, quantities, expires, status = row
+        return Hold(booking_id, attraction, visit_date, json.loads(quantities), expires, status)
+
+    def _sweep(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.expire()
+            except sqlite3.Error as e:
+                log.error('inventory.expire_failed', error=str(e))
+
+    def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+        with self._lock:
+            self._db.close()
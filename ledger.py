@@ -0,0 +1,234 @@
+"""Durable record of confirmed bookings.
+
+A booking is written here once its confirmation email has been sent,
+so support and gate staff can look it up by booking ID, by customer
+email, or by attraction and visit date without searching an inbox.
+
+Bookings live in a SQLite table in WAL mode clustered on (attraction,
+visit_date, booking_id), so "everyone visiting Victoria Memorial on
+2026-11-02" is one contiguous read. Booking ID (unique) and email have
+secondary indexes, making those lookups an index probe plus one row
+fetch. Visit dates are stored as YYYY-MM-DD so date ranges sort
+correctly.
+
+Usage: python ledger.py [--db PATH] (--id ID | --email EMAIL | --attraction NAME --date YYYY-MM-DD [--until YYYY-MM-DD])
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+
+from ticket_token import parse_booking_date, ticket_total
+
+LEDGER_DB = 'ledger.db'
+BATCH_SIZE = 5000  # rows per transaction in add_many
+CACHE_KIB = 64 * 1024  # page cache per connection
+
+COLUMNS = ('booking_id', 'email', 'customer_name', 'city', 'attraction', 'visit_date',
+           'ticket_count', 'tickets', 'amount', 'confirmed_at')
+
+
+class Booking:
+    """One confirmed booking as stored in the ledger"""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, booking_id, email, customer_name, city, attraction, visit_date,
+                 ticket_count, tickets, amount, confirmed_at):
+        self.booking_id = booking_id
+        self.email = email
+        self.customer_name = customer_name
+        self.city = city
+        self.attraction = attraction
+        self.visit_date = visit_date
+        self.ticket_count = ticket_count
+        self.tickets = tickets
+        self.amount = amount
+        self.confirmed_at = confirmed_at
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    def __repr__(self):
+        return f"Booking({self.booking_id!r}, {self.attraction!r}, {self.visit_date!r}, {self.email!r})"
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def normalize_visit_date(visit_date):
+    """YYYY-MM-DD when the date can be parsed, else the text as given"""
+    if isinstance(visit_date, str) and len(visit_date) == 10:
+        # The local flow already stores ISO dates; skip strptime for them
+        try:
+            return date.fromisoformat(visit_date).isoformat()
+        except ValueError:
+            pass
+    parsed = parse_booking_date(visit_date)
+    return parsed.isoformat() if parsed else str(visit_date or '').strip()
+
+
+class Ledger:
+    """Confirmed bookings in SQLite, one connection per thread"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bookings (
+            booking_id TEXT NOT NULL,
+            email TEXT NOT NULL,
+            customer_name TEXT,
+            city TEXT,
+            attraction TEXT NOT NULL,
+            visit_date TEXT NOT NULL,
+            ticket_count TEXT,
+            tickets INTEGER NOT NULL,
+            amount TEXT,
+            confirmed_at REAL NOT NULL,
+            PRIMARY KEY (attraction, visit_date, booking_id)
+        ) WITHOUT ROWID;
+        CREATE UNIQUE INDEX IF NOT EXISTS bookings_id ON bookings (booking_id);
+        CREATE INDEX IF NOT EXISTS bookings_email ON bookings (email);
+    """
+
+    def __init__(self, path=LEDGER_DB, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            # New rows and index entries land all over the tree rather than at the end
+            connection.execute(f'PRAGMA cache_size=-{CACHE_KIB}')
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _row(self, booking_details, email, confirmed_at):
+        return (
+            str(booking_details['booking_id']),
+            normalize_email(email),
+            booking_details.get('customer_name'),
+            booking_details.get('city'),
+            booking_details['attraction'],
+            normalize_visit_date(booking_details['visit_date']),
+            str(booking_details.get('ticket_count', '')),
+            ticket_total(booking_details.get('ticket_count', 0)),
+            str(booking_details.get('amount', '')),
+            confirmed_at,
+        )
+
+    def record(self, booking_details, email):
+        """Add one confirmed booking; True if it was not in the ledger yet"""
+        return self.add_many([(booking_details, email)]) == 1
+
+    def add_many(self, bookings, batch_size=BATCH_SIZE):
+        """Add (booking_details, email) pairs in batches of one transaction each.
+
+        Bookings already in the ledger are left as they are, so a resent
+        confirmation is not counted twice. Returns how many were added.
+        """
+        connection = self._connect()
+        added = 0
+        batch = []
+        now = self.clock()
+        for booking_details, email in bookings:
+            batch.append(self._row(booking_details, email, now))
+            if len(batch) >= batch_size:
+                added += self._insert(connection, batch)
+                batch = []
+        if batch:
+            added += self._insert(connection, batch)
+        return added
+
+    def _insert(self, connection, rows):
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            before = connection.total_changes
+            connection.executemany(f"INSERT OR IGNORE INTO bookings ({', '.join(COLUMNS)}) "
+                                   f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            added = connection.total_changes - before
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return added
+
+    def _select(self, where, params, order='booking_id', limit=None):
+        sql = f"SELECT {', '.join(COLUMNS)} FROM bookings WHERE {where} ORDER BY {order}"
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params += (limit,)
+        return [Booking(*row) for row in self._connect().execute(sql, params)]
+
+    def get(self, booking_id):
+        """The booking with this ID, or None"""
+        rows = self._select('booking_id = ?', (booking_id,))
+        return rows[0] if rows else None
+
+    def by_email(self, email, limit=None):
+        """A customer's bookings, oldest first"""
+        return self._select('email = ?', (normalize_email(email),), limit=limit)
+
+    def by_visit(self, attraction, visit_date, until=None, limit=None):
+        """Bookings for an attraction on a visit date, or from visit_date through until"""
+        start = normalize_visit_date(visit_date)
+        end = normalize_visit_date(until) if until else start
+        return self._select('attraction = ? AND visit_date BETWEEN ? AND ?', (attraction, start, end),
+                            order='visit_date, booking_id', limit=limit)
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM bookings').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up confirmed TixBee bookings")
+    parser.add_argument('--db', default=os.getenv('LEDGER_DB', LEDGER_DB))
+    parser.add_argument('--id', help='booking ID')
+    parser.add_argument('--email', help='customer email')
+    parser.add_argument('--attraction', help='attraction name, together with --date')
+    parser.add_argument('--date', help='visit date (YYYY-MM-DD)')
+    parser.add_argument('--until', help='last visit date of a range (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    ledger = Ledger(args.db)
+    try:
+        if args.id:
+            booking = ledger.get(args.id)
+            bookings = [booking] if booking else []
+        elif args.email:
+            bookings = ledger.by_email(args.email)
+        elif args.attraction and args.date:
+            bookings = ledger.by_visit(args.attraction, args.date, args.until)
+        else:
+            parser.error("give --id, --email, or --attraction with --date")
+        for booking in bookings:
+            print(json.dumps(booking.to_dict(), ensure_ascii=False))
+        print(f"{len(bookings)} booking(s)")
+    finally:
+        ledger.close()
+
+
+if __name__ == '__main__':
+    main()
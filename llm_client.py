@@ -0,0 +1,171 @@
+"""Process-wide Gemini model cache with a local stub backend.
+
+genai.configure() throws away the SDK's cached clients, so calling it
+on every Streamlit rerun also threw away the open connection. Here the
+SDK is configured once per process, one model is kept per system
+instruction, and sessions only create cheap chat objects from it.
+
+Set TIXBEE_LLM_BACKEND=stub to use StubModel instead of Gemini, for
+example to load-test many concurrent sessions without network access.
+"""
+import os
+import re
+import threading
+import time
+from datetime import date
+
+MODEL_NAME = "gemini-1.5-flash"
+MAX_CACHED_MODELS = 2  # today's and yesterday's system instruction around midnight
+
+_lock = threading.Lock()
+_configured = False
+_models = {}
+
+
+def _configure_gemini(api_key):
+    global _configured
+    import google.generativeai as genai
+
+    if not _configured:
+        # grpc keeps one multiplexed channel per process; rest uses a pooled HTTP session
+        genai.configure(api_key=api_key, transport=os.getenv('GEMINI_TRANSPORT') or None)
+        _configured = True
+    return genai
+
+
+def get_model(system_instruction, model_name=MODEL_NAME, api_key=None, backend=None):
+    """Return the shared model for a system instruction, creating it on first use"""
+    backend = backend or os.getenv('TIXBEE_LLM_BACKEND', 'gemini')
+    key = (backend, model_name, system_instruction)
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            if backend == 'stub':
+                model = StubModel(system_instruction, latency=float(os.getenv('TIXBEE_STUB_LATENCY', '0')))
+            else:
+                genai = _configure_gemini(api_key or os.getenv('GEMINI_API_KEY'))
+                model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+            _models[key] = model
+            while len(_models) > MAX_CACHED_MODELS:
+                _models.pop(next(iter(_models)))
+    return model
+
+
+def start_chat(system_instruction, **kwargs):
+    """Create a per-session chat from the shared model"""
+    return get_model(system_instruction, **kwargs).start_chat(history=[])
+
+
+class LazyChat:
+    """Chat that loads the shared model when the first message is sent.
+
+    Locally answered turns only touch ``history``, so a session that
+    has not needed the LLM yet never imports the Gemini SDK.
+    """
+
+    def __init__(self, system_instruction, **model_kwargs):
+        self.system_instruction = system_instruction
+        self.model_kwargs = model_kwargs
+        self._history = []
+        self._chat = None
+
+    @property
+    def history(self):
+        return self._chat.history if self._chat is not None else self._history
+
+    @history.setter
+    def history(self, value):
+        if self._chat is not None:
+            self._chat.history = value
+        else:
+            self._history = list(value)
+
+    def send_message(self, content, **kwargs):
+        if self._chat is None:
+            model = get_model(self.system_instruction, **self.model_kwargs)
+            self._chat = model.start_chat(history=self._history)
+        return self._chat.send_message(content, **kwargs)
+
+
+# Local stub backend
+
+_NOTES = re.compile(r'^(?:\[Booking so far:[^\n]*\]\n|\[Catalog\].*?\[/Catalog\]\n)+\n?', re.DOTALL)
+STUB_WELCOME = "Would you like to start by telling me your name? 😊"
+STUB_FALLBACK = ("I'm not sure I understood that. Could you please rephrase it? "
+                 "You can also reply with one of the options above.")
+
+
+class StubUsage:
+    def __init__(self, prompt_chars, response_chars):
+        # Roughly four characters per token, like Gemini's English text
+        self.prompt_token_count = prompt_chars // 4
+        self.candidates_token_count = response_chars // 4
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class StubChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubResponse:
+    """Mimics the SDK response: .text, .usage_metadata and chunk iteration"""
+
+    def __init__(self, text, prompt_chars, latency=0.0, chunk_size=24):
+        self.text = text
+        self.usage_metadata = StubUsage(prompt_chars, len(text))
+        self._latency = latency
+        self._chunk_size = chunk_size
+
+    def __iter__(self):
+        chunks = [self.text[i:i + self._chunk_size] for i in range(0, len(self.text), self._chunk_size)] or ['']
+        for chunk in chunks:
+            if self._latency:
+                time.sleep(self._latency / len(chunks))
+            yield StubChunk(chunk)
+
+
+class StubChat:
+    """Chat session that answers with the local booking flow"""
+
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+        self._flow_state = None
+
+    def _last_model_text(self):
+        for content in reversed(self.history):
+            role = content['role'] if isinstance(content, dict) else content.role
+            if role == 'model':
+                parts = content['parts'] if isinstance(content, dict) else content.parts
+                part = parts[0]
+                return part if isinstance(part, str) else getattr(part, 'text', '')
+        return STUB_WELCOME
+
+    def send_message(self, content, stream=False):
+        from local_flow import local_reply, new_flow_state
+
+        if self._flow_state is None:
+            self._flow_state = new_flow_state()
+        user_text = _NOTES.sub('', content)
+        reply = local_reply(user_text, self._last_model_text(), self._flow_state, date.today()) or STUB_FALLBACK
+        if not stream and self.model.latency:
+            time.sleep(self.model.latency)
+
+        self.history.append({'role': 'user', 'parts': [content]})
+        self.history.append({'role': 'model', 'parts': [reply]})
+        prompt_chars = len(self.model.system_instruction) + sum(
+            len(c['parts'][0]) if isinstance(c, dict) else 0 for c in self.history[:-1]
+        )
+        return StubResponse(reply, prompt_chars, latency=self.model.latency if stream else 0.0)
+
+
+class StubModel:
+    """Offline stand-in for genai.GenerativeModel"""
+
+    def __init__(self, system_instruction, latency=0.0):
+        self.system_instruction = system_instruction
+        self.latency = latency
+
+    def start_chat(self, history=None):
+        return StubChat(self, history)
@@ -0,0 +1,82 @@
+import time
+
+QR_MARKER = "[QR_CODE_PLACEHOLDER]"
+
+
+class StreamTiming:
+    """Time to first token and total latency of one streamed reply"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.finished = None
+
+    def mark_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def time_to_first_token(self):
+        return self.first_token - self.started if self.first_token is not None else None
+
+    @property
+    def total(self):
+        return self.finished - self.started if self.finished is not None else None
+
+    def summary(self):
+        ttft = self.time_to_first_token
+        ttft_text = f"{ttft * 1000:.0f} ms" if ttft is not None else "n/a"
+        total_text = f"{self.total * 1000:.0f} ms" if self.total is not None else "n/a"
+        return f"first token {ttft_text}, total {total_text}"
+
+
+def chunk_text(chunk):
+    """Text of a streamed chunk; chunks with no text parts yield ''"""
+    try:
+        return chunk.text or ''
+    except (ValueError, AttributeError):
+        # The SDK raises ValueError for chunks that only carry finish metadata
+        return ''
+
+
+def _partial_marker_length(text, marker):
+    """Length of the longest suffix of text that could start the marker"""
+    for length in range(min(len(marker) - 1, len(text)), 0, -1):
+        if text.endswith(marker[:length]):
+            return length
+    return 0
+
+
+def stream_segments(chunks, timing=None, marker=QR_MARKER):
+    """Split a streamed reply into ('text', str) and ('marker', marker) events.
+
+    Text is passed on as soon as it arrives, except for a tail that
+    could be the start of a marker split across chunks, so callers see
+    the marker the moment it is complete.
+    """
+    pending = ''
+    for chunk in chunks:
+        text = chunk_text(chunk)
+        if not text:
+            continue
+        if timing is not None:
+            timing.mark_token()
+        pending += text
+        index = pending.find(marker)
+        while index != -1:
+            if index:
+                yield 'text', pending[:index]
+            yield 'marker', marker
+            pending = pending[index + len(marker):]
+            index = pending.find(marker)
+        keep = _partial_marker_length(pending, marker)
+        if len(pending) > keep:
+            yield 'text', pending[:len(pending) - keep]
+            pending = pending[len(pending) - keep:]
+    if pending:
+        yield 'text', pending
+    if timing is not None:
+        timing.finish()
@@ -0,0 +1,242 @@
+import re
+import threading
+
+from booking_ids import new_booking_id
+from catalog import (ATTRACTIONS, EMAIL_ADDRESS, TICKET_PRICES, format_attraction_list, match_attraction,
+                     match_city, parse_quantities, parse_visit_date, price_breakdown)
+from telemetry import metrics
+
+RULE = '━' * 54
+
+# Steps of the booking flow, recognized from the assistant's last message
+STEP_NAME = 'name'
+STEP_CITY = 'city'
+STEP_ATTRACTION = 'attraction'
+STEP_DATE = 'date'
+STEP_QUANTITY = 'quantity'
+STEP_EMAIL = 'email'
+
+_STEP_PATTERNS = [
+    (STEP_EMAIL, re.compile(r'email address', re.IGNORECASE)),
+    (STEP_QUANTITY, re.compile(r'how many tickets|ticket prices', re.IGNORECASE)),
+    (STEP_DATE, re.compile(r'date of visit|date .*visit|when would you like to visit', re.IGNORECASE)),
+    (STEP_ATTRACTION, re.compile(r'^\s*a\) .+^\s*b\) ', re.MULTILINE | re.DOTALL)),
+    (STEP_CITY, re.compile(r'which city', re.IGNORECASE)),
+    (STEP_NAME, re.compile(r'your name', re.IGNORECASE)),
+]
+_NAME_PREFIX = re.compile(r"^(?:hi|hello|hey)?[,!\s]*(?:my name is|my name's|i am|i'm|this is|it's|call me)\s+",
+                          re.IGNORECASE)
+_NAME = re.compile(r"^[A-Za-z][A-Za-z .'-]{0,40}$")
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def detect_step(assistant_text):
+    """Return the booking step the assistant's last message is asking about"""
+    for step, pattern in _STEP_PATTERNS:
+        if pattern.search(assistant_text):
+            return step
+    return None
+
+
+def new_flow_state():
+    """Booking fields collected by locally answered turns"""
+    return {'name': None, 'city': None, 'attraction': None, 'visit_date': None,
+            'quantities': None, 'total': None, 'email': None, 'booking_id': None}
+
+
+def _reply_name(text, state, today):
+    name = _NAME_PREFIX.sub('', text.strip()).strip(' .!')
+    if not _NAME.match(name) or len(name.split()) > 4:
+        return None
+    state['name'] = name.title() if name.islower() else name
+    return (f"Nice to meet you, {state['name']}! 😊\n\n"
+            "Which city would you like to visit? We currently offer tickets in "
+            "Bengaluru, Delhi, Mumbai, or Kolkata.")
+
+
+def _reply_city(text, state, today):
+    city = match_city(text)
+    if city is None:
+        return None
+    state['city'] = city
+    return (f"Great choice! Here are the top attractions in {city}:\n\n"
+            f"{format_attraction_list(city)}\n\n"
+            "Which one would you like to visit? You can reply with the letter or the name.")
+
+
+def _reply_attraction(text, state, today):
+    if state['city'] is None:
+        return None
+    attraction = match_attraction(state['city'], text)
+    if attraction is None:
+        return None
+    state['attraction'] = attraction.name
+    return (f"Excellent choice! {attraction.name} it is. 🎉\n\n"
+            "What is your preferred date of visit? You can say today, tomorrow, "
+            "a day like \"this Sunday\", or a date such as "
+            f"{today.strftime('%Y-%m-%d')}.")
+
+
+def _reply_date(text, state, today):
+    visit_date = parse_visit_date(text, today)
+    if visit_date is None:
+        return None
+    if visit_date < today:
+        return "That date is in the past. Could you please choose a future date for your visit?"
+    state['visit_date'] = visit_date.strftime('%Y-%m-%d')
+    prices = '\n'.join([
+        f"    Children:  ₹{TICKET_PRICES['child']} per ticket",
+        f"    Students:  ₹{TICKET_PRICES['student']} per ticket",
+        f"    Adults:    ₹{TICKET_PRICES['adult']} per ticket",
+    ])
+    return (f"Perfect! Your visit is set for {state['visit_date']} ({visit_date.strftime('%A')}). 📅\n\n"
+            f"Here are our ticket prices:\n{RULE}\n\n{prices}\n\n"
+            "Please tell me how many tickets you need in each category\n"
+            "(for example: 2 adults, 1 student, 1 child)")
+
+
+def _reply_quantity(text, state, today):
+    quantities = parse_quantities(text)
+    if quantities is None:
+        return None
+    items, total = price_breakdown(quantities)
+    state['quantities'] = quantities
+    state['total'] = total
+    lines = [f"    {f'{label} tickets:':<17} {count} × ₹{price} = ₹{amount}"
+             for label, count, price, amount in items]
+    return (f"Here's your booking breakdown:\n{RULE}\n\n"
+            + '\n'.join(lines)
+            + f"\n    {'─' * 36}\n    Total amount:    ₹{total}\n\n"
+            "Great! To complete your booking, please provide your contact email address "
+            "where I can send the booking details once payment is processed.")
+
+
+def _reply_email(text, state, today):
+    match = EMAIL_ADDRESS.search(text)
+    if match is None or None in (state['city'], state['attraction'], state['visit_date'], state['quantities']):
+        return None
+    state['email'] = match.group(0)
+    if not state.get('booking_id'):
+        state['booking_id'] = new_booking_id()
+    items, total = price_breakdown(state['quantities'])
+    tickets = '\n'.join(f"        • {count} {label} tickets" for label, count, _, _ in items)
+    return (f"Thank you for providing your email! Here's your booking summary: 📋\n\n"
+            f"Booking Details:\n{RULE}\n\n"
+            f"    🌆 City: {state['city']}\n"
+            f"    🏰 Attraction: {state['attraction']}\n"
+            f"    📅 Visit Date: {state['visit_date']}\n"
+            f"    \n"
+            f"    🎟️ Tickets Booked:\n{tickets}\n"
+            f"    \n"
+            f"    💰 Total Amount: ₹{total}\n"
+            f"    📧 Contact Email: {state['email']}\n"
+            f"    🔢 Booking Reference: {state['booking_id']}\n\n"
+            f"    📱 Scan QR code to pay:\n"
+            f"    [QR_CODE_PLACEHOLDER]\n\n"
+            f"{RULE}\n")
+
+
+_RESPONDERS = {
+    STEP_NAME: _reply_name,
+    STEP_CITY: _reply_city,
+    STEP_ATTRACTION: _reply_attraction,
+    STEP_DATE: _reply_date,
+    STEP_QUANTITY: _reply_quantity,
+    STEP_EMAIL: _reply_email,
+}
+
+
+def local_reply(user_text, last_assistant_text, state, today):
+    """Answer a deterministic booking step locally, or return None for the LLM.
+
+    ``state`` is the dict from new_flow_state() and is updated in place
+    with whatever the turn collected.
+    """
+    step = detect_step(last_assistant_text or '')
+    if step == STEP_ATTRACTION and state['city'] is None:
+        # The city was chosen in an LLM-served turn; recover it from the menu
+        state['city'] = next((city for city, attractions in ATTRACTIONS.items()
+                              if attractions[0].name in last_assistant_text), None)
+    responder = _RESPONDERS.get(step)
+    if responder is None:
+        return None
+    return responder(user_text, state, today)
+
+
+def observe_reply(assistant_text, state):
+    """Pick up booking fields from a reply, including ones the LLM wrote.
+
+    Lets the flow state (and the booking note built from it) follow
+    steps that were answered by the model rather than locally.
+    """
+    if state['city'] is None:
+        state['city'] = next((city for city, attractions in ATTRACTIONS.items()
+                              if attractions[0].name in assistant_text
+                              and attractions[1].name in assistant_text), None)
+    elif state['attraction'] is None:
+        named = [attraction.name for attraction in ATTRACTIONS[state['city']]
+                 if attraction.name in assistant_text]
+        if len(named) == 1:
+            state['attraction'] = named[0]
+    elif state['visit_date'] is None and detect_step(assistant_text) == STEP_QUANTITY:
+        match = _ISO_DATE.search(assistant_text)
+        if match:
+            state['visit_date'] = match.group(0)
+
+
+def record_local_turn(chat, user_text, reply_text):
+    """Append a locally answered turn to the Gemini chat history.
+
+    Keeps the model's view of the conversation complete, so the turns
+    that still go to the LLM have the right context.
+    """
+    chat.history = list(chat.history) + [
+        {'role': 'user', 'parts': [user_text]},
+        {'role': 'model', 'parts': [reply_text]},
+    ]
+
+
+class LocalFlowStats:
+    """Process-wide counters for locally served and LLM-served turns"""
+
+    def __init__(self):
+        self.local_turns = 0
+        self.llm_turns = 0
+        self.local_seconds = 0.0
+        self.llm_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_local(self, seconds):
+        with self._lock:
+            self.local_turns += 1
+            self.local_seconds += seconds
+
+    def record_llm(self, seconds):
+        with self._lock:
+            self.llm_turns += 1
+            self.llm_seconds += seconds
+
+    def snapshot(self):
+        """Fraction of turns served locally and the estimated latency saved"""
+        with self._lock:
+            turns = self.local_turns + self.llm_turns
+            avg_llm = self.llm_seconds / self.llm_turns if self.llm_turns else 0.0
+            avg_local = self.local_seconds / self.local_turns if self.local_turns else 0.0
+            return {
+                'local_turns': self.local_turns,
+                'llm_turns': self.llm_turns,
+                'local_fraction': self.local_turns / turns if turns else 0.0,
+                'avg_llm_seconds': avg_llm,
+                'avg_local_seconds': avg_local,
+                'saved_seconds': self.local_turns * max(avg_llm - avg_local, 0.0),
+            }
+
+
+stats = LocalFlowStats()
+
+# Turn counts are in tixbee_turns_total; these add the time spent and saved
+metrics.collect('tixbee_local_flow_seconds_total', 'Time spent answering turns, locally or by the LLM',
+                lambda: {('local',): stats.local_seconds, ('llm',): stats.llm_seconds},
+                ('source',), kind='counter')
+metrics.collect('tixbee_local_flow_saved_seconds', 'Estimated LLM latency saved by answering turns locally',
+                lambda: stats.snapshot()['saved_seconds'])
@@ -0,0 +1,216 @@
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+from telemetry import get_logger, metrics, span
+from ticket_qr import matrix_to_image, qr_matrix
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+# Card layout
+CARD_WIDTH = 400
+CARD_HEIGHT = 480
+QR_SIZE = 220
+QR_POSITION = ((CARD_WIDTH - QR_SIZE) // 2, 70)
+LOGO_FILES = ['bhim.png', 'gpay.png', 'phonepe.png', 'paytm.png', 'amazon.png']
+LOGO_SIZE = (65, 65)
+LOGO_SPACING = 15
+LOGO_Y = 380
+BORDER_COLOR = '#EEEEEE'
+CARD_CACHE_SIZE = 256
+
+log = get_logger('payment_card')
+
+
+class PaymentCardRenderer:
+    """Render UPI payment cards on top of a pre-composited static layer.
+
+    The background, title, logo strip, border and instruction text only
+    depend on the UPI ID, so they are drawn once per process and each
+    request only has to paste the amount-specific QR code.
+    """
+
+    def __init__(self, assets_dir=ASSETS_DIR):
+        self.assets_dir = assets_dir
+        self._fonts = None
+        self._logos = None
+        self._base_layers = {}
+        self._lock = threading.Lock()
+
+    def _load_fonts(self):
+        if self._fonts is None:
+            try:
+                fonts = (
+                    ImageFont.truetype("arial.ttf", 32),
+                    ImageFont.truetype("arial.ttf", 16),
+                    ImageFont.truetype("arial.ttf", 18),
+                )
+            except Exception:
+                default_font = ImageFont.load_default()
+                fonts = (default_font, default_font, default_font)
+            self._fonts = fonts
+        return self._fonts
+
+    def _load_logos(self):
+        if self._logos is None:
+            logos = []
+            for logo_file in LOGO_FILES:
+                try:
+                    logo = Image.open(os.path.join(self.assets_dir, logo_file))
+                    logo = logo.convert('RGBA')
+                    logo.thumbnail(LOGO_SIZE, Image.Resampling.LANCZOS)
+                    logos.append(logo)
+                except Exception as e:
+                    log.warning('payment_card.logo_failed', logo=logo_file, error=str(e))
+                    logos.append(None)
+            self._logos = logos
+        return self._logos
+
+    def _build_base_layer(self, upi_id):
+        title_font, text_font, upi_font = self._load_fonts()
+        background = Image.new('RGB', (CARD_WIDTH, CARD_HEIGHT), 'white')
+        draw = ImageDraw.Draw(background)
+
+        # TIXBEE title
+        title = "TIXBEE"
+        title_bbox = draw.textbbox((0, 0), title, font=title_font)
+        title_width = title_bbox[2] - title_bbox[0]
+        draw.text(((CARD_WIDTH - title_width) // 2, 20), title, font=title_font, fill='#333333')
+
+        # UPI ID below the QR slot
+        upi_bbox = draw.textbbox((0, 0), upi_id, font=upi_font)
+        upi_width = upi_bbox[2] - upi_bbox[0]
+        draw.text(((CARD_WIDTH - upi_width) // 2, 300), upi_id, font=upi_font, fill='#666666')
+
+        # Scan instruction
+        instruction = "Scan and pay with any BHIM UPI app"
+        inst_bbox = draw.textbbox((0, 0), instruction, font=text_font)
+        inst_width = inst_bbox[2] - inst_bbox[0]
+        draw.text(((CARD_WIDTH - inst_width) // 2, 330), instruction, font=text_font, fill='#333333')
+
+        # Payment logos; a missing logo still keeps its slot in the strip
+        total_logos_width = len(LOGO_FILES) * LOGO_SIZE[0] + (len(LOGO_FILES) - 1) * LOGO_SPACING
+        current_x = (CARD_WIDTH - total_logos_width) // 2
+        for logo in self._load_logos():
+            if logo is not None:
+                logo_pos_y = LOGO_Y + (LOGO_SIZE[1] - logo.size[1]) // 2
+                background.paste(logo, (current_x, logo_pos_y), logo)
+            current_x += LOGO_SIZE[0] + LOGO_SPACING
+
+        # Subtle border
+        draw.rectangle([0, 0, CARD_WIDTH - 1, CARD_HEIGHT - 1], outline=BORDER_COLOR, width=1)
+
+        return background
+
+    def base_layer(self, upi_id):
+        """Return the cached static layer for a UPI ID, building it on first use"""
+        base = self._base_layers.get(upi_id)
+        if base is None:
+            with self._lock:
+                base = self._base_layers.get(upi_id)
+                if base is None:
+                    base = self._build_base_layer(upi_id)
+                    self._base_layers[upi_id] = base
+        return base
+
+    def render_image(self, amount, upi_id="arupiop@axl", name="TixBee"):
+        """Compose the payment card for an amount and return it as a PIL image"""
+        upi_string = f"upi://pay?pa={upi_id}&pn={name}&am={amount}&cu=INR"
+
+        matrix = qr_matrix(upi_string, border=0)
+        qr_image = matrix_to_image(matrix, box_size=1).resize((QR_SIZE, QR_SIZE), Image.Resampling.NEAREST)
+
+        card = self.base_layer(upi_id).copy()
+        card.paste(qr_image, QR_POSITION)
+        return card
+
+    def render(self, amount, upi_id="arupiop@axl", name="TixBee"):
+        """Compose the payment card for an amount and return PNG bytes"""
+        with span('payment_card'):
+            card = self.render_image(amount, upi_id=upi_id, name=name)
+            img_byte_arr = BytesIO()
+            card.save(img_byte_arr, format='PNG', compress_level=1)
+            return img_byte_arr.getvalue()
+
+
+class PaymentCardCache:
+    """Bounded LRU cache of finished payment-card PNGs.
+
+    Entries are keyed on the inputs of the ``upi://pay`` string, so
+    replaying the chat history on every rerun serves the same bytes
+    instead of re-rendering and re-encoding the card.
+    """
+
+    def __init__(self, renderer, maxsize=CARD_CACHE_SIZE):
+        self.renderer = renderer
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, amount, upi_id="arupiop@axl", name="TixBee"):
+        key = (upi_id, name, str(amount))
+        with self._lock:
+            card = self._entries.get(key)
+            if card is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return card
+            self.misses += 1
+
+        # Render outside the lock so concurrent misses don't serialize
+        card = self.renderer.render(amount, upi_id=upi_id, name=name)
+        with self._lock:
+            self._entries[key] = card
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return card
+
+    def info(self):
+        """Return hit/miss counters and the current hit ratio"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_default_renderer = PaymentCardRenderer()
+_default_cache = PaymentCardCache(_default_renderer)
+
+# Registered on first import, which PIL makes lazy; nothing is rendered before then
+metrics.collect('tixbee_payment_card_cache_lookups_total', 'Payment-card cache lookups by result',
+                lambda: {('hit',): _default_cache.hits, ('miss',): _default_cache.misses},
+                ('result',), kind='counter')
+metrics.collect('tixbee_payment_card_cache_entries', 'Payment-card PNGs held in the cache',
+                lambda: _default_cache.info()['size'])
+
+
+def render_payment_card(amount, upi_id="arupiop@axl", name="TixBee"):
+    """Render a payment card with the process-wide renderer"""
+    return _default_renderer.render(amount, upi_id=upi_id, name=name)
+
+
+def get_payment_card(amount, upi_id="arupiop@axl", name="TixBee"):
+    """Return payment-card PNG bytes from the process-wide cache"""
+    return _default_cache.get(amount, upi_id=upi_id, name=name)
+
+
+def payment_card_cache_info():
+    """Return hit/miss counters of the process-wide card cache"""
+    return _default_cache.info()
@@ -0,0 +1,137 @@
+"""Shared cache of LLM replies for repeated booking-flow turns.
+
+Users in different sessions often send the same message at the same
+step ("Delhi", "a", "2 adults, 1 child") and get the same reply. Replies
+are keyed on the system instruction, today's date, the step the last
+assistant message asked about, the booking fields agreed so far (not
+the user's name) and the normalized user message. The model still sees
+the name and booking reference in every turn's note, so a reply that
+mentions either belongs to one customer and is not cached.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from llm_stream import QR_MARKER
+from local_flow import detect_step
+from telemetry import metrics
+
+CACHE_SIZE = 2048
+CACHE_TTL = 3600.0
+
+_SPACES = re.compile(r'\s+')
+_BOOKING_FIELDS = ('city', 'attraction', 'visit_date', 'tickets', 'total')
+# Sent to the model but left out of the key
+_PRIVATE_FIELDS = ('name', 'reference')
+
+
+def normalize_message(text):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return _SPACES.sub(' ', text.strip().lower()).rstrip(' .!?')
+
+
+def instruction_digest(system_instruction):
+    return hashlib.sha1(system_instruction.encode('utf-8')).hexdigest()
+
+
+def cache_key(system_instruction, current_date, last_assistant_text, user_text, booking):
+    """Key for one turn, or None when the turn isn't at a known booking step"""
+    step = detect_step(last_assistant_text or '')
+    if step is None:
+        return None
+    fields = tuple(booking.get(field) for field in _BOOKING_FIELDS)
+    return (instruction_digest(system_instruction), current_date.isoformat(), step, fields,
+            normalize_message(user_text))
+
+
+def mentions_private_fields(reply_text, booking):
+    """True if the reply contains a word of the customer's name or their booking reference"""
+    words = {word for field in _PRIVATE_FIELDS for word in re.findall(r'\w{2,}', str(booking.get(field) or ''))}
+    if not words:
+        return False
+    pattern = r'\b(?:' + '|'.join(re.escape(word) for word in sorted(words)) + r')\b'
+    return re.search(pattern, reply_text, re.IGNORECASE) is not None
+
+
+def is_cacheable(reply_text, booking=None):
+    # The booking summary carries a unique booking reference
+    if not reply_text or QR_MARKER in reply_text:
+        return False
+    return booking is None or not mentions_private_fields(reply_text, booking)
+
+
+class ResponseCache:
+    """Bounded LRU of reply texts whose entries expire after ttl seconds.
+
+    All entries are dropped when a key arrives with a different system
+    instruction or date, so a new prompt or a new day starts empty.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._generation = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_generation(self, key):
+        if key[:2] != self._generation:
+            self._entries.clear()
+            self._generation = key[:2]
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            self._check_generation(key)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, reply_text, booking=None):
+        """Store a reply; pass the booking the key was made from so personal replies are skipped"""
+        if key is None or not is_cacheable(reply_text, booking):
+            return
+        with self._lock:
+            self._check_generation(key)
+            self._entries[key] = (time.monotonic() + self.ttl, reply_text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def info(self):
+        """Return hit/miss counters and the current hit ratio"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+response_cache = ResponseCache()
+
+metrics.collect('tixbee_reply_cache_lookups_total', 'Reply cache lookups by result',
+                lambda: {('hit',): response_cache.hits, ('miss',): response_cache.misses},
+                ('result',), kind='counter')
+metrics.collect('tixbee_reply_cache_entries', 'Replies held in the reply cache',
+                lambda: response_cache.info()['size'])
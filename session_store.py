@@ -0,0 +1,295 @@
+"""External storage for booking sessions.
+
+A session is saved as one compact JSON record (conversation state,
+booking fields, payment, the pruned LLM chat history) plus its chat
+messages, which are appended one row each and only read back when a
+view needs more than the last two. Any worker can then pick up any
+session, and a restarted worker loses nothing but in-flight replies.
+
+open_session_store('memory') keeps records in process memory;
+open_session_store('sqlite:sessions.db') uses SQLite in WAL mode,
+which is safe for several processes on one host.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from booking_engine import BookingSession, Payment
+from context_manager import HISTORY_TURNS
+from telemetry import timed
+
+RECORD_VERSION = 1
+TAIL_MESSAGES = 2  # enough for the engine to answer the next turn
+
+
+class MessageLog:
+    """Chat messages of a stored session; older ones are loaded on first use.
+
+    Holds the last few messages plus anything appended since loading,
+    so a turn never reads the whole conversation back from the store.
+    """
+
+    def __init__(self, messages=(), offset=0, loader=None):
+        self._items = list(messages)
+        self._offset = offset
+        self._loader = loader
+
+    def _load(self):
+        if self._offset:
+            self._items = self._loader(0, self._offset) + self._items
+            self._offset = 0
+
+    def __len__(self):
+        return self._offset + len(self._items)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if start < self._offset and start < stop:
+                self._load()
+            start, stop = max(start - self._offset, 0), max(stop - self._offset, 0)
+            return self._items[start:stop:step]
+        index = key + len(self) if key < 0 else key
+        if not 0 <= index < len(self):
+            raise IndexError('message index out of range')
+        if index < self._offset:
+            self._load()
+        return self._items[index - self._offset]
+
+    def __iter__(self):
+        self._load()
+        return iter(self._items)
+
+    def append(self, message):
+        self._items.append(message)
+
+
+def _chat_history(chat):
+    """LLM chat history as plain dicts, whether the chat holds dicts or SDK Content objects"""
+    history = []
+    for content in chat.history:
+        if isinstance(content, dict):
+            role, parts = content['role'], content['parts']
+        else:
+            role, parts = content.role, content.parts
+        history.append({'role': role, 'parts': [part if isinstance(part, str) else part.text for part in parts]})
+    return history
+
+
+def session_to_record(session):
+    """Compact JSON-ready record of everything but the chat messages"""
+    payment = session.payment
+    booking = session.booking_state.to_dict()
+    booking['parsed_messages'] = session.booking_state.parsed_messages
+    return {
+        'v': RECORD_VERSION,
+        'state': session.current_state,
+        'user_name': session.user_name,
+        'user_email': session.user_email,
+        'flow': session.flow,
+        'booking': booking,
+        # Only the turns the next LLM request would keep anyway
+        'chat': _chat_history(session.chat)[-HISTORY_TURNS * 2:] if session.chat is not None else [],
+        'payment': None if payment is None else {
+            'amount': payment.amount,
+            'deadline': payment.deadline,
+            'user_email': payment.user_email,
+            'booking_details': payment.booking_details,
+            'submitted': payment.submitted,
+            'email_status': payment.email_status,
+            'done': payment.done,
+            'unavailable': payment.unavailable,
+        },
+    }
+
+
+def session_from_record(session_id, record, messages, chat):
+    """Rebuild a BookingSession from a record, its MessageLog and a fresh chat"""
+    session = BookingSession(session_id, chat)
+    session.messages = messages
+    session.saved_messages = len(messages)
+    session.current_state = record['state']
+    session.user_name = record['user_name']
+    session.user_email = record['user_email']
+    session.flow = record['flow']
+    booking = dict(record['booking'])
+    session.booking_state.parsed_messages = booking.pop('parsed_messages')
+    for key, value in booking.items():
+        setattr(session.booking_state, key, value)
+    if chat is not None:
+        chat.history = record['chat']
+    saved_payment = record['payment']
+    if saved_payment is not None:
+        payment = Payment(saved_payment['amount'], saved_payment['deadline'],
+                          saved_payment['user_email'], saved_payment['booking_details'])
+        payment.submitted = saved_payment['submitted']
+        payment.email_status = tuple(saved_payment['email_status']) if saved_payment['email_status'] else None
+        payment.done = saved_payment['done']
+        payment.unavailable = saved_payment.get('unavailable')
+        session.payment = payment
+    return session
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class MemorySessionStore:
+    """Sessions in process memory, serialized like the SQLite store"""
+
+    def __init__(self):
+        self._records = {}
+        self._messages = {}
+        self._lock = threading.Lock()
+
+    @timed('session_load')
+    def load(self, session_id, chat_factory=None):
+        """Return the stored session, or None if there is none"""
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                return None
+            stored = self._messages[session_id]
+            count = len(stored)
+            tail = [json.loads(message) for message in stored[-TAIL_MESSAGES:]]
+
+        def loader(start, stop):
+            with self._lock:
+                return [json.loads(message) for message in self._messages[session_id][start:stop]]
+
+        messages = MessageLog(tail, count - len(tail), loader)
+        return session_from_record(session_id, json.loads(record), messages,
+                                   chat_factory() if chat_factory else None)
+
+    @timed('session_save')
+    def save(self, session):
+        record = _dumps(session_to_record(session))
+        new_messages = [_dumps(message) for message in session.messages[session.saved_messages:]]
+        with self._lock:
+            self._records[session.session_id] = record
+            self._messages.setdefault(session.session_id, []).extend(new_messages)
+        session.saved_messages += len(new_messages)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._records.pop(session_id, None)
+            self._messages.pop(session_id, None)
+
+    def close(self):
+        pass
+
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite database in WAL mode, one connection per thread"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            record TEXT NOT NULL,
+            message_count INTEGER NOT NULL,
+            updated REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            PRIMARY KEY (session_id, seq)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path='sessions.db'):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # WAL keeps the database consistent on power loss; NORMAL only risks the last commits
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @timed('session_load')
+    def load(self, session_id, chat_factory=None):
+        """Return the stored session, or None if there is none"""
+        connection = self._connect()
+        row = connection.execute('SELECT record, message_count FROM sessions WHERE session_id = ?',
+                                 (session_id,)).fetchone()
+        if row is None:
+            return None
+        record, count = row
+        tail = connection.execute(
+            'SELECT message FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq',
+            (session_id, count - TAIL_MESSAGES)
+        ).fetchall()
+
+        def loader(start, stop):
+            rows = self._connect().execute(
+                'SELECT message FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq',
+                (session_id, start, stop)
+            ).fetchall()
+            return [json.loads(message) for message, in rows]
+
+        messages = MessageLog([json.loads(message) for message, in tail], count - len(tail), loader)
+        return session_from_record(session_id, json.loads(record), messages,
+                                   chat_factory() if chat_factory else None)
+
+    @timed('session_save')
+    def save(self, session):
+        record = _dumps(session_to_record(session))
+        start = session.saved_messages
+        new_messages = [(session.session_id, seq, _dumps(message))
+                        for seq, message in enumerate(session.messages[start:], start=start)]
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'INSERT INTO sessions (session_id, record, message_count, updated) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (session_id) DO UPDATE SET record = excluded.record, '
+                'message_count = excluded.message_count, updated = excluded.updated',
+                (session.session_id, record, start + len(new_messages), time.time())
+            )
+            connection.executemany('INSERT OR REPLACE INTO messages (session_id, seq, message) VALUES (?, ?, ?)',
+                                   new_messages)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        session.saved_messages += len(new_messages)
+
+    def delete(self, session_id):
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        connection.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+        connection.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        connection.execute('COMMIT')
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def open_session_store(url='memory'):
+    """Session store for 'memory' or 'sqlite:<path>'"""
+    if url == 'memory':
+        return MemorySessionStore()
+    if url.startswith('sqlite:'):
+        path = url[len('sqlite:'):]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return SQLiteSessionStore(path)
+    raise ValueError(f"unknown session store {url!r}")
@@ -0,0 +1,429 @@
+"""Logging, timing spans and in-process metrics.
+
+get_logger(name) returns a leveled logger that takes an event name and
+key=value fields. Records go through a queue to a background thread, so
+a slow stdout never holds up a booking, and fields that carry personal
+data (emails, names) are masked before they are written. LOG_LEVEL and
+LOG_FORMAT (text or json) control the output.
+
+metrics is a Prometheus-style registry of counters and histograms, plus
+collected metrics read from a function at scrape time for state kept
+elsewhere (cache sizes, hit counts); render() gives the text exposition
+format, which api_server serves at /metrics and TextExporter writes to
+a local file. span(stage) times a
+block into the tixbee_stage_seconds histogram.
+"""
+import atexit
+import bisect
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from cache hits to slow LLM replies
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+EXPORT_INTERVAL = 10.0
+
+EMAIL_FIELDS = frozenset({'email', 'user_email', 'recipient', 'recipient_email', 'to'})
+NAME_FIELDS = frozenset({'name', 'user_name', 'customer_name'})
+
+
+def mask_email(email):
+    """'asha@mail.com' -> 'a***@mail.com'"""
+    email = str(email or '')
+    local, at, domain = email.partition('@')
+    if not at:
+        return '***'
+    return f"{local[:1]}***@{domain}"
+
+
+def mask_name(name):
+    name = str(name or '')
+    return f"{name[:1]}***" if name else ''
+
+
+def scrub(fields):
+    """Fields with emails and names masked"""
+    clean = {}
+    for key, value in fields.items():
+        if key in EMAIL_FIELDS and value is not None:
+            value = mask_email(value)
+        elif key in NAME_FIELDS and value is not None:
+            value = mask_name(value)
+        clean[key] = value
+    return clean
+
+
+class StructuredFormatter(logging.Formatter):
+    """'time LEVEL logger event key=value ...', or one JSON object per line"""
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = scrub(getattr(record, 'fields', {}))
+        if self.json_lines:
+            entry = {'ts': round(record.created, 3), 'level': record.levelname, 'logger': record.name,
+                     'event': record.getMessage()}
+            entry.update(fields)
+            if record.exc_info:
+                entry['exc'] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+        parts = [f"{stamp}.{int(record.msecs):03d}", record.levelname, record.name, record.getMessage()]
+        for key, value in fields.items():
+            text = str(value)
+            if not text or any(char in text for char in ' ="'):
+                text = json.dumps(text, ensure_ascii=False)
+            parts.append(f"{key}={text}")
+        line = ' '.join(parts)
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+class StructLogger:
+    """Leveled logger taking an event name plus fields"""
+
+    def __init__(self, logger):
+        self._logger = logger
+
+    def _log(self, level, event, fields, exc_info=False):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, extra={'fields': fields}, exc_info=exc_info)
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, exc_info=False, **fields):
+        self._log(logging.ERROR, event, fields, exc_info)
+
+    def enabled(self, level):
+        return self._logger.isEnabledFor(level)
+
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def configure_logging(level=None, json_lines=None, stream=None):
+    """Send tixbee.* records through a queue to a writer thread; safe to call again"""
+    global _listener
+    level = level or os.getenv('LOG_LEVEL', 'INFO')
+    if json_lines is None:
+        json_lines = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+        root = logging.getLogger('tixbee')
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        root.propagate = False
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(StructuredFormatter(json_lines))
+        records = queue.SimpleQueue()
+        root.addHandler(logging.handlers.QueueHandler(records))
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+
+
+def _stop_logging():
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+
+
+atexit.register(_stop_logging)
+
+
+def get_logger(name):
+    if _listener is None:
+        configure_logging()
+    return StructLogger(logging.getLogger(f'tixbee.{name}'))
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _label_text(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join(f'{name}="{value}"'.replace('\n', '\\n') for name, value in pairs)
+    return '{' + body + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def totals(self):
+        """{label values: count} for every label set counted so far"""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """Bucketed observations per label set, with sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def quantile(self, q, **labels):
+        """Estimate a quantile from the buckets, as Prometheus' histogram_quantile does"""
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            counts = list(series[:-1]) if series else []
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(self.labelnames, labels))
+        return sum(series[:-1]) if series else 0
+
+    def totals(self):
+        """{label values: (count, sum)} for every label set observed so far"""
+        with self._lock:
+            return {key: (sum(values[:-1]), values[-1]) for key, values in self._series.items()}
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+                cumulative += count
+                le = (('le', _number(bound)),)
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Collected:
+    """Values read from a function whenever the registry is rendered.
+
+    func returns a number, or {label values: number} with labelnames.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), func=None, kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.func = func
+        self.kind = kind
+
+    def totals(self):
+        values = self.func()
+        return dict(values) if self.labelnames else {(): values}
+
+    def samples(self):
+        values = sorted((tuple(str(v) for v in key), value) for key, value in self.totals().items())
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Registry:
+    """Named metrics of one process"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} is already registered differently")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def collect(self, name, documentation, func, labelnames=(), kind='gauge'):
+        """Register func as the source of a gauge or counter evaluated at scrape time"""
+        metric = self._get(Collected, name, documentation, labelnames, func=func, kind=kind)
+        metric.func = func
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Registry()
+
+STAGE_SECONDS = metrics.histogram('tixbee_stage_seconds', 'Time spent in each pipeline stage', ('stage',))
+STAGE_ERRORS = metrics.counter('tixbee_stage_errors_total', 'Pipeline stages that raised', ('stage',))
+
+_span_log = get_logger('span')
+
+
+@contextmanager
+def span(stage, **fields):
+    """Time a block into tixbee_stage_seconds{stage=...}; failures are also counted"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        _span_log.debug(stage, ms=round(elapsed * 1000, 3), **fields)
+
+
+def timed(stage):
+    """Decorator form of span for a whole function"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TextExporter:
+    """Write the registry to a local file every few seconds.
+
+    The file is replaced atomically, so a reader (or a node exporter
+    textfile collector) never sees half a snapshot.
+    """
+
+    def __init__(self, path, interval=EXPORT_INTERVAL, registry=metrics):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tixbee-metrics", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def export(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as file:
+            file.write(self.registry.render())
+        os.replace(temporary, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+            except OSError as e:
+                get_logger('metrics').warning('metrics.export_failed', path=self.path, error=str(e))
+
+    def stop(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            try:
+                self.export()
+            except OSError:
+                pass
+
+
+_exporter = None
+
+
+def start_text_exporter(path, interval=EXPORT_INTERVAL):
+    """Start the process-wide exporter once; a falsy path leaves it off"""
+    global _exporter
+    with _setup_lock:
+        if path and _exporter is None:
+            _exporter = TextExporter(path, float(interval)).start()
+        return _exporter
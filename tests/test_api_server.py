@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+import ticket_token
+from api_server import BookingAPI, HTTPError
+from booking_engine import BookingEngine
+from email_service import EmailService
+from ticket_token import qr_link_token
+
+BOOKING = {'booking_id': 'TIX0AB12CD34EF56G', 'customer_name': 'Asha', 'city': 'Delhi', 'attraction': 'Red Fort',
+           'visit_date': '2026-11-02', 'ticket_count': '2 Adults', 'amount': 100}
+OTHER_ID = 'TIX0AB12CD34EF57H'
+EMAIL_CONFIG = {'EMAIL_USERNAME': 'tickets@tixbee.test', 'EMAIL_HOST': 'localhost', 'EMAIL_PORT': 25}
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setenv('TICKET_SIGNING_KEY', 'test-signing-key')
+    monkeypatch.setattr(ticket_token, '_signing_key', None)
+    engine = BookingEngine(config={'LEDGER_DB': str(tmp_path / 'ledger.db'),
+                                   'INVENTORY_DB': str(tmp_path / 'inventory.db')})
+    engine.ledger().record(BOOKING, 'asha@example.com')
+    return BookingAPI(engine=engine)
+
+
+def get(api, path, admin=False):
+    try:
+        return asyncio.run(api.dispatch('GET', path, None, admin))
+    except HTTPError as e:
+        return e.status, str(e)
+
+
+def test_qr_needs_the_emailed_token(api):
+    booking_id = BOOKING['booking_id']
+    status, png = get(api, f"/bookings/{booking_id}/qr?token={qr_link_token(booking_id)}")
+    assert status == 200
+    assert png.startswith(b'\x89PNG')
+
+
+@pytest.mark.parametrize('query', ['', '?token=', '?token=wrong', '?token=%C3%A9', 'other booking'])
+def test_qr_without_the_right_token_is_not_found(api, query):
+    if query == 'other booking':
+        query = f"?token={qr_link_token(OTHER_ID)}"
+    assert get(api, f"/bookings/{BOOKING['booking_id']}/qr{query}")[0] == 404
+    assert get(api, f"/bookings/{BOOKING['booking_id']}/qr{query}", admin=True)[0] == 404
+
+
+def test_ledger_lookups_only_on_the_admin_listener(api):
+    for path in (f"/bookings/{BOOKING['booking_id']}", '/bookings?email=asha@example.com'):
+        assert get(api, path)[0] == 404
+        assert get(api, path, admin=True)[0] == 200
+
+
+def test_email_links_carry_the_token(api):
+    service = EmailService(dict(EMAIL_CONFIG, EMAIL_QR_URL='https://tixbee.test/bookings/{booking_id}/qr?token={token}'))
+    token = qr_link_token(BOOKING['booking_id'])
+    assert service.qr_url(BOOKING) == f"https://tixbee.test/bookings/{BOOKING['booking_id']}/qr?token={token}"
+
+
+def test_qr_url_without_token_is_refused():
+    with pytest.raises(ValueError):
+        EmailService(dict(EMAIL_CONFIG, EMAIL_QR_URL='https://tixbee.test/bookings/{booking_id}/qr'))
@@ -0,0 +1,101 @@
+import json
+import multiprocessing
+import sqlite3
+import threading
+
+import pytest
+
+from inventory import CONFIRMED, Inventory, SoldOut
+
+ATTRACTION = 'Red Fort'
+VISIT_DATE = '2026-11-02'
+CAPACITY = 40
+
+
+def race(path, prefix, threads=8, attempts=15):
+    """Hold 1-3 adult tickets from several threads and confirm or release every other hold"""
+    inventory = Inventory(path, sweep_interval=0)
+
+    def worker(index):
+        for attempt in range(attempts):
+            booking_id = f"{prefix}-{index}-{attempt}"
+            try:
+                inventory.hold(booking_id, ATTRACTION, VISIT_DATE, {'adult': 1 + attempt % 3})
+            except SoldOut:
+                continue
+            if attempt % 2:
+                inventory.confirm(booking_id)
+            elif attempt % 4 == 0:
+                inventory.release(booking_id)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    inventory.close()
+
+
+def slot(path):
+    with sqlite3.connect(path) as db:
+        return db.execute('SELECT capacity, held, sold FROM slots WHERE attraction = ? AND visit_date = ? '
+                          'AND category = ?', (ATTRACTION, VISIT_DATE, 'adult')).fetchone()
+
+
+def confirmed_tickets(path):
+    with sqlite3.connect(path) as db:
+        rows = db.execute('SELECT quantities FROM holds WHERE status = ?', (CONFIRMED,)).fetchall()
+    return sum(json.loads(quantities).get('adult', 0) for quantities, in rows)
+
+
+def test_holds_from_threads_and_processes_never_oversell(tmp_path):
+    path = str(tmp_path / 'inventory.db')
+    Inventory(path, sweep_interval=0).set_capacity(ATTRACTION, VISIT_DATE, 'adult', CAPACITY)
+
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=race, args=(path, f"p{n}")) for n in range(3)]
+    for process in processes:
+        process.start()
+    race(path, 'main')
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    capacity, held, sold = slot(path)
+    assert capacity == CAPACITY
+    assert held + sold <= capacity
+    assert sold == confirmed_tickets(path)
+    # Far more was asked for than there is, so the slot filled up
+    assert held + sold > capacity - 3
+
+
+def test_confirm_after_expiry_fails(tmp_path):
+    now = [1000.0]
+    inventory = Inventory(str(tmp_path / 'inventory.db'), sweep_interval=0, clock=lambda: now[0])
+    inventory.hold('TIX1', ATTRACTION, VISIT_DATE, {'adult': 2}, seconds=10)
+    now[0] += 11
+
+    assert not inventory.confirm('TIX1')
+    assert inventory.expire() == 1
+    assert inventory.available(ATTRACTION, VISIT_DATE, 'adult') == 500
+    assert inventory.get_hold('TIX1').status == 'expired'
+
+
+def test_release_after_confirm_fails(tmp_path):
+    inventory = Inventory(str(tmp_path / 'inventory.db'), sweep_interval=0)
+    inventory.hold('TIX1', ATTRACTION, VISIT_DATE, {'adult': 2})
+
+    assert inventory.confirm('TIX1')
+    assert not inventory.release('TIX1')
+    assert inventory.available(ATTRACTION, VISIT_DATE, 'adult') == 498
+    assert inventory.get_hold('TIX1').status == CONFIRMED
+
+
+def test_hold_all_categories_or_none(tmp_path):
+    inventory = Inventory(str(tmp_path / 'inventory.db'), sweep_interval=0)
+    inventory.set_capacity(ATTRACTION, VISIT_DATE, 'child', 1)
+
+    with pytest.raises(SoldOut) as error:
+        inventory.hold('TIX1', ATTRACTION, VISIT_DATE, {'adult': 2, 'child': 2})
+    assert error.value.category == 'child'
+    assert inventory.available(ATTRACTION, VISIT_DATE, 'adult') == 500
@@ -0,0 +1,35 @@
+import pytest
+
+qrcode = pytest.importorskip('qrcode')
+pytest.importorskip('PIL')
+
+from ticket_qr import make_qr, pick_version
+from ticket_token import encode_ticket
+
+KEY = b'test-signing-key'
+BOOKING = {'booking_id': 'TIX06JYA8SENJG00', 'visit_date': '2026-11-02', 'ticket_count': '2 Adults'}
+
+
+def fitted_version(data):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version
+
+
+@pytest.mark.parametrize('data', ['A' * 25, 'A' * 26, 'A' * 47, 'A' * 48, '7' * 41, '7' * 42,
+                                  'a' * 17, 'a' * 18, 'TIX-' + '9' * 200, 'ticket ' * 40])
+def test_builds_the_smallest_version(data):
+    assert pick_version(data) in (None, fitted_version(data))
+    assert make_qr(data).version == fitted_version(data)
+
+
+def test_mixed_segments_are_left_to_qrcode():
+    assert pick_version('TIX-' + '9' * 200) is None
+
+
+def test_ticket_token_uses_the_alphanumeric_table():
+    token = encode_ticket(BOOKING, KEY)
+    assert len(token) == 47
+    assert pick_version(token) == 2
+    assert make_qr(token).version == 2
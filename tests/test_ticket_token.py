@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+import ticket_token
+from gate_verify import ACCEPTED, ALREADY_REDEEMED, INVALID, WRONG_DATE, GateVerifier
+from ticket_token import InvalidTicket, MissingSigningKey, decode_ticket, encode_ticket, signing_key
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEY = b'test-signing-key'
+BOOKING = {'booking_id': 'TIX0AB12CD34EF56G', 'visit_date': '2026-11-02', 'ticket_count': '2 Adults, 1 Child'}
+BASE32 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567'
+
+
+@pytest.fixture
+def no_key(monkeypatch):
+    monkeypatch.delenv('TICKET_SIGNING_KEY', raising=False)
+    monkeypatch.setattr(ticket_token, '_signing_key', None)
+
+
+def test_round_trip():
+    claims = decode_ticket(encode_ticket(BOOKING, KEY), KEY)
+    assert claims.booking_id == BOOKING['booking_id']
+    assert claims.visit_date == date(2026, 11, 2)
+    assert claims.tickets == 3
+
+
+def test_any_changed_character_is_rejected():
+    token = encode_ticket(BOOKING, KEY)
+    for index, char in enumerate(token):
+        changed = token[:index] + BASE32[(BASE32.index(char) + 16) % 32] + token[index + 1:]
+        with pytest.raises(InvalidTicket):
+            decode_ticket(changed, KEY)
+
+
+def test_truncated_tag_is_rejected():
+    token = encode_ticket(BOOKING, KEY)
+    for cut in (1, 4, 13):
+        with pytest.raises(InvalidTicket):
+            decode_ticket(token[:-cut], KEY)
+
+
+def test_wrong_key_is_rejected():
+    with pytest.raises(InvalidTicket):
+        decode_ticket(encode_ticket(BOOKING, KEY), b'another-key')
+
+
+def test_gate_admits_once_on_the_visit_date():
+    token = encode_ticket(BOOKING, KEY)
+    gate = GateVerifier(KEY, visit_date=date(2026, 11, 2))
+    assert gate.scan(token).status == ACCEPTED
+    assert gate.scan(token).status == ALREADY_REDEEMED
+    assert gate.scan(token.lower()).status == ALREADY_REDEEMED
+
+
+def test_gate_rejects_other_dates_and_keys():
+    token = encode_ticket(BOOKING, KEY)
+    assert GateVerifier(KEY, visit_date=date(2026, 11, 3)).scan(token).status == WRONG_DATE
+    assert GateVerifier(b'another-key').scan(token).status == INVALID
+
+
+def test_missing_key_fails_closed(no_key):
+    with pytest.raises(MissingSigningKey):
+        signing_key()
+    with pytest.raises(MissingSigningKey):
+        encode_ticket(BOOKING)
+    with pytest.raises(MissingSigningKey):
+        GateVerifier()
+
+
+def test_scanner_refuses_to_start_without_key():
+    env = {name: value for name, value in os.environ.items() if name != 'TICKET_SIGNING_KEY'}
+    result = subprocess.run([sys.executable, 'gate_verify.py'], cwd=ROOT, env=env, input='',
+                            capture_output=True, text=True)
+    assert result.returncode == 2
+    assert 'TICKET_SIGNING_KEY' in result.stderr
+
+
+def test_key_from_config():
+    assert signing_key({'TICKET_SIGNING_KEY': 'abc'}) == b'abc'
+    with pytest.raises(MissingSigningKey):
+        signing_key({})
+
+
+def test_app_closes_bookings_without_key(no_key):
+    app_test = pytest.importorskip('streamlit.testing.v1')
+    app = app_test.AppTest.from_file(os.path.join(ROOT, 'tixbee.py'), default_timeout=60).run()
+    assert not app.exception
+    assert 'TICKET_SIGNING_KEY' in app.error[0].value
+    assert not app.chat_input
@@ -0,0 +1,153 @@
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import qrcode
+from PIL import Image
+from qrcode.exceptions import DataOverflowError
+from qrcode.util import MODE_8BIT_BYTE, MODE_ALPHA_NUM, MODE_NUMBER, optimal_data_chunks
+
+from telemetry import span
+from ticket_token import encode_ticket
+
+# Maximum payload in characters per QR version at error correction level L, by encoding mode
+BYTE_CAPACITY_L = [17, 32, 53, 78, 106, 134, 154, 192, 230, 271,
+                   321, 367, 425, 458, 520, 586, 644, 718, 792, 858]
+# Ticket tokens are base32, which QR encodes in alphanumeric mode
+ALPHANUMERIC_CAPACITY_L = [25, 47, 77, 114, 154, 195, 224, 279, 335, 395,
+                           468, 535, 619, 667, 758, 854, 938, 1046, 1153, 1249]
+NUMERIC_CAPACITY_L = [41, 77, 127, 187, 255, 322, 370, 461, 552, 652,
+                      772, 883, 1022, 1101, 1250, 1408, 1548, 1725, 1903, 2061]
+CAPACITY_L = {MODE_8BIT_BYTE: BYTE_CAPACITY_L, MODE_ALPHA_NUM: ALPHANUMERIC_CAPACITY_L,
+              MODE_NUMBER: NUMERIC_CAPACITY_L}
+# Shortest run QRCode.add_data encodes in a more compact mode of its own
+OPTIMIZE_MIN_RUN = 20
+TICKET_CACHE_SIZE = 512
+BOX_SIZE = 10
+BORDER = 4
+
+
+def pick_version(data):
+    """Return the smallest QR version that fits the data in the mode qrcode will encode it in.
+
+    None for data qrcode splits into segments of different modes, or
+    that is too long for the table; make_qr then lets qrcode fit it.
+    """
+    payload = data.encode('utf-8')
+    # The same segments QRCode.add_data makes
+    chunks = list(optimal_data_chunks(payload, minimum=OPTIMIZE_MIN_RUN))
+    if len(chunks) != 1:
+        return None
+    for version, capacity in enumerate(CAPACITY_L[chunks[0].mode], start=1):
+        if len(payload) <= capacity:
+            return version
+    return None
+
+
+def make_qr(data, border=BORDER):
+    """Build a QR code with its version chosen up front instead of by fit search"""
+    version = pick_version(data)
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=BOX_SIZE,
+        border=border,
+    )
+    qr.add_data(data, optimize=OPTIMIZE_MIN_RUN)
+    try:
+        qr.make(fit=version is None)
+    except DataOverflowError:
+        qr.make(fit=True)
+    return qr
+
+
+def qr_matrix(data, border=BORDER):
+    """Return the QR modules for data as a tuple of rows of booleans"""
+    return tuple(tuple(row) for row in make_qr(data, border=border).get_matrix())
+
+
+def matrix_to_image(matrix, box_size=BOX_SIZE):
+    """Draw a module matrix as a black-on-white PIL image"""
+    modules = len(matrix)
+    image = Image.new('1', (modules, modules))
+    image.putdata([0 if cell else 255 for row in matrix for cell in row])
+    return image.resize((modules * box_size, modules * box_size), Image.Resampling.NEAREST)
+
+
+def matrix_to_png(matrix, box_size=BOX_SIZE):
+    img_byte_arr = BytesIO()
+    matrix_to_image(matrix, box_size).save(img_byte_arr, format='PNG')
+    return img_byte_arr.getvalue()
+
+
+def matrix_to_svg(matrix, box_size=BOX_SIZE):
+    """Render a module matrix as a single-path SVG document"""
+    size = len(matrix) * box_size
+    path = []
+    for y, row in enumerate(matrix):
+        for x, cell in enumerate(row):
+            if cell:
+                path.append(f"M{x * box_size},{y * box_size}h{box_size}v{box_size}h-{box_size}z")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {size} {size}"><rect width="100%" height="100%" fill="#fff"/>'
+        f'<path d="{"".join(path)}" fill="#000"/></svg>'
+    )
+
+
+class TicketQREngine:
+    """Render entry QR codes for bookings, memoized by booking ID.
+
+    The module matrix is computed once per booking and each output
+    format (PNG, SVG or the raw matrix) is derived from it and cached,
+    so the confirmation email and the on-screen ticket share one render.
+    """
+
+    FORMATS = ('png', 'svg', 'matrix')
+
+    def __init__(self, maxsize=TICKET_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, booking_details, fmt='png'):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported QR format: {fmt}")
+        key = (booking_details['booking_id'], fmt)
+        with self._lock:
+            output = self._entries.get(key)
+            if output is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return output
+            self.misses += 1
+
+        if fmt == 'matrix':
+            # Signed base32 ticket token, verifiable offline by gate_verify
+            with span('qr_matrix'):
+                output = qr_matrix(encode_ticket(booking_details))
+        else:
+            matrix = self.render(booking_details, 'matrix')
+            with span(f'qr_{fmt}'):
+                output = matrix_to_png(matrix) if fmt == 'png' else matrix_to_svg(matrix)
+
+        with self._lock:
+            self._entries[key] = output
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return output
+
+    def info(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+_default_engine = TicketQREngine()
+
+
+def render_ticket_qr(booking_details, fmt='png'):
+    """Render an entry QR with the process-wide engine"""
+    return _default_engine.render(booking_details, fmt)
@@ -0,0 +1,145 @@
+import base64
+import hashlib
+import hmac
+import re
+import struct
+from datetime import date, datetime, timedelta
+
+from config import default_config
+
+# Token layout (before base32):
+#   version (1 byte) | visit day (2 bytes, days since EPOCH, 0 = unknown) | tickets (1 byte)
+#   | booking ID length (1 byte) | booking ID (ASCII) | HMAC-SHA256 tag (8 bytes)
+TOKEN_VERSION = 1
+EPOCH = date(2020, 1, 1)
+TAG_SIZE = 8
+UNKNOWN_DAY = 0
+_HEADER = struct.Struct('>BHBB')
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+_DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%B %d, %Y', '%d %B %Y')
+
+# Keeps QR link tokens apart from ticket tags made with the same key
+QR_LINK_CONTEXT = b'tixbee-qr-link\0'
+QR_LINK_SIZE = 16
+
+_signing_key = None
+
+
+class InvalidTicket(ValueError):
+    """Raised when a ticket token is malformed or its signature does not match"""
+
+
+class MissingSigningKey(RuntimeError):
+    """Raised when TICKET_SIGNING_KEY is not configured"""
+
+
+def signing_key(config=None):
+    """TICKET_SIGNING_KEY from st.secrets or the environment.
+
+    Every app replica and gate scanner must share the key, so there is
+    no fallback: without it no ticket is issued or accepted.
+    """
+    global _signing_key
+    if config is None and _signing_key is not None:
+        return _signing_key
+    key = (config or default_config()).get('TICKET_SIGNING_KEY')
+    if not key:
+        raise MissingSigningKey("TICKET_SIGNING_KEY is not set; tickets cannot be signed or verified")
+    key = key.encode('utf-8') if isinstance(key, str) else bytes(key)
+    if config is None:
+        _signing_key = key
+    return key
+
+
+class TicketClaims:
+    """Fields carried by a verified ticket token"""
+
+    __slots__ = ('booking_id', 'visit_date', 'tickets')
+
+    def __init__(self, booking_id, visit_date, tickets):
+        self.booking_id = booking_id
+        self.visit_date = visit_date
+        self.tickets = tickets
+
+    def __repr__(self):
+        return f"TicketClaims({self.booking_id!r}, {self.visit_date!r}, {self.tickets})"
+
+
+def ticket_total(ticket_count):
+    """Total number of tickets in a ticket_count value such as '2 Adults, 1 Child'"""
+    if isinstance(ticket_count, int):
+        return ticket_count
+    return sum(int(n) for n in re.findall(r'\d+', str(ticket_count)))
+
+
+def parse_booking_date(visit_date):
+    """Parse the visit date, or return None if the chat gave something free-form"""
+    if isinstance(visit_date, date):
+        return visit_date
+    text = str(visit_date).strip()
+    iso_match = _ISO_DATE.search(text)
+    if iso_match:
+        text = iso_match.group(0)
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _sign(body, key):
+    return hmac.new(key, body, hashlib.sha256).digest()[:TAG_SIZE]
+
+
+def encode_ticket(booking_details, key=None):
+    """Encode a booking as a compact signed token (unpadded base32)"""
+    key = key or signing_key()
+    booking_id = str(booking_details['booking_id']).encode('ascii')
+    visit_date = parse_booking_date(booking_details['visit_date'])
+    day = (visit_date - EPOCH).days if visit_date else UNKNOWN_DAY
+    tickets = min(ticket_total(booking_details['ticket_count']), 255)
+    if not UNKNOWN_DAY < day <= 0xFFFF:
+        day = UNKNOWN_DAY
+    if len(booking_id) > 255:
+        raise ValueError("Booking cannot be encoded as a ticket token")
+    body = _HEADER.pack(TOKEN_VERSION, day, tickets, len(booking_id)) + booking_id
+    return base64.b32encode(body + _sign(body, key)).decode('ascii').rstrip('=')
+
+
+def decode_ticket(token, key=None):
+    """Verify a token's signature and return its TicketClaims"""
+    key = key or signing_key()
+    token = token.strip().upper()
+    try:
+        raw = base64.b32decode(token + '=' * (-len(token) % 8))
+    except (ValueError, TypeError):
+        raise InvalidTicket("Ticket is not valid base32")
+    if len(raw) < _HEADER.size + TAG_SIZE:
+        raise InvalidTicket("Ticket is too short")
+
+    body, tag = raw[:-TAG_SIZE], raw[-TAG_SIZE:]
+    if not hmac.compare_digest(tag, _sign(body, key)):
+        raise InvalidTicket("Ticket signature does not match")
+
+    version, day, tickets, id_length = _HEADER.unpack_from(body)
+    if version != TOKEN_VERSION:
+        raise InvalidTicket(f"Unsupported ticket version {version}")
+    booking_id = body[_HEADER.size:]
+    if len(booking_id) != id_length:
+        raise InvalidTicket("Ticket booking ID is truncated")
+    visit_date = EPOCH + timedelta(days=day) if day != UNKNOWN_DAY else None
+    return TicketClaims(booking_id.decode('ascii'), visit_date, tickets)
+
+
+def qr_link_token(booking_id, key=None):
+    """Unguessable token for the emailed link to a booking's entry QR"""
+    key = key or signing_key()
+    digest = hmac.new(key, QR_LINK_CONTEXT + str(booking_id).encode('utf-8'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:QR_LINK_SIZE]).decode('ascii').rstrip('=')
+
+
+def check_qr_link_token(booking_id, token, key=None):
+    """True if token is the QR link token for booking_id"""
+    expected = qr_link_token(booking_id, key).encode('ascii')
+    return hmac.compare_digest(expected, str(token or '').encode('utf-8'))
@@ -0,0 +1,162 @@
+import atexit
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from telemetry import get_logger, span
+
+TRANSCRIPT_DIR = 'transcripts'
+FLUSH_EVERY = 32  # turns buffered before a write
+FLUSH_INTERVAL = 1.0  # seconds before a partial buffer is written anyway
+MAX_FILE_BYTES = 64 * 1024 * 1024
+MAX_FILE_AGE = 24 * 60 * 60
+
+log = get_logger('transcripts')
+
+
+class TranscriptStore:
+    """Append-only conversation log with one JSON line per chat turn.
+
+    Turns are buffered and written in batches with a single fsync per
+    batch, so the cost of a turn does not grow with the conversation.
+    The active file is rotated by size or age and rotated files are
+    gzip-compressed in the background.
+    """
+
+    def __init__(self, directory=TRANSCRIPT_DIR, flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL,
+                 max_bytes=MAX_FILE_BYTES, max_age=MAX_FILE_AGE, compress=True):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+
+        self._flusher = threading.Thread(target=self._flush_periodically, name="tixbee-transcripts", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def append(self, session_id, user_message, bot_response, timestamp=None):
+        """Buffer one turn; it is written with the next batch"""
+        record = {
+            'session_id': session_id,
+            'timestamp': timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'user_message': user_message,
+            'bot_response': bot_response,
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.flush_every:
+                self._write_buffer()
+
+    def flush(self):
+        with self._lock:
+            self._write_buffer()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._write_buffer()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _flush_periodically(self):
+        while not self._closed:
+            time.sleep(self.flush_interval)
+            with self._lock:
+                if self._buffer and not self._closed:
+                    self._write_buffer()
+
+    def _open_file(self):
+        # One active file per process so concurrent workers never share a file
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        self._path = os.path.join(self.directory, f"transcript-{stamp}-{os.getpid()}.jsonl")
+        self._file = open(self._path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+
+    def _should_rotate(self):
+        return (self._file.tell() >= self.max_bytes
+                or time.time() - self._opened_at >= self.max_age)
+
+    def _rotate(self):
+        self._file.close()
+        rotated_path = self._path
+        self._file = None
+        if self.compress:
+            threading.Thread(target=compress_file, args=(rotated_path,), daemon=True).start()
+
+    def _write_buffer(self):
+        # Caller holds self._lock
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._open_file()
+        with span('transcript_flush'):
+            self._file.write(''.join(self._buffer))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._buffer.clear()
+        if self._should_rotate():
+            self._rotate()
+
+
+def compress_file(path):
+    """Gzip a rotated transcript file and remove the original"""
+    try:
+        # Write under a temporary name so readers never see a partial archive
+        with open(path, 'rb') as source, gzip.open(path + '.gz.tmp', 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.replace(path + '.gz.tmp', path + '.gz')
+        os.remove(path)
+    except Exception as e:
+        log.error('transcript.compress_failed', path=path, error=str(e))
+
+
+def iter_turns(directory=TRANSCRIPT_DIR, session_id=None):
+    """Stream turns from all transcript files, oldest file first.
+
+    Plain and gzip-compressed files are read line by line, so analytics
+    jobs never hold a whole transcript in memory.
+    """
+    paths = glob.glob(os.path.join(directory, 'transcript-*.jsonl'))
+    paths += glob.glob(os.path.join(directory, 'transcript-*.jsonl.gz'))
+    for path in sorted(paths, key=lambda p: os.path.basename(p).split('.')[0]):
+        if path.endswith('.jsonl') and path + '.gz' in paths:
+            continue
+        for record in _read_transcript(path):
+            if session_id is None or record.get('session_id') == session_id:
+                yield record
+
+
+def _read_transcript(path):
+    try:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A crash can leave a partial last line behind
+                    continue
+    except FileNotFoundError:
+        # Compressed between listing the directory and opening the file
+        if not path.endswith('.gz'):
+            yield from _read_transcript(path + '.gz')